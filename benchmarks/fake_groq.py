@@ -0,0 +1,161 @@
+"""
+A deterministic stand-in for the Groq chat completions API, for benchmarks.
+
+Usage:
+    python -m benchmarks.fake_groq [--port 8100] [--latency 0.2] [--tokens-per-second 250]
+                                   [--completion-tokens 64] [--error-rate 0.05 --error-status 429] [--seed 0]
+
+Point the app at it with GROQ_BASE_URL=http://127.0.0.1:8100. Replies are derived from a hash of the prompt,
+so the same prompt always gets the same reply. Each reply takes `latency` seconds to its first token, then
+streams `completion_tokens` tokens at `tokens_per_second`. A seeded share of requests fails with one of the
+`error_status` codes instead, so runs with the same seed inject the same errors in the same order.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from utils.tokens import estimate_prompt_tokens
+
+VOCABULARY = (
+    "thanks for reaching out we are sorry about the trouble please try again after clearing your cache "
+    "and signing in once more if the problem persists reply with your order number so our team can look "
+    "into it the refund will appear within five business days let us know whether this resolved the issue"
+).split()
+# Tokens sent per streamed chunk.
+CHUNK_TOKENS = 4
+
+
+@dataclass
+class FakeGroqConfig:
+    """
+Behaviour of the fake Groq server.
+
+Attributes:
+    latency (float): Seconds before the first token.
+    tokens_per_second (float): Generation rate after the first token; 0 sends everything at once.
+    completion_tokens (int): Tokens per reply, capped by the request's max_tokens.
+    error_rate (float): Share of requests that fail.
+    error_status (List[int]): Status codes of injected failures, used in turn.
+    retry_after (float): Retry-After sent with injected 429s.
+    seed (int): Seed of the reply text and of error injection.
+"""
+    latency: float = 0.2
+    tokens_per_second: float = 250.0
+    completion_tokens: int = 64
+    error_rate: float = 0.0
+    error_status: List[int] = field(default_factory=lambda: [429])
+    retry_after: float = 1.0
+    seed: int = 0
+
+
+def reply_for(messages: list[dict], tokens: int, seed: int) -> list[str]:
+    """
+Returns the reply tokens for a prompt; the same prompt and seed always give the same reply.
+"""
+    digest = hashlib.sha256(json.dumps([seed, messages], sort_keys=True).encode()).digest()
+    rng = random.Random(digest)
+    return [rng.choice(VOCABULARY) + " " for _ in range(tokens)]
+
+
+def create_app(config: FakeGroqConfig) -> FastAPI:
+    app = FastAPI()
+    errors = random.Random(config.seed)
+    counters = {"requests": 0, "errors": 0}
+
+    def usage(messages: list[dict], completion: int) -> dict:
+        prompt = estimate_prompt_tokens(messages)
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def generation_delay(tokens: int) -> float:
+        return tokens / config.tokens_per_second if config.tokens_per_second else 0.0
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+        if config.error_rate and errors.random() < config.error_rate:
+            status = config.error_status[counters["errors"] % len(config.error_status)]
+            counters["errors"] += 1
+            headers = {"retry-after": str(config.retry_after)} if status == 429 else {}
+            return JSONResponse({"error": {"message": "Injected failure", "type": "fake_groq_error"}},
+                                status_code=status, headers=headers)
+
+        messages, model = body["messages"], body.get("model", "fake")
+        tokens = min(config.completion_tokens, body.get("max_tokens") or config.completion_tokens)
+        reply = reply_for(messages, tokens, config.seed)
+        completion_id, created = f"chatcmpl-{uuid.uuid4()}", int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.latency + generation_delay(tokens))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(reply)},
+                             "finish_reason": "stop", "logprobs": None}],
+                "usage": usage(messages, tokens),
+                "x_groq": {"id": f"req_{completion_id}"},
+            }
+
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(config.latency)
+            for start in range(0, tokens, CHUNK_TOKENS):
+                piece = reply[start:start + CHUNK_TOKENS]
+                await asyncio.sleep(generation_delay(len(piece)))
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": "".join(piece)}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                     "x_groq": {"id": f"req_{completion_id}", "usage": usage(messages, tokens)}}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="Generation rate; 0 for instant.")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="Tokens per reply.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail.")
+    parser.add_argument("--error-status", type=int, action="append",
+                        help="Status code of injected failures; may be repeated. Defaults to 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429s.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = FakeGroqConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status or [429],
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""
+End-to-end load benchmark: boots main:app against a throwaway Postgres and a fake Groq server, drives a mix of
+API calls at fixed concurrency levels and writes the results as JSON.
+
+Usage:
+    python -m benchmarks.load [--concurrency 1,8,32] [--duration 30] [--warmup 5] [-o results.json]
+                              [--mix login=5,list_tickets=35,create_ticket=15,add_message=20,ai_response=15,follow_up=10]
+                              [--database docker|env] [--groq-latency 0.2 --groq-error-rate 0.05] [--env KEY=VALUE]
+
+With --database docker (the default) a postgres:15 container is started on a free port and removed afterwards.
+With --database env the DB_* variables of the environment are used; point them at a database you can throw
+away, since the benchmark creates users and tickets.
+
+The app runs as a single uvicorn worker with the Groq rate limits, completion cache, canned answers and
+background AI workers turned off, so every AI call reaches the fake Groq server; --env overrides any of that.
+For each level and operation the results report requests, errors, requests per second, p50/p95/p99 latency
+and the SQL statements per request, read from the app's /metrics. Compare result files across commits; runs
+with the same seed issue the same sequence of calls per worker.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from random import Random
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+DEFAULT_MIX = "login=5,list_tickets=35,create_ticket=15,add_message=20,ai_response=15,follow_up=10"
+ADMIN_EMAIL = "admin@benchmark.example.com"
+PASSWORD = "benchmark-1"
+SAMPLE_PATTERN = re.compile(r'^(?P<name>\w+)\{(?P<labels>[^}]*)\} (?P<value>\S+)$')
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+@dataclass
+class Actors:
+    """
+Accounts and tickets shared by the benchmark workers.
+"""
+    admin_token: str
+    support_token: str
+    customers: List[dict]
+    ticket_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Operation:
+    """
+One kind of API call in the mix, with the route template it is reported under in /metrics.
+"""
+    name: str
+    method: str
+    route: str
+    run: Callable[[httpx.AsyncClient, Actors, Random], Awaitable[httpx.Response]]
+
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _login(client: httpx.AsyncClient, actors: Actors, rng: Random) -> httpx.Response:
+    customer = rng.choice(actors.customers)
+    return await client.post("/auth/login", data={"username": customer["email"], "password": PASSWORD})
+
+
+async def _list_tickets(client: httpx.AsyncClient, actors: Actors, rng: Random) -> httpx.Response:
+    customer = rng.choice(actors.customers)
+    return await client.get("/tickets/", params={"page_size": 10}, headers=_auth(customer["token"]))
+
+
+async def _create_ticket(client: httpx.AsyncClient, actors: Actors, rng: Random) -> httpx.Response:
+    customer = rng.choice(actors.customers)
+    response = await client.post("/tickets/", headers=_auth(customer["token"]), json={
+        "title": f"Benchmark ticket {rng.randrange(10 ** 6)}",
+        "content": "I was charged twice for my order and cannot sign in to check the invoice.",
+    })
+    if response.status_code < 400:
+        actors.ticket_ids.append(response.json()["id"])
+    return response
+
+
+async def _add_message(client: httpx.AsyncClient, actors: Actors, rng: Random) -> httpx.Response:
+    ticket_id = rng.choice(actors.ticket_ids)
+    return await client.post(f"/tickets/{ticket_id}/messages", headers=_auth(actors.support_token), json={
+        "content": f"Could you share the order number? Reference {rng.randrange(10 ** 6)}.",
+        "is_ai": False,
+    })
+
+
+async def _ai_response(client: httpx.AsyncClient, actors: Actors, rng: Random) -> httpx.Response:
+    ticket_id = rng.choice(actors.ticket_ids)
+    return await client.get(f"/groq/{ticket_id}/ai-response", headers=_auth(actors.admin_token))
+
+
+async def _follow_up(client: httpx.AsyncClient, actors: Actors, rng: Random) -> httpx.Response:
+    ticket_id = rng.choice(actors.ticket_ids)
+    return await client.post(f"/groq/{ticket_id}/ai-followup", headers=_auth(actors.admin_token), json={
+        "user_reply": f"That did not help, the charge {rng.randrange(10 ** 6)} is still there.",
+    })
+
+
+OPERATIONS: Dict[str, Operation] = {operation.name: operation for operation in [
+    Operation("login", "POST", "/auth/login", _login),
+    Operation("list_tickets", "GET", "/tickets/", _list_tickets),
+    Operation("create_ticket", "POST", "/tickets/", _create_ticket),
+    Operation("add_message", "POST", "/tickets/{ticket_id}/messages", _add_message),
+    Operation("ai_response", "GET", "/groq/{ticket_id}/ai-response", _ai_response),
+    Operation("follow_up", "POST", "/groq/{ticket_id}/ai-followup", _follow_up),
+]}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_http(url: str, timeout: float, process: Optional[subprocess.Popen] = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with status {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up within {timeout:.0f}s")
+
+
+@contextmanager
+def running(args: List[str], env: dict, ready_url: str, timeout: float = 60.0):
+    """
+Starts a process, waits until it answers ready_url, and terminates it on exit.
+"""
+    process = subprocess.Popen(args, env=env)
+    try:
+        wait_for_http(ready_url, timeout, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@contextmanager
+def docker_postgres(image: str, timeout: float = 60.0):
+    """
+Runs a throwaway Postgres container on a free local port and yields the DB_* settings to reach it.
+"""
+    password = uuid.uuid4().hex
+    container = subprocess.run(
+        ["docker", "run", "-d", "--rm", "-e", f"POSTGRES_PASSWORD={password}", "-p", "127.0.0.1::5432", image],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    try:
+        port = subprocess.run(["docker", "port", container, "5432/tcp"], check=True, capture_output=True,
+                              text=True).stdout.splitlines()[0].rsplit(":", 1)[1]
+        # The entrypoint's temporary init server listens on the socket only, so a TCP check waits for the real one.
+        deadline = time.monotonic() + timeout
+        while subprocess.run(["docker", "exec", container, "pg_isready", "-h", "127.0.0.1", "-U", "postgres"],
+                             capture_output=True).returncode != 0:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Postgres in container {container[:12]} did not start within {timeout:.0f}s")
+            time.sleep(0.5)
+        yield {"DB_HOST": "127.0.0.1", "DB_PORT": port, "DB_USER": "postgres", "DB_PASSWORD": password,
+               "DB_NAME": "postgres"}
+    finally:
+        subprocess.run(["docker", "stop", container], capture_output=True)
+
+
+def app_environment(args, database: dict, groq_url: str, data_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update(database)
+    env.update({
+        "GROQ_BASE_URL": groq_url,
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_RPM": "0",
+        "GROQ_TPM": "0",
+        "GROQ_CACHE_ENABLED": "false",
+        "CANNED_ANSWERS_ENABLED": "false",
+        "AI_JOB_WORKERS": "0",
+        "SIMILAR_TICKETS_PATH": os.path.join(data_dir, "similar_tickets"),
+        "ADMIN_EMAIL": ADMIN_EMAIL,
+        "ADMIN_PASSWORD": PASSWORD,
+    })
+    env.setdefault("DB_DIALECT", "postgresql+psycopg2")
+    env.setdefault("JWT_SECRET_KEY", uuid.uuid4().hex)
+    for override in args.env:
+        name, _, value = override.partition("=")
+        env[name] = value
+    return env
+
+
+async def _token(client: httpx.AsyncClient, email: str) -> str:
+    response = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+async def create_actors(client: httpx.AsyncClient, admin_email: str, customers: int, tickets_per_customer: int) -> Actors:
+    """
+Signs up a support user and `customers` customers, logs them in and creates their first tickets.
+"""
+    admin_token = await _token(client, admin_email)
+    run_id = uuid.uuid4().hex[:8]
+
+    async def signup(email: str, role: str) -> str:
+        response = await client.post("/auth/signup", headers=_auth(admin_token),
+                                     json={"email": email, "password": PASSWORD, "role": role})
+        response.raise_for_status()
+        return await _token(client, email)
+
+    support_token = await signup(f"support-{run_id}@benchmark.example.com", "support")
+    emails = [f"customer{index}-{run_id}@benchmark.example.com" for index in range(customers)]
+    tokens = await asyncio.gather(*(signup(email, "user") for email in emails))
+    actors = Actors(admin_token=admin_token, support_token=support_token,
+                    customers=[{"email": email, "token": token} for email, token in zip(emails, tokens)])
+
+    rng = Random(0)
+    for _ in range(max(customers * tickets_per_customer, 1)):
+        (await _create_ticket(client, actors, rng)).raise_for_status()
+    return actors
+
+
+def scrape_db_queries(base_url: str) -> Dict[tuple, List[float]]:
+    """
+Reads the per-route SQL statement histogram from /metrics as {(method, route): [sum, count]}.
+"""
+    text = httpx.get(f"{base_url}/metrics", timeout=10.0).text
+    totals: Dict[tuple, List[float]] = {}
+    for line in text.splitlines():
+        match = SAMPLE_PATTERN.match(line)
+        if not match or match["name"] not in ("http_request_db_queries_sum", "http_request_db_queries_count"):
+            continue
+        labels = dict(LABEL_PATTERN.findall(match["labels"]))
+        entry = totals.setdefault((labels["method"], labels["route"]), [0.0, 0.0])
+        entry[0 if match["name"].endswith("_sum") else 1] = float(match["value"])
+    return totals
+
+
+async def drive(client: httpx.AsyncClient, actors: Actors, mix: Dict[str, float], concurrency: int,
+                seconds: float, seed: str) -> tuple[list, float]:
+    """
+Runs `concurrency` workers issuing calls from the mix back to back for `seconds`.
+
+Returns:
+    tuple[list, float]: (operation, seconds, succeeded) per call, and the elapsed wall time.
+"""
+    names, weights = list(mix), list(mix.values())
+    samples = []
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    async def worker(index: int):
+        rng = Random(f"{seed}:{concurrency}:{index}")
+        while time.perf_counter() < deadline:
+            operation = OPERATIONS[rng.choices(names, weights)[0]]
+            call_started = time.perf_counter()
+            try:
+                succeeded = (await operation.run(client, actors, rng)).status_code < 400
+            except httpx.HTTPError:
+                succeeded = False
+            samples.append((operation.name, time.perf_counter() - call_started, succeeded))
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples: list, elapsed: float, before: dict, after: dict) -> dict:
+    """
+Aggregates the calls of one level into overall and per-operation figures.
+"""
+    def figures(latencies: list, errors: int) -> dict:
+        milliseconds = np.array(latencies) * 1000
+        p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99]) if len(latencies) else (None, None, None)
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "mean_ms": float(milliseconds.mean()) if len(latencies) else None,
+            "max_ms": float(milliseconds.max()) if len(latencies) else None,
+        }
+
+    endpoints = {}
+    for name in dict.fromkeys(sample[0] for sample in samples):
+        operation = OPERATIONS[name]
+        calls = [sample for sample in samples if sample[0] == name]
+        result = figures([sample[1] for sample in calls], sum(not sample[2] for sample in calls))
+        queries, requests = (after.get((operation.method, operation.route), [0.0, 0.0])[index]
+                             - before.get((operation.method, operation.route), [0.0, 0.0])[index]
+                             for index in (0, 1))
+        result.update({"method": operation.method, "route": operation.route,
+                       "db_queries_per_request": queries / requests if requests else None})
+        endpoints[name] = result
+
+    overall = figures([sample[1] for sample in samples], sum(not sample[2] for sample in samples))
+    overall["db_queries"] = sum(after[key][0] - before.get(key, [0.0, 0.0])[0] for key in after)
+    return {"elapsed_seconds": elapsed, **overall, "endpoints": endpoints}
+
+
+async def benchmark(args, base_url: str) -> List[dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.request_timeout) as client:
+        actors = await create_actors(client, ADMIN_EMAIL, args.customers, args.tickets_per_customer)
+        levels = []
+        for concurrency in args.concurrency:
+            if args.warmup:
+                await drive(client, actors, args.mix, concurrency, args.warmup, f"warmup:{args.seed}")
+            before = scrape_db_queries(base_url)
+            samples, elapsed = await drive(client, actors, args.mix, concurrency, args.duration, str(args.seed))
+            after = scrape_db_queries(base_url)
+            level = {"concurrency": concurrency, **summarize(samples, elapsed, before, after)}
+            print(f"concurrency {concurrency}: {level['rps']:.1f} req/s, p95 {level['p95_ms'] or 0:.1f} ms, "
+                  f"{level['errors']} errors", file=sys.stderr)
+            levels.append(level)
+        return levels
+
+
+def git_revision() -> dict:
+    def git(*command):
+        return subprocess.run(["git", *command], capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain"))}
+
+
+def run(args) -> dict:
+    groq_port, app_port = free_port(), free_port()
+    groq_url, base_url = f"http://127.0.0.1:{groq_port}", f"http://127.0.0.1:{app_port}"
+    groq_command = [sys.executable, "-m", "benchmarks.fake_groq", "--port", str(groq_port),
+                    "--latency", str(args.groq_latency), "--tokens-per-second", str(args.groq_tokens_per_second),
+                    "--completion-tokens", str(args.groq_completion_tokens), "--error-rate", str(args.groq_error_rate),
+                    "--seed", str(args.seed)]
+    for status in args.groq_error_status or []:
+        groq_command += ["--error-status", str(status)]
+    app_command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+                   "--workers", "1", "--log-level", "warning"]
+
+    started_at = datetime.now(timezone.utc)
+    with ExitStack() as stack:
+        data_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        database = stack.enter_context(docker_postgres(args.postgres_image)) if args.database == "docker" else {}
+        stack.enter_context(running(groq_command, dict(os.environ), f"{groq_url}/stats"))
+        stack.enter_context(running(app_command, app_environment(args, database, groq_url, data_dir),
+                                    f"{base_url}/metrics", timeout=args.startup_timeout))
+        levels = asyncio.run(benchmark(args, base_url))
+        groq_stats = httpx.get(f"{groq_url}/stats").json()
+
+    return {
+        "started_at": started_at.isoformat(),
+        **git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "database": args.database,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "mix": args.mix,
+            "customers": args.customers,
+            "tickets_per_customer": args.tickets_per_customer,
+            "seed": args.seed,
+            "groq": {"latency": args.groq_latency, "tokens_per_second": args.groq_tokens_per_second,
+                     "completion_tokens": args.groq_completion_tokens, "error_rate": args.groq_error_rate,
+                     "error_status": args.groq_error_status or [429]},
+            "env": args.env,
+        },
+        "fake_groq": groq_stats,
+        "levels": levels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 8, 32], help="Comma-separated concurrency levels. Defaults to 1,8,32.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds per level.")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before each level.")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Comma-separated operation=weight pairs. Defaults to {DEFAULT_MIX}.")
+    parser.add_argument("--customers", type=int, default=20, help="Customer accounts to create.")
+    parser.add_argument("--tickets-per-customer", type=int, default=3, help="Tickets created before the run.")
+    parser.add_argument("--database", choices=["docker", "env"], default="docker",
+                        help="Start a throwaway Postgres container, or use the DB_* environment variables.")
+    parser.add_argument("--postgres-image", default="postgres:15")
+    parser.add_argument("--groq-latency", type=float, default=0.2, help="Fake Groq seconds to first token.")
+    parser.add_argument("--groq-tokens-per-second", type=float, default=250.0, help="Fake Groq generation rate.")
+    parser.add_argument("--groq-completion-tokens", type=int, default=64, help="Fake Groq tokens per reply.")
+    parser.add_argument("--groq-error-rate", type=float, default=0.0, help="Share of fake Groq calls that fail.")
+    parser.add_argument("--groq-error-status", type=int, action="append",
+                        help="Status code of injected Groq failures; may be repeated. Defaults to 429.")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the app, e.g. GROQ_CACHE_ENABLED=true; may be repeated.")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="-", help="Output file; defaults to stdout.")
+    args = parser.parse_args()
+
+    result = json.dumps(run(args), indent=2, default=float)
+    if args.output == "-":
+        print(result)
+    else:
+        with open(args.output, "w") as output:
+            output.write(result + "\n")
+
+
+if __name__ == "__main__":
+    main()
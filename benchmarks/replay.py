@@ -0,0 +1,185 @@
+"""
+Replays traffic captured by TrafficCaptureMiddleware against a test instance and reports latency deltas per
+route.
+
+Usage:
+    python -m benchmarks.replay --target http://127.0.0.1:8000 [--speed 1] [--token TOKEN] [--secret VALUE]
+                                [--concurrency 64] [-o report.json] [data/traffic/traffic-*.jsonl ...]
+
+Requests are issued open-loop at their captured offsets, divided by --speed. Use 2 for twice the original
+rate, or 0 to send them back to back. At most --concurrency requests are in flight at once. If that limit
+is reached, the schedule falls behind, and the report shows by how much.
+
+Captures hold no credentials. Authenticated requests are sent with --token. Redacted body fields, such as
+login passwords, are filled in with --secret. IDs in paths refer to the captured database, so replay against
+an instance restored from a copy of it. Requests whose body was not captured are skipped.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+import numpy as np
+
+from utils.traffic_capture import REDACTED
+
+DEFAULT_CAPTURE = "data/traffic/traffic-*.jsonl"
+
+
+def load_entries(patterns: List[str], limit: Optional[int] = None) -> tuple[list, int]:
+    """
+Reads captured entries from the files matching `patterns`, in arrival order.
+
+Returns:
+    tuple[list, int]: The replayable entries and the number skipped because their body was not captured.
+"""
+    entries, skipped = [], 0
+    for path in sorted({path for pattern in patterns for path in glob.glob(pattern)}):
+        with open(path, encoding="utf-8") as capture:
+            for line in capture:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("body_captured", True):
+                    entries.append(entry)
+                else:
+                    skipped += 1
+    entries.sort(key=lambda entry: entry["ts"])
+    return entries[:limit] if limit else entries, skipped
+
+
+def _restore(value, secret: str):
+    if isinstance(value, dict):
+        return {key: _restore(item, secret) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_restore(item, secret) for item in value]
+    return secret if value == REDACTED else value
+
+
+def restore_body(entry: dict, secret: Optional[str]) -> Optional[str]:
+    """
+Returns the body to send for an entry, with redacted fields replaced by `secret` if one is given.
+"""
+    body = entry.get("body")
+    if body is None or secret is None:
+        return body
+    if entry["headers"].get("content-type", "").startswith("application/json"):
+        return json.dumps(_restore(json.loads(body), secret))
+    return urlencode([(key, secret if value == REDACTED else value) for key, value in parse_qsl(body, True)])
+
+
+def _percentiles(seconds: List[float]) -> List[Optional[float]]:
+    if not seconds:
+        return [None, None, None]
+    return [float(value) for value in np.percentile(np.array(seconds) * 1000, [50, 95, 99])]
+
+
+def report(results: Dict[str, dict]) -> Dict[str, dict]:
+    """
+Compares captured and replayed latencies per route.
+"""
+    routes = {}
+    for key, result in sorted(results.items()):
+        original, replayed = _percentiles(result["original"]), _percentiles(result["replayed"])
+        routes[key] = {
+            "requests": len(result["original"]),
+            "replay_errors": result["errors"],
+            "status_mismatches": result["mismatches"],
+            "original_p50_ms": original[0], "original_p95_ms": original[1], "original_p99_ms": original[2],
+            "replay_p50_ms": replayed[0], "replay_p95_ms": replayed[1], "replay_p99_ms": replayed[2],
+            "delta_p50_ms": replayed[0] - original[0] if replayed[0] is not None else None,
+            "delta_p95_ms": replayed[1] - original[1] if replayed[1] is not None else None,
+            "p95_ratio": replayed[1] / original[1] if replayed[1] is not None and original[1] else None,
+        }
+    return routes
+
+
+async def replay(entries: list, target: str, speed: float, concurrency: int, token: Optional[str],
+                 secret: Optional[str], timeout: float) -> dict:
+    """
+Re-issues the entries against `target` on their original schedule scaled by `speed`.
+"""
+    results: Dict[str, dict] = defaultdict(lambda: {"original": [], "replayed": [], "errors": 0, "mismatches": 0})
+    in_flight = asyncio.Semaphore(concurrency)
+    max_lag = 0.0
+
+    async def send(client: httpx.AsyncClient, entry: dict):
+        key = f"{entry['method']} {entry['route'] or entry['path']}"
+        headers = dict(entry["headers"])
+        if entry["authorized"] and token:
+            headers["Authorization"] = f"Bearer {token}"
+        url = entry["path"] + (f"?{entry['query']}" if entry["query"] else "")
+        started = time.perf_counter()
+        try:
+            response = await client.request(entry["method"], url, headers=headers,
+                                            content=restore_body(entry, secret))
+            results[key]["replayed"].append(time.perf_counter() - started)
+            results[key]["mismatches"] += response.status_code != entry["status"]
+        except httpx.HTTPError:
+            results[key]["errors"] += 1
+        finally:
+            results[key]["original"].append(entry["duration"])
+            in_flight.release()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=timeout) as client:
+        tasks = []
+        first = entries[0]["ts"] if entries else 0.0
+        started = time.perf_counter()
+        for entry in entries:
+            due = started + ((entry["ts"] - first) / speed if speed else 0.0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            max_lag = max(max_lag, time.perf_counter() - due)
+            tasks.append(asyncio.create_task(send(client, entry)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(entries),
+        "elapsed_seconds": elapsed,
+        "captured_seconds": entries[-1]["ts"] - first if entries else 0.0,
+        "max_schedule_lag_seconds": max_lag,
+        "routes": report(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="*", default=[DEFAULT_CAPTURE], help="Capture files or glob patterns.")
+    parser.add_argument("--target", required=True, help="Base URL of the instance to replay against.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Rate multiplier; 0 sends back to back.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight.")
+    parser.add_argument("--token", help="Bearer token sent with requests that were authenticated.")
+    parser.add_argument("--secret", help="Value substituted for redacted body fields, e.g. login passwords.")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("-o", "--output", default="-", help="Output file; defaults to stdout.")
+    args = parser.parse_args()
+
+    entries, skipped = load_entries(args.captures, args.limit)
+    result = asyncio.run(replay(entries, args.target, args.speed, args.concurrency, args.token, args.secret,
+                                args.timeout))
+    result["skipped"] = skipped
+    for key, route in sorted(result["routes"].items(), key=lambda item: -(item[1]["delta_p95_ms"] or 0)):
+        print(f"{key}: {route['requests']} requests, p95 {route['original_p95_ms'] or 0:.1f} -> "
+              f"{route['replay_p95_ms'] or 0:.1f} ms, {route['status_mismatches']} status mismatches", file=sys.stderr)
+
+    output = json.dumps(result, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as report_file:
+            report_file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
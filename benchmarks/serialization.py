@@ -0,0 +1,132 @@
+"""
+Micro-benchmark of response serialization: CPU time to turn a page of rows into a JSON body.
+
+Usage:
+    python -m benchmarks.serialization [--tickets 100] [--messages 20] [--iterations 200] [--json]
+
+Compares, for GET /tickets/all and GET /tickets/:
+
+- model: building response models in the handler, then what FastAPI does with a `response_model`. That is,
+  validate the returned value against it, convert it to JSON-compatible objects and encode it with the stdlib
+  JSONResponse.
+- single_pass: building plain dicts from the rows and passing them to model_response(). A cached TypeAdapter
+  validates them once and serializes them in pydantic-core.
+
+Rows are in-memory stand-ins for ORM objects, so only serialization is measured.
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from src.models.enums import TicketStatus
+from src.models.schemas import TicketResponse, TicketWithMessages
+from utils.serialization import model_response
+
+
+def make_rows(tickets: int, messages: int) -> list:
+    started = datetime(2025, 1, 1)
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            title=f"Charged twice for order {index}",
+            description="I was charged twice for my order and cannot sign in to check the invoice. " * 3,
+            status=TicketStatus.open,
+            messages=[
+                SimpleNamespace(content=f"Message {number} about the duplicate charge on order {index}. " * 2,
+                                created_at=started + timedelta(minutes=number))
+                for number in range(messages)
+            ],
+        )
+        for index in range(tickets)
+    ]
+
+
+def stdlib_render(content) -> bytes:
+    # Mirrors starlette.responses.JSONResponse.render.
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def model_path(annotation, build: Callable) -> Callable[[list], bytes]:
+    # Built once, like the response field FastAPI creates per route.
+    adapter = TypeAdapter(annotation)
+
+    def run(rows: list) -> bytes:
+        value = adapter.validate_python(build(rows))
+        return stdlib_render(adapter.dump_python(value, mode="json"))
+    return run
+
+
+def single_pass(annotation, build: Callable) -> Callable[[list], bytes]:
+    def run(rows: list) -> bytes:
+        return model_response(annotation, build(rows)).body
+    return run
+
+
+CASES = {
+    "tickets_with_messages": (
+        List[TicketWithMessages],
+        lambda rows: [TicketWithMessages(id=row.id, title=row.title, content=row.description,
+                                         messages=[message.content for message in row.messages]) for row in rows],
+        lambda rows: [{"id": row.id, "title": row.title, "content": row.description,
+                       "messages": [message.content for message in row.messages]} for row in rows],
+    ),
+    "tickets": (
+        List[TicketResponse],
+        lambda rows: [TicketResponse(id=row.id, title=row.title, content=row.description, status=row.status)
+                      for row in rows],
+        lambda rows: [{"id": row.id, "title": row.title, "content": row.description, "status": row.status}
+                      for row in rows],
+    ),
+}
+
+
+def cpu_per_call(run: Callable[[list], bytes], rows: list, iterations: int) -> float:
+    run(rows)
+    started = time.process_time()
+    for _ in range(iterations):
+        run(rows)
+    return (time.process_time() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=100, help="Tickets per page.")
+    parser.add_argument("--messages", type=int, default=20, help="Messages per ticket.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    rows = make_rows(args.tickets, args.messages)
+    results = {}
+    for name, (annotation, build_models, build_dicts) in CASES.items():
+        model_body = model_path(annotation, build_models)(rows)
+        single_pass_body = single_pass(annotation, build_dicts)(rows)
+        if json.loads(model_body) != json.loads(single_pass_body):
+            raise SystemExit(f"{name}: the two paths produce different JSON")
+        model_seconds = cpu_per_call(model_path(annotation, build_models), rows, args.iterations)
+        single_pass_seconds = cpu_per_call(single_pass(annotation, build_dicts), rows, args.iterations)
+        results[name] = {
+            "model_ms": model_seconds * 1000,
+            "single_pass_ms": single_pass_seconds * 1000,
+            "saved_ms": (model_seconds - single_pass_seconds) * 1000,
+            "saved_ratio": 1 - single_pass_seconds / model_seconds,
+            "body_bytes": len(single_pass_body),
+        }
+
+    if args.json:
+        print(json.dumps({"tickets": args.tickets, "messages": args.messages, "results": results}, indent=2))
+        return
+    print(f"CPU per page of {args.tickets} tickets with {args.messages} messages each:")
+    for name, result in results.items():
+        print(f"  {name}: {result['model_ms']:.2f} ms -> {result['single_pass_ms']:.2f} ms "
+              f"({result['saved_ratio']:.0%} saved, {result['body_bytes']} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,44 @@
 import os
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from src.user import router as user_router
 from src.tickets import router as ticket_router
 from src.groq_assistant import router as groq_router
+from src.system import router as system_router
+from src.canned_answers import router as canned_answer_router
+from src.analytics import router as analytics_router
+from src.metrics import router as metrics_router
 
-from utils.db_models.main import Base
-from utils.database import create_db_url, DB
+from utils.database import DB, dispose_engines
+from utils.migrations import run_migrations
+from utils.async_database import dispose_async_engines
+from utils.ai_jobs import get_ai_job_worker, stop_ai_job_worker
+from utils.groq_assistant import close_groq_assistant
+from utils.metrics import MetricsMiddleware
+from utils.traffic_capture import TrafficCaptureMiddleware, close_traffic_writer, traffic_capture_enabled
+from utils.security import shutdown_password_hasher
+from utils.token_sweeper import get_token_maintenance, stop_token_maintenance
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(MetricsMiddleware)
+if traffic_capture_enabled():
+    app.add_middleware(TrafficCaptureMiddleware)
 
 app.include_router(router=user_router)
 app.include_router(router=ticket_router)
 app.include_router(router=groq_router)
+app.include_router(router=system_router)
+app.include_router(router=canned_answer_router)
+app.include_router(router=analytics_router)
+app.include_router(router=metrics_router)
 
 
 @app.on_event("startup")
 def on_startup():
-    with DB(create_db_url()) as db:
-        Base.metadata.create_all(bind=db.engine)
+    run_migrations()
 
+    with DB() as db:
         admin_email = os.getenv("ADMIN_EMAIL")
         admin_password = os.getenv("ADMIN_PASSWORD")
 
@@ -29,6 +48,27 @@ def on_startup():
                 db.create_user(db.db_session, email=admin_email, password=admin_password, role="admin")
 
 
+@app.on_event("startup")
+async def start_ai_job_workers():
+    get_ai_job_worker().start()
+
+
+@app.on_event("startup")
+async def start_token_maintenance():
+    await get_token_maintenance().start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_ai_job_worker()
+    await stop_token_maintenance()
+    await close_groq_assistant()
+    await dispose_async_engines()
+    dispose_engines()
+    shutdown_password_hasher()
+    close_traffic_writer()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
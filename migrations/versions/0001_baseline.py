@@ -0,0 +1,82 @@
+"""Baseline schema: users, tokens, tickets and messages
+
+Creates the tables that used to be created by Base.metadata.create_all() at startup. Tables that already
+exist are left untouched, so databases created before migrations were introduced can be upgraded in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    role = postgresql.ENUM("user", "admin", "support", name="role", create_type=False)
+    ticket_status = postgresql.ENUM("open", "closed", "in_progress", "on_hold", "resolved",
+                                    name="ticketstatus", create_type=False)
+    role.create(op.get_bind(), checkfirst=True)
+    ticket_status.create(op.get_bind(), checkfirst=True)
+
+    if not inspector.has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("role", role, nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("last_login", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not inspector.has_table("tokens"):
+        op.create_table(
+            "tokens",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("token", sa.String(), nullable=False, unique=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("revoked_at", sa.DateTime(), nullable=True),
+        )
+
+    if not inspector.has_table("tickets"):
+        op.create_table(
+            "tickets",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("description", sa.String(), nullable=False),
+            sa.Column("status", ticket_status),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        )
+
+    if not inspector.has_table("messages"):
+        op.create_table(
+            "messages",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("content", sa.String(), nullable=False),
+            sa.Column("is_ai", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("ticket_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tickets.id"), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("messages")
+    op.drop_table("tickets")
+    op.drop_table("tokens")
+    op.drop_table("users")
+    sa.Enum(name="ticketstatus").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="role").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,46 @@
+"""Composite and foreign-key indexes for the hot query paths
+
+Every listing is ordered by (created_at, id) and filtered by its parent key, so the composite indexes below
+serve both the filter and the keyset ordering; they also cover the foreign keys (messages.ticket_id,
+tickets.user_id, tokens.user_id). Indexes are built CONCURRENTLY so upgrading a live database does not
+block writes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_messages_ticket_id_created_at", "messages", ["ticket_id", "created_at", "id"], None),
+    ("ix_messages_ai_ticket_id_created_at", "messages", ["ticket_id", "created_at", "id"], "is_ai = true"),
+    ("ix_tickets_user_id_created_at", "tickets", ["user_id", "created_at", "id"], None),
+    ("ix_tickets_status_created_at", "tickets", ["status", "created_at"], None),
+    ("ix_tickets_created_at", "tickets", ["created_at", "id"], None),
+    ("ix_tokens_user_id", "tokens", ["user_id"], None),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
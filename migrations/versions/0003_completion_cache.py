@@ -0,0 +1,31 @@
+"""Shared cache of Groq completions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "completion_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("completion", sa.String(), nullable=False),
+        sa.Column("latency_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_completion_cache_expires_at", "completion_cache", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_completion_cache_expires_at", table_name="completion_cache")
+    op.drop_table("completion_cache")
@@ -0,0 +1,30 @@
+"""Running conversation summaries for long tickets
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ticket_summaries",
+        sa.Column("ticket_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tickets.id"), primary_key=True),
+        sa.Column("summary", sa.String(), nullable=False),
+        sa.Column("summarized_until", sa.DateTime(), nullable=False),
+        sa.Column("summarized_until_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+
+def downgrade():
+    op.drop_table("ticket_summaries")
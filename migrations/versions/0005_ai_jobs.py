@@ -0,0 +1,50 @@
+"""Queue of background AI response jobs
+
+Workers claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so the partial indexes below only cover the
+rows workers scan: queued jobs by run_after, and running jobs by lease expiry.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    job_status = postgresql.ENUM("queued", "running", "succeeded", "failed", name="jobstatus", create_type=False)
+    job_status.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        "ai_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("ticket_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tickets.id"), nullable=False),
+        sa.Column("requested_by", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("user_reply", sa.String(), nullable=True),
+        sa.Column("status", job_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("result", sa.String(), nullable=True),
+        sa.Column("message_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ai_jobs_queued_run_after", "ai_jobs", ["run_after"],
+                    postgresql_where=sa.text("status = 'queued'"))
+    op.create_index("ix_ai_jobs_running_locked_until", "ai_jobs", ["locked_until"],
+                    postgresql_where=sa.text("status = 'running'"))
+    op.create_index("ix_ai_jobs_ticket_id", "ai_jobs", ["ticket_id"])
+
+
+def downgrade():
+    op.drop_table("ai_jobs")
+    postgresql.ENUM(name="jobstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,57 @@
+"""Full-text search over tickets and messages
+
+Adds stored generated tsvector columns (title weighted above description on tickets, content on messages) and
+GIN indexes on them. Postgres keeps the columns up to date on every write, so no triggers are needed.
+
+Adding a stored generated column rewrites the table under an exclusive lock, so run this upgrade in a
+maintenance window on large databases. The GIN indexes are then built CONCURRENTLY.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ("tickets", "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')"),
+    ("messages", "to_tsvector('english', coalesce(content, ''))"),
+]
+
+INDEXES = [
+    ("ix_tickets_search_vector", "tickets"),
+    ("ix_messages_search_vector", "messages"),
+]
+
+
+def upgrade():
+    for table, expression in COLUMNS:
+        op.add_column(table, sa.Column("search_vector", postgresql.TSVECTOR(),
+                                       sa.Computed(expression, persisted=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.create_index(
+                name,
+                table,
+                ["search_vector"],
+                postgresql_using="gin",
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    for table, _ in reversed(COLUMNS):
+        op.drop_column(table, "search_vector")
@@ -0,0 +1,40 @@
+"""Bank of canned answers matched before calling Groq
+
+The whole bank is loaded into memory by each process and matched there, so the table needs no index beyond
+its primary key.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    answer_source = postgresql.ENUM("curated", "learned", name="answersource", create_type=False)
+    answer_source.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        "canned_answers",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("question", sa.String(), nullable=False),
+        sa.Column("answer", sa.String(), nullable=False),
+        sa.Column("source", answer_source, nullable=False),
+        sa.Column("ticket_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("tickets.id"), nullable=True),
+        sa.Column("hits", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_used_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+
+def downgrade():
+    op.drop_table("canned_answers")
+    postgresql.ENUM(name="answersource").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,61 @@
+"""Ticket analytics: resolution timestamps, daily rollups and the indexes behind them
+
+tickets.resolved_at records when a ticket was last resolved or closed. Tickets that are already resolved are
+backfilled with their updated_at, the closest timestamp available. ticket_daily_stats holds the per-day
+rollups refreshed by utils.analytics. The per-day range scans over messages.created_at and
+tickets.resolved_at get their own indexes, built CONCURRENTLY.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_tickets_resolved_at", "tickets", ["resolved_at"], "resolved_at IS NOT NULL"),
+    ("ix_messages_created_at", "messages", ["created_at"], None),
+]
+
+
+def upgrade():
+    op.add_column("tickets", sa.Column("resolved_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE tickets SET resolved_at = updated_at WHERE status IN ('resolved', 'closed')")
+
+    op.create_table(
+        "ticket_daily_stats",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("tickets_created", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ai_messages", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("human_messages", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_responses", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_response_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("resolved", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("resolution_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("refreshed_at", sa.DateTime()),
+    )
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.drop_table("ticket_daily_stats")
+    op.drop_column("tickets", "resolved_at")
@@ -0,0 +1,40 @@
+"""Token sweeping and denylist indexes
+
+tokens.expires_at is indexed so the sweeper finds expired tokens without scanning the table, and a partial
+index on tokens.revoked_at serves the incremental denylist refreshes. Both are built CONCURRENTLY.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_tokens_expires_at", "tokens", ["expires_at"], None),
+    ("ix_tokens_revoked_at", "tokens", ["revoked_at"], "revoked_at IS NOT NULL"),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
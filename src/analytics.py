@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.models.enums import Role
+from utils.analytics import daily_stats, refresh_rollups, rolled_up_daily_stats, to_records, with_derived_columns
+from utils.async_database import AsyncDB
+from utils.principal_cache import Principal
+from utils.request_utils import get_current_user_with_permissions
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+MAX_DAYS = 366
+
+
+@router.get("/summary")
+async def analytics_summary(
+    since: Optional[datetime] = Query(None, description="Only tickets and messages created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only tickets and messages created before this time"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))
+):
+    """
+Count tickets per status and AI versus human messages, computed with GROUP BY queries.
+
+Accessible only to admin users.
+
+Returns:
+    dict: `tickets_by_status`, and `messages` with the AI and human counts and the AI share.
+"""
+    async with AsyncDB() as db:
+        tickets = await db.count_tickets_by_status(db.db_session, since=since, until=until)
+        messages = await db.count_messages_by_author(db.db_session, since=since, until=until)
+    total = messages["ai"] + messages["human"]
+    return {
+        "tickets_by_status": tickets,
+        "messages": {**messages, "ai_ratio": messages["ai"] / total if total else None},
+    }
+
+
+@router.get("/daily")
+async def analytics_daily(
+    since: Optional[date] = Query(None, description="First day; defaults to 29 days before until"),
+    until: Optional[date] = Query(None, description="Last day; defaults to today (UTC)"),
+    source: Literal["live", "rollup"] = Query("live", description="Compute from the live tables or read the rollups"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))
+):
+    """
+Report ticket activity per UTC day: tickets created, AI and human messages, first responses and resolutions,
+with average first-response and resolution times.
+
+First responses count towards the day the ticket was created, resolutions towards the day they happened.
+`source=rollup` reads the ticket_daily_stats rollups instead of the live tables, which suits long ranges.
+
+Accessible only to admin users.
+
+Raises:
+    HTTPException: 400 if the range is empty or longer than 366 days.
+"""
+    until = until or datetime.utcnow().date()
+    since = since or until - timedelta(days=29)
+    if since > until or (until - since).days >= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"The range must cover between 1 and {MAX_DAYS} days")
+
+    async with AsyncDB() as db:
+        if source == "rollup":
+            frame = await rolled_up_daily_stats(db, since, until)
+        else:
+            frame = await daily_stats(db, since, until)
+    return {"since": since, "until": until, "source": source, "days": to_records(with_derived_columns(frame))}
+
+
+@router.post("/rollups/refresh")
+async def refresh_analytics_rollups(
+    days: Optional[int] = Query(None, ge=1, le=MAX_DAYS, description="Trailing days to recompute"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))
+):
+    """
+Recompute the daily rollups of the trailing days (ANALYTICS_ROLLUP_WINDOW_DAYS by default).
+
+Accessible only to admin users.
+"""
+    async with AsyncDB() as db:
+        written = await refresh_rollups(db, days=days)
+    return {"days": written}
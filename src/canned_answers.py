@@ -0,0 +1,98 @@
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from src.models.enums import RESOLVED_STATUSES, AnswerSource, Role
+from src.models.schemas import CannedAnswerCreate, CannedAnswerResponse
+from utils.async_database import AsyncDB
+from utils.canned_answers import get_canned_answer_bank
+from utils.principal_cache import Principal
+from utils.request_utils import get_current_user_with_permissions
+from utils.serialization import model_response
+from utils.similar_tickets import ticket_text
+
+router = APIRouter(prefix="/canned-answers", tags=["Canned Answers"])
+
+
+def _canned_answer_row(canned_answer) -> dict:
+    return {
+        "id": canned_answer.id,
+        "question": canned_answer.question,
+        "answer": canned_answer.answer,
+        "source": canned_answer.source,
+        "ticket_id": canned_answer.ticket_id,
+        "hits": canned_answer.hits or 0,
+        "last_used_at": canned_answer.last_used_at,
+    }
+
+
+@router.get("/", response_model=List[CannedAnswerResponse])
+async def list_canned_answers(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+List the canned answer bank with how often each answer was used.
+
+Accessible only to admin users.
+"""
+    async with AsyncDB() as db:
+        answers = await db.get_canned_answers(db.db_session)
+    return model_response(List[CannedAnswerResponse], [_canned_answer_row(answer) for answer in answers])
+
+
+@router.post("/", response_model=CannedAnswerResponse)
+async def create_canned_answer(request: CannedAnswerCreate,
+                               current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Add a curated question and answer to the canned answer bank.
+
+Tickets whose latest question closely matches it are answered without calling Groq. Accessible only to
+admin users.
+"""
+    async with AsyncDB() as db:
+        canned_answer = await db.create_canned_answer(db.db_session, request.question, request.answer)
+    get_canned_answer_bank().invalidate()
+    return _canned_answer_row(canned_answer)
+
+
+@router.post("/from-ticket/{ticket_id}", response_model=CannedAnswerResponse)
+async def learn_canned_answer(ticket_id: UUID,
+                              current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Add a resolved ticket to the canned answer bank, with its title and description as the question and its
+latest AI reply as the answer. Messages from the customer, such as a closing "thanks, that worked", are
+never learned.
+
+Accessible only to admin users.
+
+Raises:
+    HTTPException: 404 if the ticket is not found, 409 if it is not resolved or has no AI reply.
+"""
+    async with AsyncDB() as db:
+        ticket = await db.get_ticket(db.db_session, ticket_id)
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        if ticket.status not in RESOLVED_STATUSES:
+            raise HTTPException(status_code=409, detail="Only resolved or closed tickets can be learned from")
+        reply = await db.get_latest_ai_message(db.db_session, ticket_id)
+        if reply is None:
+            raise HTTPException(status_code=409, detail="The ticket has no AI reply to learn from")
+        canned_answer = await db.create_canned_answer(db.db_session, ticket_text(ticket.title, ticket.description),
+                                                      reply.content, source=AnswerSource.learned,
+                                                      ticket_id=ticket_id)
+    get_canned_answer_bank().invalidate()
+    return _canned_answer_row(canned_answer)
+
+
+@router.delete("/{answer_id}")
+async def delete_canned_answer(answer_id: UUID,
+                               current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Remove an answer from the canned answer bank.
+
+Accessible only to admin users. Other processes stop using it within CANNED_ANSWERS_REFRESH_SECONDS.
+"""
+    async with AsyncDB() as db:
+        if not await db.delete_canned_answer(db.db_session, answer_id):
+            raise HTTPException(status_code=404, detail="Canned answer not found")
+    get_canned_answer_bank().invalidate()
+    return {"deleted": True}
@@ -1,14 +1,25 @@
-import os
+import asyncio
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, APIRouter, Query
-from starlette.responses import JSONResponse
+import orjson
+from fastapi import Depends, HTTPException, APIRouter, Query, Request
+from fastapi.responses import ORJSONResponse
+from starlette.responses import StreamingResponse
 
-from src.models.schemas import GroqResponse, GroqFollowupInput
-from src.models.enums import Permission
-from utils import DB, create_db_url
-from utils.db_models.main import User
-from utils.groq_assistant import GroqAssistant
+from src.models.schemas import GroqResponse, GroqFollowupInput, AIJobResponse
+from src.models.enums import JobStatus, Permission, Role
+from utils import AsyncDB
+from utils.ai_jobs import get_ai_job_worker
+from utils.canned_answers import find_canned_reply, get_canned_answer_bank
+from utils.principal_cache import Principal
+from utils.single_flight import CoalescedResponse, coalesce_response
+from utils.groq_assistant import GroqAssistant, get_groq_assistant
+from utils.pagination import set_cursor_headers
+from utils.serialization import model_response
+from utils.ticket_context import get_ticket_context_builder
 from utils.request_utils import get_current_user_with_permissions
 
 router = APIRouter(prefix="/groq", tags=["Groq"])
@@ -16,88 +27,340 @@ router = APIRouter(prefix="/groq", tags=["Groq"])
 
 @router.get("/{ticket_id}/ai-response")
 async def ai_response(ticket_id: UUID,
-                      current_user: User = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT]))):
+                      current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT])),
+                      groq_assistant: GroqAssistant = Depends(get_groq_assistant)):
     """
 Generates an AI-powered response for a specified ticket using the GroqAssistant, accessible only to users with the GROQ_ASSISTANT permission.
 
+Concurrent requests for the same ticket and conversation state share one generation and one stored message.
+A ticket whose latest question matches the canned answer bank is answered from the bank without calling Groq.
+
 Args:
     ticket_id (UUID): Unique identifier of the ticket.
-    current_user (User, optional): The authenticated user with required permissions.
+    current_user (Principal, optional): The authenticated user with required permissions.
+    groq_assistant (GroqAssistant, optional): The shared Groq assistant.
 
 Returns:
-    JSONResponse: Contains the generated AI response for the ticket.
+    ORJSONResponse: Contains the generated AI response for the ticket.
 
 Raises:
     HTTPException: If the ticket is not found or the user lacks permissions.
 """
-    with DB(create_db_url()) as db:
-        ticket = db.get_ticket_with_messages(db.db_session, ticket_id)
-        if not ticket:
-            raise HTTPException(status_code=404, detail="Ticket not found")
+    async def generate(db: AsyncDB) -> CoalescedResponse:
+        canned = await find_canned_reply(db, ticket_id)
+        if canned is not None:
+            if canned.content == canned.previous_response:
+                return CoalescedResponse(content=canned.content)
+            message = await db.create_message(db.db_session, ticket_id, canned.content, is_ai=True)
+            return CoalescedResponse(content=canned.content, message_id=message.id)
 
-        sorted_messages = sorted(ticket.messages, key=lambda msg: msg.created_at)
-        history = [msg.content for msg in sorted_messages[:-1]] if len(sorted_messages) > 1 else []
-        latest_message = sorted_messages[-1].content if sorted_messages else ""
+        started = time.perf_counter()
+        context = await get_ticket_context_builder().build(db, groq_assistant, ticket_id)
 
-        groq_assistant = GroqAssistant(api_key=os.environ["GROQ_API_KEY"])
-        groq_response = groq_assistant.generate_response(
-            ticket_description=ticket.description,
-            message_history=history,
-            latest_message=latest_message
+        groq_response = await groq_assistant.generate_response(
+            ticket_description=context.description,
+            message_history=context.history,
+            latest_message=context.latest_message,
+            summary=context.summary,
+            references=context.references
         )
 
         if not groq_response:
             raise HTTPException(status_code=500, detail="Something went wrong. Failed to generate Groq AI response")
+        get_canned_answer_bank().record_llm_latency(time.perf_counter() - started)
 
-        with DB(create_db_url()) as db:
-            db.create_message(db.db_session, ticket_id, groq_response,is_ai=True)
+        if groq_response == context.previous_response:
+            return CoalescedResponse(content=groq_response)
+        message = await db.create_message(db.db_session, ticket_id, groq_response, is_ai=True)
+        return CoalescedResponse(content=groq_response, message_id=message.id)
 
-        return JSONResponse(content={"groq_response": groq_response}, status_code=200)
+    result = await coalesce_response(ticket_id, generate)
+    return ORJSONResponse(content={"groq_response": result.content}, status_code=200)
 
 
 @router.get("/groq-response/{ticket_id}", response_model=GroqResponse)
 async def get_groq_response(
     ticket_id: UUID,
     page: int = Query(1, ge=1),
-    current_user: User = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT]))
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor/X-Prev-Cursor; overrides page"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT]))
 ):
-    with DB(create_db_url()) as db:
-        records = db.get_groq_chats_by_ticket_id(db.db_session, ticket_id=ticket_id, page=page)
-        messages = [r.content for r in records]
-        return GroqResponse(responses=messages)
+    """
+Retrieve a page of the AI responses stored for a ticket, ordered by (created_at, id).
+
+Cursors for the neighbouring pages are returned in the X-Next-Cursor and X-Prev-Cursor headers.
+"""
+    async with AsyncDB() as db:
+        records = await db.get_groq_chats_by_ticket_id(db.db_session, ticket_id=ticket_id, page=page, cursor=cursor)
+    response = model_response(GroqResponse, {"responses": [r.content for r in records]})
+    set_cursor_headers(response, records)
+    return response
 
 @router.post("/{ticket_id}/ai-followup")
 async def follow_up_with_groq(
     ticket_id: UUID,
     payload: GroqFollowupInput,
-    current_user: User = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT]))
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT])),
+    groq_assistant: GroqAssistant = Depends(get_groq_assistant)
 ):
     """
     Sends a user's reply back to Groq to continue the conversation thread.
 
+    Identical concurrent follow-ups share one generation, and the reply and response are stored once.
+
     Args:
         ticket_id (UUID): ID of the ticket.
         payload (GroqFollowupInput): User's reply to Groq's previous message.
+        groq_assistant (GroqAssistant): The shared Groq assistant.
 
     Returns:
-        JSONResponse: Groq's next response in the thread.
+        ORJSONResponse: Groq's next response in the thread.
     """
-    with DB(create_db_url()) as db:
-        ticket = db.get_ticket_with_messages(db.db_session, ticket_id)
-        if not ticket:
-            raise HTTPException(status_code=404, detail="Ticket not found")
-
-        sorted_messages = sorted(ticket.messages, key=lambda msg: msg.created_at)
-        conversation = [msg.content for msg in sorted_messages]
-        conversation.append(payload.user_reply)
+    async def generate(db: AsyncDB) -> CoalescedResponse:
+        context = await get_ticket_context_builder().build(db, groq_assistant, ticket_id, reply=payload.user_reply)
 
-        groq_assistant = GroqAssistant(api_key=os.environ["GROQ_API_KEY"])
-        next_response = groq_assistant.generate_response_from_history(conversation)
+        next_response = await groq_assistant.generate_response(
+            ticket_description=context.description,
+            message_history=context.history,
+            latest_message=context.latest_message,
+            summary=context.summary,
+            references=context.references
+        )
 
         if not next_response:
             raise HTTPException(status_code=500, detail="Groq follow-up failed")
 
-        db.create_message(db.db_session, ticket_id, payload.user_reply, is_ai=False)
-        db.create_message(db.db_session, ticket_id, next_response, is_ai=True)
+        _, message = await db.create_messages(db.db_session, ticket_id,
+                                              [(payload.user_reply, False), (next_response, True)])
+        return CoalescedResponse(content=next_response, message_id=message.id)
+
+    result = await coalesce_response(ticket_id, generate, reply=payload.user_reply)
+    return ORJSONResponse(content={"groq_response": result.content}, status_code=200)
+
+
+@router.get("/{ticket_id}/ai-response/stream")
+async def ai_response_stream(ticket_id: UUID,
+                             request: Request,
+                             current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT])),
+                             groq_assistant: GroqAssistant = Depends(get_groq_assistant)):
+    """
+Streaming variant of ai_response that sends the AI response as server-sent events while Groq generates it.
+
+Each token batch is sent as a `data: {"delta": ...}` event. Once generation completes, the full response is
+stored as an AI message and a final `done` event carries it as `groq_response`. Failures are reported as an
+`error` event. If the client disconnects, the upstream generation is cancelled and nothing is stored.
+
+Args:
+    ticket_id (UUID): Unique identifier of the ticket.
+    request (Request): The incoming request, used to detect client disconnects.
+    current_user (Principal, optional): The authenticated user with required permissions.
+    groq_assistant (GroqAssistant, optional): The shared Groq assistant.
+
+Returns:
+    StreamingResponse: A text/event-stream response.
+
+Raises:
+    HTTPException: If the ticket is not found or the user lacks permissions.
+"""
+    async with AsyncDB() as db:
+        context = await get_ticket_context_builder().build(db, groq_assistant, ticket_id)
+
+    deltas = groq_assistant.stream_response(
+        ticket_description=context.description,
+        message_history=context.history,
+        latest_message=context.latest_message,
+        summary=context.summary,
+        references=context.references
+    )
+    return _event_stream_response(_stream_and_persist(request, ticket_id, deltas,
+                                                      previous_response=context.previous_response))
+
+
+@router.post("/{ticket_id}/ai-followup/stream")
+async def follow_up_with_groq_stream(
+    ticket_id: UUID,
+    payload: GroqFollowupInput,
+    request: Request,
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT])),
+    groq_assistant: GroqAssistant = Depends(get_groq_assistant)
+):
+    """
+    Streaming variant of follow_up_with_groq that sends Groq's next response as server-sent events.
+
+    The user's reply and the completed AI response are stored together once the stream finishes.
+    Events follow the same format as /{ticket_id}/ai-response/stream.
+
+    Args:
+        ticket_id (UUID): ID of the ticket.
+        payload (GroqFollowupInput): User's reply to Groq's previous message.
+        request (Request): The incoming request, used to detect client disconnects.
+        groq_assistant (GroqAssistant): The shared Groq assistant.
+
+    Returns:
+        StreamingResponse: A text/event-stream response.
+    """
+    async with AsyncDB() as db:
+        context = await get_ticket_context_builder().build(db, groq_assistant, ticket_id, reply=payload.user_reply)
+
+    deltas = groq_assistant.stream_response(
+        ticket_description=context.description,
+        message_history=context.history,
+        latest_message=context.latest_message,
+        summary=context.summary,
+        references=context.references
+    )
+    return _event_stream_response(_stream_and_persist(request, ticket_id, deltas, user_reply=payload.user_reply))
+
+
+@router.post("/{ticket_id}/ai-response/jobs", status_code=202)
+async def enqueue_ai_response(ticket_id: UUID,
+                              current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT]))):
+    """
+Queue the generation of an AI response for a ticket and return immediately.
+
+The response is generated by a background worker and stored as an AI message, exactly as ai_response would.
+Poll the job, or wait on it, at the URL in the Location header.
+
+Args:
+    ticket_id (UUID): Unique identifier of the ticket.
+    current_user (Principal, optional): The authenticated user with required permissions.
+
+Returns:
+    ORJSONResponse: 202 with the job ID and status.
+
+Raises:
+    HTTPException: If the ticket is not found or the user lacks permissions.
+"""
+    return await _enqueue_job(ticket_id, current_user)
+
+
+@router.post("/{ticket_id}/ai-followup/jobs", status_code=202)
+async def enqueue_follow_up(
+    ticket_id: UUID,
+    payload: GroqFollowupInput,
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT]))
+):
+    """
+    Queue a follow-up with Groq and return immediately.
+
+    The reply and Groq's response are stored together once a background worker has generated it.
+
+    Args:
+        ticket_id (UUID): ID of the ticket.
+        payload (GroqFollowupInput): User's reply to Groq's previous message.
+
+    Returns:
+        ORJSONResponse: 202 with the job ID and status.
+    """
+    return await _enqueue_job(ticket_id, current_user, user_reply=payload.user_reply)
+
+
+@router.get("/jobs/{job_id}", response_model=AIJobResponse)
+async def get_ai_job(
+    job_id: UUID,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for the job to finish before answering"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.GROQ_ASSISTANT]))
+):
+    """
+Report the status of a background AI response job, including the response once it has succeeded.
+
+With `wait`, the request is held until the job succeeds or fails, or until `wait` seconds have passed,
+whichever comes first. Only the user who queued the job, or an admin, can see it.
+
+Raises:
+    HTTPException: If the job is not found.
+"""
+    deadline = time.monotonic() + wait
+    poll_interval = get_ai_job_worker().poll_interval
+    while True:
+        async with AsyncDB() as db:
+            job = await db.get_ai_job(db.db_session, job_id)
+        if not job or (job.requested_by != current_user.id and current_user.role != Role.admin):
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        remaining = deadline - time.monotonic()
+        if job.status in (JobStatus.succeeded, JobStatus.failed) or remaining <= 0:
+            return AIJobResponse(
+                id=job.id,
+                ticket_id=job.ticket_id,
+                status=job.status,
+                attempts=job.attempts,
+                groq_response=job.result,
+                message_id=job.message_id,
+                error=job.error,
+                created_at=job.created_at,
+                finished_at=job.finished_at,
+            )
+        await asyncio.sleep(min(poll_interval, remaining))
+
+
+async def _enqueue_job(ticket_id: UUID, current_user: Principal, user_reply: Optional[str] = None) -> ORJSONResponse:
+    async with AsyncDB() as db:
+        if not await db.get_ticket(db.db_session, ticket_id):
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        job = await db.enqueue_ai_job(db.db_session, ticket_id, current_user.id, user_reply=user_reply)
+
+    get_ai_job_worker().notify()
+    return ORJSONResponse(
+        content={"job_id": str(job.id), "status": job.status.value},
+        status_code=202,
+        headers={"Location": router.url_path_for("get_ai_job", job_id=str(job.id))},
+    )
+
+
+def _event_stream_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
+
+async def _stream_and_persist(
+    request: Request,
+    ticket_id: UUID,
+    deltas: AsyncIterator[str],
+    user_reply: Optional[str] = None,
+    previous_response: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+Relays Groq deltas as SSE events and stores the completed response.
+
+The upstream stream is closed as soon as the client goes away, which cancels the generation. A response
+identical to `previous_response` (the AI message the ticket already ends with) is not stored again.
+"""
+    chunks = []
+    async with aclosing(deltas) as stream:
+        try:
+            async for delta in stream:
+                if await request.is_disconnected():
+                    return
+                chunks.append(delta)
+                yield _sse_event({"delta": delta})
+        except HTTPException as err:
+            yield _sse_event({"status_code": err.status_code, "detail": err.detail}, event="error")
+            return
+
+    groq_response = "".join(chunks)
+    if not groq_response:
+        yield _sse_event({"status_code": 500, "detail": "Something went wrong. Failed to generate Groq AI response"},
+                         event="error")
+        return
+
+    try:
+        messages = [(user_reply, False)] if user_reply is not None else []
+        if groq_response != previous_response:
+            messages.append((groq_response, True))
+        if messages:
+            async with AsyncDB() as db:
+                await db.create_messages(db.db_session, ticket_id, messages)
+    except HTTPException as err:
+        yield _sse_event({"status_code": err.status_code, "detail": err.detail}, event="error")
+        return
 
-        return JSONResponse(content={"groq_response": next_response}, status_code=200)
\ No newline at end of file
+    yield _sse_event({"groq_response": groq_response}, event="done")
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+
+from utils.metrics import CONTENT_TYPE, registry
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+Expose request, query and Groq metrics in the Prometheus text format.
+
+Unauthenticated so Prometheus can scrape it; restrict access to it at the proxy in public deployments.
+
+Returns:
+    Response: The current value of every metric.
+"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -21,6 +21,24 @@ Enumeration of possible statuses for a ticket, including open, closed, in progre
     on_hold = "on_hold"
     resolved = "resolved"
 
+RESOLVED_STATUSES = (TicketStatus.resolved, TicketStatus.closed)
+
+class JobStatus(str, Enum):
+    """
+Enumeration of the states of a background AI response job: queued, running, succeeded and failed.
+"""
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class AnswerSource(str, Enum):
+    """
+Enumeration of where a canned answer came from: curated by an admin, or learned from a resolved ticket.
+"""
+    curated = "curated"
+    learned = "learned"
+
 class Permission(str, Enum):
     """
 Enumeration of user permissions for authentication and ticket management actions.
@@ -7,7 +7,7 @@ from typing import List, Optional
 import re
 import enum
 
-from src.models.enums import Role, TicketStatus
+from src.models.enums import Role, TicketStatus, JobStatus, AnswerSource
 
 
 class Token(str, enum.Enum):
@@ -97,6 +97,13 @@ Schema for creating a new ticket, including title and content fields.
     content: str
 
 
+class TicketStatusUpdate(BaseModel):
+    """
+Schema for changing the status of a ticket.
+"""
+    status: TicketStatus
+
+
 class TicketResponse(BaseModel):
     """
 Represents a response model for a ticket, including its ID, title, content, and current status.
@@ -108,6 +115,15 @@ Represents a response model for a ticket, including its ID, title, content, and
     status: TicketStatus
 
 
+class TicketSearchResult(TicketResponse):
+    """
+A ticket matching a search query, with its relevance and a highlighted excerpt of its description.
+"""
+
+    rank: float
+    snippet: str
+
+
 class TicketWithMessages(BaseModel):
     """
 Represents a support ticket with its details and associated messages.
@@ -145,4 +161,60 @@ Attributes:
     responses: List[str]
 
 class GroqFollowupInput(BaseModel):
-    user_reply: str
\ No newline at end of file
+    user_reply: str
+
+
+class AIJobResponse(BaseModel):
+    """
+Represents the state of a background AI response job.
+
+Attributes:
+    id (UUID): Unique identifier of the job.
+    ticket_id (UUID): The ticket the response is for.
+    status (JobStatus): queued, running, succeeded or failed.
+    attempts (int): Number of attempts started so far.
+    groq_response (Optional[str]): The generated response, once the job has succeeded.
+    message_id (Optional[UUID]): ID of the stored AI message, if the response was stored as a new message.
+    error (Optional[str]): The last error, if an attempt failed.
+    created_at (datetime): When the job was queued.
+    finished_at (Optional[datetime]): When the job succeeded or finally failed.
+"""
+    id: UUID
+    ticket_id: UUID
+    status: JobStatus
+    attempts: int
+    groq_response: Optional[str] = None
+    message_id: Optional[UUID] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class CannedAnswerCreate(BaseModel):
+    """
+Schema for adding a question and its answer to the canned answer bank.
+"""
+    question: str = Field(..., min_length=1)
+    answer: str = Field(..., min_length=1)
+
+
+class CannedAnswerResponse(BaseModel):
+    """
+Represents an entry of the canned answer bank.
+
+Attributes:
+    id (UUID): Unique identifier of the canned answer.
+    question (str): The question as customers ask it.
+    answer (str): The reply sent when a ticket matches the question.
+    source (AnswerSource): curated or learned.
+    ticket_id (Optional[UUID]): The resolved ticket a learned answer was taken from.
+    hits (int): Number of tickets answered with it.
+    last_used_at (Optional[datetime]): When it was last used.
+"""
+    id: UUID
+    question: str
+    answer: str
+    source: AnswerSource
+    ticket_id: Optional[UUID] = None
+    hits: int = 0
+    last_used_at: Optional[datetime] = None
@@ -0,0 +1,148 @@
+from fastapi import APIRouter, Depends
+
+from src.models.enums import Role
+from utils.database import get_pool_stats
+from utils.groq_assistant import get_groq_assistant
+from utils.async_database import AsyncDB, get_async_pool_stats
+from utils.ai_jobs import get_ai_job_worker
+from utils.canned_answers import canned_answers_enabled, get_canned_answer_bank
+from utils.principal_cache import Principal, get_principal_cache
+from utils.request_utils import get_current_user_with_permissions
+from utils.security import get_password_hasher
+from utils.similar_tickets import get_similar_ticket_index, similar_tickets_enabled
+from utils.single_flight import get_single_flight
+from utils.token_sweeper import get_token_maintenance
+
+router = APIRouter(prefix="/system", tags=["System"])
+
+
+@router.get("/db-pool")
+async def db_pool_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report connection pool occupancy and cumulative checkout/overflow counters for each shared engine.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Pool statistics per engine.
+"""
+    return {"engines": get_pool_stats(), "async_engines": get_async_pool_stats()}
+
+
+@router.get("/password-hashing")
+async def password_hashing_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report password hashing pool saturation, rejections, rehashes and per-login timings.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Password hashing statistics.
+"""
+    return get_password_hasher().stats()
+
+
+@router.get("/principal-cache")
+async def principal_cache_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report size, hit/miss counters and invalidations of the authenticated-principal cache.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Principal cache statistics.
+"""
+    return get_principal_cache().stats()
+
+
+@router.get("/tokens")
+async def token_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report the size and refreshes of the revoked-token denylist and how many expired tokens have been swept.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Token denylist and sweeper statistics.
+"""
+    return get_token_maintenance().stats()
+
+
+@router.get("/completion-cache")
+async def completion_cache_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report size, hit ratio and Groq latency saved by the completion cache.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Completion cache statistics, with `enabled` false when caching is turned off.
+"""
+    cache = get_groq_assistant().cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/ai-jobs")
+async def ai_job_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report the AI job queue depth per status, the activity of this process's workers and how many AI requests
+were coalesced into an in-flight generation.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Job counts per status, worker statistics and coalescing counters.
+"""
+    async with AsyncDB() as db:
+        jobs = await db.count_ai_jobs_by_status(db.db_session)
+    return {"jobs": jobs, "workers": get_ai_job_worker().stats(), "coalescing": get_single_flight().stats()}
+
+
+@router.get("/groq-scheduler")
+async def groq_scheduler_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report in-flight and queued Groq calls per priority lane, remaining rate-limit budget, retries and
+rate-limit responses.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Groq scheduler statistics, with `enabled` false when no scheduler is configured.
+"""
+    scheduler = get_groq_assistant().scheduler
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.stats()}
+
+
+@router.get("/similar-tickets")
+async def similar_ticket_index_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report the size of the similar-ticket index used to ground AI responses.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Similar-ticket index statistics, with `enabled` false when retrieval is turned off.
+"""
+    if not similar_tickets_enabled():
+        return {"enabled": False}
+    return {"enabled": True, **get_similar_ticket_index().stats()}
+
+
+@router.get("/canned-answers")
+async def canned_answer_stats(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
+    """
+Report how many AI responses were answered from the canned answer bank instead of Groq, and the latency
+that saved.
+
+Accessible only to admin users.
+
+Returns:
+    dict: Canned-answer statistics for this process, with `enabled` false when the fast path is turned off.
+"""
+    if not canned_answers_enabled():
+        return {"enabled": False}
+    return {"enabled": True, **get_canned_answer_bank().stats()}
@@ -1,56 +1,70 @@
+import logging
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.responses import StreamingResponse
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
 
-from src.models.schemas import TicketWithMessages, TicketResponse, TicketCreate, MessageCreate
-from src.models.enums import Permission
-from utils import create_db_url, DB
-from utils.db_models.main import User
+from src.models.schemas import TicketWithMessages, TicketResponse, TicketCreate, MessageCreate, TicketSearchResult, \
+    TicketStatusUpdate
+from src.models.enums import Permission, Role, TicketStatus
+from utils import AsyncDB
+from utils.export import export_ndjson, gzip_chunks
+from utils.pagination import set_cursor_headers
+from utils.principal_cache import Principal
 from utils.request_utils import get_current_user_with_permissions
+from utils.serialization import model_response
+from utils.similar_tickets import index_ticket
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/tickets", tags=["Tickets"])
 
 
+def _ticket_row(ticket) -> dict:
+    return {"id": ticket.id, "title": ticket.title, "content": ticket.description, "status": ticket.status}
+
+
 @router.get("/", response_model=List[TicketResponse])
 async def list_tickets(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_user_with_permissions([Permission.VIEW_OWN_TICKETS, Permission.VIEW_ALL_TICKETS]))
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor/X-Prev-Cursor; overrides page"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.VIEW_OWN_TICKETS, Permission.VIEW_ALL_TICKETS]))
 ):
     """
     Retrieve paginated list of tickets for the current user or all, based on permissions.
+
+    Tickets are ordered by (created_at, id). Cursors for the neighbouring pages are returned in the
+    X-Next-Cursor and X-Prev-Cursor headers; page numbers remain supported as a fallback.
     """
-    with DB(create_db_url()) as db:
+    async with AsyncDB() as db:
         if current_user.has_permission(Permission.VIEW_ALL_TICKETS):
-            tickets = db.get_all_tickets_paginated(db.db_session, page=page, page_size=page_size)
+            tickets = await db.get_all_tickets(db.db_session, page=page, page_size=page_size, cursor=cursor)
         else:
-            tickets = db.get_tickets_by_user_paginated(db.db_session, current_user.id, page=page, page_size=page_size)
-
-        return [
-            TicketResponse(
-                id=ticket.id,
-                title=ticket.title,
-                content=ticket.description,
-                status=ticket.status
-            ) for ticket in tickets
-        ]
+            tickets = await db.get_tickets_by_user(db.db_session, current_user.id, page=page, page_size=page_size,
+                                                   cursor=cursor)
+    response = model_response(List[TicketResponse], [_ticket_row(ticket) for ticket in tickets])
+    set_cursor_headers(response, tickets)
+    return response
 
 
 @router.post("/", response_model=TicketResponse)
-async def create_ticket(request: TicketCreate, current_user: User = Depends(get_current_user_with_permissions([Permission.CREATE_TICKET]))):
+async def create_ticket(request: TicketCreate, current_user: Principal = Depends(get_current_user_with_permissions([Permission.CREATE_TICKET]))):
     """
 Create a new ticket for the authenticated user.
 
 Args:
     request (TicketCreate): Ticket creation data.
-    current_user (User): The currently authenticated user with ticket creation permission.
+    current_user (Principal): The currently authenticated user with ticket creation permission.
 
 Returns:
     TicketResponse: The created ticket's details.
 """
-    with DB(create_db_url()) as db:
-        ticket = db.create_ticket(db.db_session, current_user.id, request.title, request.content)
+    async with AsyncDB() as db:
+        ticket = await db.create_ticket(db.db_session, current_user.id, request.title, request.content)
         return TicketResponse(id=ticket.id, title=ticket.title, content=ticket.description, status=ticket.status)
 
 
@@ -58,21 +72,72 @@ Returns:
 async def get_all_tickets(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_user_with_permissions([Permission.VIEW_ALL_TICKETS]))
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor/X-Prev-Cursor; overrides page"),
+    messages_per_ticket: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.VIEW_ALL_TICKETS]))
+):
+    """
+    Retrieve paginated list of tickets, each with their latest messages.
+
+    Tickets are ordered by (created_at, id), with page cursors in the X-Next-Cursor and X-Prev-Cursor headers.
+    Each ticket carries at most `messages_per_ticket` of its most recent messages, in chronological order;
+    messages for the whole page are loaded in a single query.
+    """
+    async with AsyncDB() as db:
+        tickets = await db.get_all_tickets_with_messages(db.db_session, page=page, page_size=page_size, cursor=cursor,
+                                                         messages_per_ticket=messages_per_ticket)
+    response = model_response(List[TicketWithMessages], [
+        {"id": ticket.id, "title": ticket.title, "content": ticket.description,
+         "messages": [message.content for message in ticket.messages]}
+        for ticket in tickets
+    ])
+    set_cursor_headers(response, tickets)
+    return response
+
+
+@router.get("/export")
+async def export_tickets(
+    since: Optional[datetime] = Query(None, description="Only tickets created at or after this time"),
+    status: Optional[List[TicketStatus]] = Query(None, description="Only tickets in these statuses"),
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))
+):
+    """
+    Export tickets with all of their messages as NDJSON, one ticket per line.
+
+    Rows are streamed from a server-side cursor straight into the response, so memory use stays constant
+    whatever the number of tickets. Tickets are ordered by (created_at, id) and messages chronologically.
+    Accessible only to admin users.
+    """
+    chunks = export_ndjson(since=since, statuses=status)
+    if gzip:
+        return StreamingResponse(gzip_chunks(chunks), media_type="application/gzip",
+                                 headers={"Content-Disposition": 'attachment; filename="tickets.ndjson.gz"'})
+    return StreamingResponse(chunks, media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="tickets.ndjson"'})
+
+
+@router.get("/search", response_model=List[TicketSearchResult])
+async def search_tickets(
+    q: str = Query(..., min_length=1, max_length=256, description="Search query; supports \"phrases\", OR and -term"),
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.VIEW_OWN_TICKETS, Permission.VIEW_ALL_TICKETS]))
 ):
     """
-    Retrieve paginated list of tickets, each with their messages.
+    Search ticket titles, descriptions and messages, most relevant first.
+
+    Users with VIEW_ALL_TICKETS search every ticket, everyone else only their own. The cursor for the next page
+    is returned in the X-Next-Cursor header.
     """
-    with DB(create_db_url()) as db:
-        tickets = db.get_all_tickets_paginated(db.db_session, page=page, page_size=page_size)
-        return [
-            TicketWithMessages(
-                id=ticket.id,
-                title=ticket.title,
-                content=ticket.description,
-                messages=ticket.messages  # optionally also paginate this
-            ) for ticket in tickets
-        ]
+    user_id = None if current_user.has_permission(Permission.VIEW_ALL_TICKETS) else current_user.id
+    async with AsyncDB() as db:
+        results = await db.search_tickets(db.db_session, q, user_id=user_id, page_size=page_size, cursor=cursor)
+    response = model_response(List[TicketSearchResult], [
+        {**_ticket_row(result.Ticket), "rank": result.rank, "snippet": result.snippet} for result in results
+    ])
+    set_cursor_headers(response, results)
+    return response
 
 
 @router.get("/{ticket_id}", response_model=TicketWithMessages)
@@ -80,37 +145,39 @@ async def get_ticket(
     ticket_id: UUID,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_user_with_permissions([Permission.VIEW_ALL_TICKETS]))
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor/X-Prev-Cursor; overrides page"),
+    current_user: Principal = Depends(get_current_user_with_permissions([Permission.VIEW_ALL_TICKETS]))
 ):
     """
     Retrieve a ticket by its ID along with paginated messages.
+
+    Messages are ordered by (created_at, id), with page cursors in the X-Next-Cursor and X-Prev-Cursor headers.
     """
-    with DB(create_db_url()) as db:
-        ticket = db.get_ticket(db.db_session, ticket_id)
+    async with AsyncDB() as db:
+        ticket = await db.get_ticket(db.db_session, ticket_id)
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
 
-        messages = db.get_ticket_messages_paginated(
-            db.db_session, ticket_id, page=page, page_size=page_size
-        )
-
-        return TicketWithMessages(
-            id=ticket.id,
-            title=ticket.title,
-            content=ticket.description,
-            messages=messages
+        messages = await db.get_messages_by_ticket(
+            db.db_session, ticket_id, page=page, page_size=page_size, cursor=cursor
         )
+    response = model_response(TicketWithMessages, {
+        "id": ticket.id, "title": ticket.title, "content": ticket.description,
+        "messages": [message.content for message in messages],
+    })
+    set_cursor_headers(response, messages)
+    return response
 
 
 @router.post("/{ticket_id}/messages", response_model=MessageCreate)
-async def add_message(ticket_id: UUID, request: MessageCreate, current_user: User = Depends(get_current_user_with_permissions([Permission.VIEW_ALL_TICKETS]))):
+async def add_message(ticket_id: UUID, request: MessageCreate, current_user: Principal = Depends(get_current_user_with_permissions([Permission.VIEW_ALL_TICKETS]))):
     """
 Add a new message to a specified ticket.
 
 Args:
     ticket_id (UUID): Unique identifier of the ticket.
     request (MessageCreate): Message content and AI flag.
-    current_user (User): The authenticated user with required permissions.
+    current_user (Principal): The authenticated user with required permissions.
 
 Returns:
     MessageCreate: The created message details.
@@ -118,11 +185,40 @@ Returns:
 Raises:
     HTTPException: If the ticket is not found or the user lacks permissions.
 """
-    with DB(create_db_url()) as db:
-        ticket = db.get_ticket(db.db_session, ticket_id)
+    async with AsyncDB() as db:
+        ticket = await db.get_ticket(db.db_session, ticket_id)
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
-        message = db.create_message(db.db_session, ticket_id, request.content)
+        message = await db.create_message(db.db_session, ticket_id, request.content)
         return MessageCreate(content=message.content, is_ai=message.is_ai)
 
 
+@router.patch("/{ticket_id}/status", response_model=TicketResponse)
+async def update_ticket_status(ticket_id: UUID, request: TicketStatusUpdate, current_user: Principal = Depends(get_current_user_with_permissions([Permission.VIEW_ALL_TICKETS]))):
+    """
+Change the status of a ticket.
+
+Resolving or closing a ticket adds it to the similar-ticket index used to ground AI responses; any other
+status removes it again.
+
+Args:
+    ticket_id (UUID): Unique identifier of the ticket.
+    request (TicketStatusUpdate): The new status.
+    current_user (Principal): The authenticated user with required permissions.
+
+Returns:
+    TicketResponse: The updated ticket.
+
+Raises:
+    HTTPException: If the ticket is not found or the user lacks permissions.
+"""
+    async with AsyncDB() as db:
+        ticket = await db.update_ticket_status(db.db_session, ticket_id, request.status)
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+    try:
+        await index_ticket(ticket)
+    except Exception:
+        logger.warning("Could not update the similar-ticket index for %s", ticket_id, exc_info=True)
+    return TicketResponse(id=ticket.id, title=ticket.title, content=ticket.description, status=ticket.status)
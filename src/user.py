@@ -2,18 +2,19 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from uuid import UUID
 
-from utils.database import DB, create_db_url
-from utils.db_models.main import User
+from utils.async_database import AsyncDB
+from utils.principal_cache import Principal
 from src.models.schemas import SignupRequest, TokenResponse, SignupResponse
 from utils.request_utils import get_current_user_with_permissions
-from src.models.enums import Role
+from utils.security import LoginTimer
+from src.models.enums import Role, Permission
 
 router = APIRouter()
 
 @router.post("/auth/signup", response_model=SignupResponse)
 async def signup(
     request: SignupRequest,
-    current_user: User = Depends(get_current_user_with_permissions([Role.admin]))
+    current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))
 ):
     """
 Registers a new user account.
@@ -21,13 +22,13 @@ Accessible only to admin users.
 
 Args:
     request (SignupRequest): User signup details.
-    current_user (User): The authenticated admin user (injected by dependency).
+    current_user (Principal): The authenticated admin user (injected by dependency).
 
 Returns:
     SignupResponse: Details of the newly created user.
 """
-    with DB(create_db_url()) as db:
-        user = db.create_user(db.db_session,email=request.email, password=request.password, role=request.role)
+    async with AsyncDB() as db:
+        user = await db.create_user(db.db_session, email=request.email, password=request.password, role=request.role)
         return SignupResponse(
             email=user.email,
             role=user.role,
@@ -48,18 +49,23 @@ Returns:
     TokenResponse: Access token and related metadata.
 
 Raises:
-    HTTPException: If authentication fails due to incorrect credentials.
+    HTTPException: If authentication fails due to incorrect credentials, or 503 if password
+        verification is saturated.
 """
-    with DB(create_db_url()) as db:
-        user = db.get_user_by_email_and_password(db.db_session, form_data.username, form_data.password)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email or password",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        token = db.create_token_for_user(db.db_session, user.id)
+    async with AsyncDB() as db:
+        async with db.unit_of_work():
+            with LoginTimer() as login_timer:
+                user = await db.get_user_by_email_and_password(db.db_session, form_data.username,
+                                                               form_data.password)
+                login_timer.succeeded = user is not None
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Incorrect email or password",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+
+            token = await db.create_token_for_user(db.db_session, user.id)
 
         return TokenResponse(
             id=token.id,
@@ -72,28 +78,44 @@ Raises:
         )
 
 
+@router.post("/auth/logout")
+async def logout(current_user: Principal = Depends(get_current_user_with_permissions([Permission.LOGIN]))):
+    """
+Revoke the bearer token used for this request.
+
+Args:
+    current_user (Principal): The currently authenticated user.
+
+Returns:
+    dict: Confirmation message upon successful revocation.
+"""
+    async with AsyncDB() as db:
+        await db.revoke_token(db.db_session, current_user.token_id)
+    return {"detail": "Token revoked successfully"}
+
+
 @router.delete("/auth/user/{user_id}")
 async def delete_user(
     user_id: UUID,
-    current_user: User = Depends(get_current_user_with_permissions([Role.admin]))
+    current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))
 ):
     """
 Delete a user by user ID. Requires admin permissions.
 
 Args:
     user_id (UUID): Unique identifier of the user to delete.
-    current_user (User): The currently authenticated admin user.
+    current_user (Principal): The currently authenticated admin user.
 
 Returns:
     dict: Confirmation message upon successful deletion.
 """
-    with DB(create_db_url()) as db:
-        db.delete_user(db.db_session, user_id)
+    async with AsyncDB() as db:
+        await db.delete_user(db.db_session, user_id)
     return {"detail": "User deleted successfully"}
 
 
 @router.get("/auth/user/{user_id}")
-async def get_user(user_id: UUID, current_user: User = Depends(get_current_user_with_permissions([Role.admin]))):
+async def get_user(user_id: UUID, current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
     """
 Retrieve a user by their unique ID.
 
@@ -101,28 +123,28 @@ Requires admin permissions.
 
 Args:
     user_id (UUID): Unique identifier of the user.
-    current_user (User): The currently authenticated admin user (injected by dependency).
+    current_user (Principal): The currently authenticated admin user (injected by dependency).
 
 Returns:
     User: The user object corresponding to the given ID.
 """
-    with DB(create_db_url()) as db:
-        user = db.get_user_by_id(db.db_session, user_id)
+    async with AsyncDB() as db:
+        user = await db.get_user_by_id(db.db_session, user_id)
     return user
 
 
 @router.get("/auth/users")
-async def get_users(current_user: User = Depends(get_current_user_with_permissions([Role.admin]))):
+async def get_users(current_user: Principal = Depends(get_current_user_with_permissions([Role.admin]))):
     """
 Retrieve a list of all users. Accessible only to users with the admin role.
 
 Args:
-    current_user (User): The currently authenticated admin user (injected by dependency).
+    current_user (Principal): The currently authenticated admin user (injected by dependency).
 
 Returns:
     List[User]: A list of all user objects.
 """
-    with DB(create_db_url()) as db:
-        users = db.get_all_users(db.db_session)
+    async with AsyncDB() as db:
+        users = await db.get_all_users(db.db_session)
     return users
 
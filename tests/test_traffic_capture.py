@@ -0,0 +1,97 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from utils.traffic_capture import REDACTED, TrafficCaptureMiddleware, sanitize
+
+
+def raw_entry(body=b"", content_type="", query="", truncated=False):
+    return {
+        "method": "POST",
+        "path": "/login",
+        "query": query,
+        "headers": {"content-type": content_type} if content_type else {},
+        "body": body,
+        "body_truncated": truncated,
+    }
+
+
+def test_json_login_body_is_redacted():
+    body = json.dumps({"email": "user@example.com", "password": "hunter2"}).encode()
+    entry = sanitize(raw_entry(body, "application/json"))
+
+    assert json.loads(entry["body"]) == {"email": "user@example.com", "password": REDACTED}
+    assert entry["body_captured"]
+
+
+def test_form_login_body_is_redacted():
+    body = b"username=user%40example.com&password=hunter2"
+    entry = sanitize(raw_entry(body, "application/x-www-form-urlencoded"))
+
+    assert parse_qs(entry["body"]) == {"username": ["user@example.com"], "password": [REDACTED]}
+
+
+def test_nested_keys_are_redacted():
+    body = json.dumps({
+        "user": {"name": "Ann", "credentials": {"api_key": "k", "refresh_token": "t"}},
+        "items": [{"client_secret": "s", "note": "kept"}],
+    }).encode()
+    entry = sanitize(raw_entry(body, "application/json; charset=utf-8"))
+
+    assert json.loads(entry["body"]) == {
+        "user": {"name": "Ann", "credentials": {"api_key": REDACTED, "refresh_token": REDACTED}},
+        "items": [{"client_secret": REDACTED, "note": "kept"}],
+    }
+
+
+def test_query_string_tokens_are_redacted():
+    entry = sanitize(raw_entry(query="page=2&access_token=abc&Token=def"))
+
+    assert "abc" not in entry["query"] and "def" not in entry["query"]
+    assert entry["query"].startswith("page=2&")
+
+
+def test_truncated_and_unparsable_bodies_are_left_out():
+    assert sanitize(raw_entry(b'{"password": "hu', "application/json", truncated=True))["body"] is None
+    assert sanitize(raw_entry(b"not json", "application/json"))["body"] is None
+    assert sanitize(raw_entry(b"\x00\x01", "application/octet-stream"))["body_captured"] is False
+
+
+class CollectingWriter:
+    def __init__(self):
+        self.entries = []
+
+    def submit(self, entry):
+        self.entries.append(entry)
+
+
+async def ok_app(scope, receive, send):
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def test_authorization_header_is_dropped():
+    writer = CollectingWriter()
+    middleware = TrafficCaptureMiddleware(ok_app, writer=writer, sample_rate=1.0, max_body_bytes=1024)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/tickets",
+        "query_string": b"",
+        "headers": [(b"authorization", b"Bearer secret-token"), (b"cookie", b"session=1"),
+                    (b"accept", b"application/json")],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+    [entry] = writer.entries
+    assert entry["authorized"] is True
+    assert entry["headers"] == {"accept": "application/json"}
+    assert "secret-token" not in json.dumps(sanitize(entry))
@@ -1 +1,2 @@
 from .database import *
+from .async_database import *
@@ -0,0 +1,250 @@
+"""
+Background workers for queued AI response jobs.
+
+Jobs live in the ai_jobs table and are claimed with FOR UPDATE SKIP LOCKED, so any number of app processes
+can run workers against the same queue. Each process runs AI_JOB_WORKERS workers, which bounds how many
+Groq calls it makes at once; set it to 0 for API-only processes, and run dedicated workers with:
+
+    python -m utils.ai_jobs
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+
+from utils.async_database import AsyncDB, dispose_async_engines
+from utils.canned_answers import find_canned_reply
+from utils.db_models.main import AIJob
+from utils.groq_assistant import close_groq_assistant, get_groq_assistant
+from utils.groq_scheduler import Priority
+from utils.single_flight import CoalescedResponse, coalesce_response
+from utils.ticket_context import get_ticket_context_builder
+
+logger = logging.getLogger(__name__)
+
+
+class AIJobWorker:
+    """
+A pool of asyncio workers that claim and process AI response jobs.
+
+Jobs are generated through coalesce_response(), so jobs and direct requests for the same ticket and
+conversation state share one Groq call and one stored message. AI response jobs take the canned-answer fast
+path first, like the ai-response route. Groq calls run in the background scheduling lane, behind interactive
+requests.
+
+Idle workers poll the queue every `poll_interval` seconds and are woken straight away when a job is queued
+by this process. A job whose worker disappears is requeued once its lease expires. Failed attempts are
+retried with exponential backoff when the failure is transient (a Groq or database error), up to
+`max_attempts` attempts in total.
+
+Args:
+    workers (int): Number of concurrent workers.
+    poll_interval (float): Seconds between queue polls while idle.
+    lease_seconds (float): How long a claimed job may run before it is requeued.
+    max_attempts (int): Attempts before a job is marked as failed.
+    retry_delay (float): Delay before the first retry; doubled for each further attempt.
+"""
+
+    def __init__(self, workers: int, poll_interval: float = 1.0, lease_seconds: float = 300.0,
+                 max_attempts: int = 3, retry_delay: float = 5.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._last_requeue = 0.0
+        self.busy = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        for index in range(self.workers - len(self._tasks)):
+            self._tasks.append(asyncio.create_task(self._run(), name=f"ai-job-worker-{index}"))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self):
+        """
+Wakes idle workers after a job has been queued.
+"""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                async with AsyncDB() as db:
+                    job = await db.claim_ai_job(db.db_session, self.lease)
+            except Exception:
+                logger.warning("Could not claim an AI job", exc_info=True)
+                job = None
+
+            if job is None:
+                await self._idle()
+                continue
+
+            self.busy += 1
+            try:
+                await self._process(job)
+            finally:
+                self.busy -= 1
+
+    async def _idle(self):
+        if time.monotonic() - self._last_requeue >= self.lease.total_seconds() / 2:
+            self._last_requeue = time.monotonic()
+            try:
+                async with AsyncDB() as db:
+                    requeued = await db.requeue_expired_ai_jobs(db.db_session)
+                if requeued:
+                    logger.warning("Requeued %d AI jobs with expired leases", requeued)
+            except Exception:
+                logger.warning("Could not requeue expired AI jobs", exc_info=True)
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _process(self, job: AIJob):
+        if job.attempts > self.max_attempts:
+            await self._record_failure(job, job.error or "Too many attempts", retry=False)
+            return
+
+        try:
+            assistant = get_groq_assistant()
+
+            async def generate(db: AsyncDB) -> CoalescedResponse:
+                if job.user_reply is None:
+                    canned = await find_canned_reply(db, job.ticket_id)
+                    if canned is not None:
+                        completed = await db.complete_ai_job(db.db_session, job, canned.content,
+                                                             store_messages=canned.content != canned.previous_response)
+                        self._record_completion(job, completed)
+                        message_id = completed.message_id if completed is not None else None
+                        return CoalescedResponse(content=canned.content, message_id=message_id, owner=job.id)
+
+                context = await get_ticket_context_builder().build(db, assistant, job.ticket_id,
+                                                                   reply=job.user_reply, priority=Priority.BACKGROUND)
+                response = await assistant.generate_response(
+                    ticket_description=context.description,
+                    message_history=context.history,
+                    latest_message=context.latest_message,
+                    summary=context.summary,
+                    references=context.references,
+                    priority=Priority.BACKGROUND
+                )
+                if not response:
+                    raise HTTPException(status_code=500,
+                                        detail="Something went wrong. Failed to generate Groq AI response")
+
+                store_messages = job.user_reply is not None or response != context.previous_response
+                completed = await db.complete_ai_job(db.db_session, job, response, store_messages=store_messages)
+                self._record_completion(job, completed)
+                message_id = completed.message_id if completed is not None else None
+                return CoalescedResponse(content=response, message_id=message_id, owner=job.id)
+
+            result = await coalesce_response(job.ticket_id, generate, reply=job.user_reply)
+            if result.owner != job.id:
+                # Another request or job for the same conversation state produced and stored the response.
+                async with AsyncDB() as db:
+                    completed = await db.complete_ai_job(db.db_session, job, result.content, store_messages=False,
+                                                         message_id=result.message_id)
+                self._record_completion(job, completed)
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as err:
+            transient = err.status_code >= 500 or err.status_code == 429
+            await self._record_failure(job, str(err.detail), retry=transient)
+        except Exception as err:
+            logger.exception("AI job %s failed", job.id)
+            await self._record_failure(job, str(err) or type(err).__name__, retry=True)
+
+    def _record_completion(self, job: AIJob, completed: Optional[AIJob]):
+        if completed is not None:
+            self.succeeded += 1
+        else:
+            logger.warning("AI job %s lost its lease before completing", job.id)
+
+    async def _record_failure(self, job: AIJob, error: str, retry: bool):
+        retry_at = None
+        if retry and job.attempts < self.max_attempts:
+            retry_at = datetime.utcnow() + timedelta(seconds=self.retry_delay * 2 ** (job.attempts - 1))
+        try:
+            async with AsyncDB() as db:
+                await db.fail_ai_job(db.db_session, job, error, retry_at=retry_at)
+        except Exception:
+            logger.warning("Could not record the failure of AI job %s", job.id, exc_info=True)
+            return
+        if retry_at is None:
+            self.failed += 1
+        else:
+            self.retried += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "busy": self.busy,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+_worker: Optional[AIJobWorker] = None
+
+
+def get_ai_job_worker() -> AIJobWorker:
+    """
+Returns the process-wide AIJobWorker, configured by AI_JOB_WORKERS, AI_JOB_POLL_INTERVAL,
+AI_JOB_LEASE_SECONDS, AI_JOB_MAX_ATTEMPTS and AI_JOB_RETRY_DELAY.
+"""
+    global _worker
+    if _worker is None:
+        _worker = AIJobWorker(
+            workers=int(os.getenv("AI_JOB_WORKERS", "4")),
+            poll_interval=float(os.getenv("AI_JOB_POLL_INTERVAL", "1")),
+            lease_seconds=float(os.getenv("AI_JOB_LEASE_SECONDS", "300")),
+            max_attempts=int(os.getenv("AI_JOB_MAX_ATTEMPTS", "3")),
+            retry_delay=float(os.getenv("AI_JOB_RETRY_DELAY", "5")),
+        )
+    return _worker
+
+
+async def stop_ai_job_worker():
+    """
+Stops the process-wide AIJobWorker, if one was started.
+"""
+    global _worker
+    if _worker is not None:
+        worker, _worker = _worker, None
+        await worker.stop()
+
+
+async def run_workers():
+    worker = get_ai_job_worker()
+    worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_ai_job_worker()
+        await close_groq_assistant()
+        await dispose_async_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run_workers())
+    except KeyboardInterrupt:
+        pass
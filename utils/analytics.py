@@ -0,0 +1,140 @@
+"""
+Ticket analytics: per-day activity computed with SQL aggregates and combined with pandas.
+
+The database does the counting. Each measure is one GROUP BY over an indexed timestamp, so only one row per day
+and measure leaves Postgres. pandas then aligns the measures on a continuous day index and derives averages
+and ratios column-wise.
+
+Daily rollups in ticket_daily_stats serve long ranges without touching the hot tables. Refreshing recomputes
+only the trailing ANALYTICS_ROLLUP_WINDOW_DAYS days, since older days no longer change, except for first
+responses that arrive later than the window:
+
+    python -m utils.analytics --refresh [--days 30]
+"""
+import argparse
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.async_database import AsyncDB, dispose_async_engines
+
+COUNT_COLUMNS = ["tickets_created", "ai_messages", "human_messages", "first_responses", "resolved"]
+SECONDS_COLUMNS = ["first_response_seconds", "resolution_seconds"]
+MEASURE_COLUMNS = {
+    "tickets": ["tickets_created"],
+    "messages": ["ai_messages", "human_messages"],
+    "first_responses": ["first_responses", "first_response_seconds"],
+    "resolutions": ["resolved", "resolution_seconds"],
+}
+
+
+def _day_index(since: date, until: date) -> pd.Index:
+    return pd.Index(pd.date_range(since, until, freq="D").date, name="day")
+
+
+def _combine(measures: dict, since: date, until: date) -> pd.DataFrame:
+    """
+Aligns the per-measure daily rows on one row per day in [since, until], with zeros for days without activity.
+"""
+    frames = [
+        pd.DataFrame.from_records(measures[name], columns=["day", *columns]).set_index("day")
+        for name, columns in MEASURE_COLUMNS.items()
+    ]
+    frame = pd.concat(frames, axis=1).reindex(_day_index(since, until)).fillna(0)
+    frame[COUNT_COLUMNS] = frame[COUNT_COLUMNS].astype("int64")
+    frame[SECONDS_COLUMNS] = frame[SECONDS_COLUMNS].astype("float64")
+    return frame
+
+
+def with_derived_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+Adds average first-response and resolution times and the AI share of messages, vectorized over all days.
+"""
+    frame = frame.copy()
+    frame["avg_first_response_seconds"] = frame["first_response_seconds"] / frame["first_responses"].replace(0, np.nan)
+    frame["avg_resolution_seconds"] = frame["resolution_seconds"] / frame["resolved"].replace(0, np.nan)
+    messages = frame["ai_messages"] + frame["human_messages"]
+    frame["ai_message_ratio"] = frame["ai_messages"] / messages.replace(0, np.nan)
+    return frame
+
+
+def to_records(frame: pd.DataFrame) -> List[dict]:
+    """
+Converts a daily frame into JSON-ready dicts, with None for undefined averages.
+"""
+    frame = frame.reset_index()
+    frame["day"] = frame["day"].map(date.isoformat)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient="records")
+
+
+async def daily_stats(db: AsyncDB, since: date, until: date) -> pd.DataFrame:
+    """
+Computes daily ticket activity for [since, until] from the live tables.
+
+Returns:
+    pd.DataFrame: One row per day, indexed by day, with the counts and second totals of ticket_daily_stats.
+"""
+    measures = await db.get_daily_ticket_activity(db.db_session, since, until)
+    return _combine(measures, since, until)
+
+
+async def rolled_up_daily_stats(db: AsyncDB, since: date, until: date) -> pd.DataFrame:
+    """
+Reads daily ticket activity for [since, until] from the ticket_daily_stats rollups.
+
+Days that have not been rolled up yet are reported as zeros.
+"""
+    rows = await db.get_daily_stats(db.db_session, since, until)
+    frame = pd.DataFrame.from_records(
+        [{column: getattr(row, column) for column in ["day", *COUNT_COLUMNS, *SECONDS_COLUMNS]} for row in rows],
+        columns=["day", *COUNT_COLUMNS, *SECONDS_COLUMNS],
+    ).set_index("day")
+    frame = frame.reindex(_day_index(since, until)).fillna(0)
+    frame[COUNT_COLUMNS] = frame[COUNT_COLUMNS].astype("int64")
+    frame[SECONDS_COLUMNS] = frame[SECONDS_COLUMNS].astype("float64")
+    return frame
+
+
+async def refresh_rollups(db: AsyncDB, days: Optional[int] = None, until: Optional[date] = None) -> int:
+    """
+Recomputes the rollups of the trailing `days` days (ANALYTICS_ROLLUP_WINDOW_DAYS by default, 7) up to and
+including `until` (today by default).
+
+Returns:
+    int: Number of days written.
+"""
+    days = days or int(os.getenv("ANALYTICS_ROLLUP_WINDOW_DAYS", "7"))
+    until = until or datetime.utcnow().date()
+    since = until - timedelta(days=days - 1)
+    frame = await daily_stats(db, since, until)
+    rows = frame.reset_index().to_dict(orient="records")
+    return await db.save_daily_stats(db.db_session, [
+        {"day": row["day"], **{column: int(row[column]) for column in COUNT_COLUMNS},
+         **{column: float(row[column]) for column in SECONDS_COLUMNS}}
+        for row in rows
+    ])
+
+
+async def _main(args):
+    try:
+        async with AsyncDB() as db:
+            written = await refresh_rollups(db, days=args.days)
+        print(f"Refreshed {written} days of ticket rollups")
+    finally:
+        await dispose_async_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refresh", action="store_true", help="Refresh the daily rollups (the default action).")
+    parser.add_argument("--days", type=int, help="Number of trailing days to recompute.")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1372 @@
+import os
+import threading
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import Date, cast, delete, func, literal, select, text, true, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import REAL, REGCONFIG, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+from utils.database import PoolCounters, describe_pool, get_pool_settings
+from src.models.enums import RESOLVED_STATUSES, AnswerSource, JobStatus, TicketStatus
+from utils.db_models.main import User, Ticket, Message, Token, CompletionCacheEntry, TicketSummary, AIJob, \
+    CannedAnswer, TicketDailyStats, SEARCH_CONFIG
+from utils.exception_handler import handle_db_error
+from utils.metrics import instrument_db_methods, instrument_engine
+from utils.pagination import KeysetPaginator, Page, decode_rank_cursor, encode_rank_cursor
+from utils.principal_cache import get_principal_cache
+from utils.security import create_access_token, get_password_hasher
+from utils.token_denylist import get_token_denylist
+
+# Session.info key marking a session whose writes are committed once, by AsyncDB.unit_of_work(). It holds the
+# callbacks to run once the unit has committed.
+UNIT_OF_WORK = "unit_of_work"
+
+
+@instrument_db_methods
+class AsyncDB:
+    """
+Asyncio counterpart of DB for use inside async route handlers.
+
+Exposes the same method surface as DB, but every query is awaited on an AsyncSession backed by an
+async Postgres driver, so slow queries no longer block the event loop. Sessions do not expire objects
+on commit, which keeps returned ORM objects readable after the context manager exits.
+"""
+
+    def __init__(self, db_url: Optional[str] = None):
+        self.db_url = db_url or create_async_db_url()
+        self.engine = get_async_engine(self.db_url)
+        self.SessionLocal = get_async_session_factory(self.db_url)
+
+    def get_session(self) -> AsyncSession:
+        return self.SessionLocal()
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[AsyncSession]:
+        """
+Group the writes of a block into one transaction that is flushed and committed once, when the block ends.
+
+Inside the block, write methods only add their changes to the session, so several writes cost a single flush
+and commit instead of one each. The exceptions are the job lease methods (claim_ai_job, complete_ai_job,
+fail_ai_job, requeue_expired_ai_jobs) and the maintenance sweeps, which always commit at once. Rows of the
+same table are inserted with one multi-row statement. Their IDs and timestamps are set on the client, so
+returned objects are usable straight away. Sessions do not autoflush, so rows added in the block are not
+visible to queries made in it.
+
+If the block raises, its changes are rolled back and nothing is committed. Process-local side effects, such
+as evicting a revoked token from the PrincipalCache, only happen once the unit has committed.
+
+Yields:
+    AsyncSession: The session of this AsyncDB.
+"""
+        db = self.db_session
+        db.info[UNIT_OF_WORK] = []
+        try:
+            yield db
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        finally:
+            callbacks = db.info.pop(UNIT_OF_WORK, [])
+        for callback in callbacks:
+            callback()
+
+    async def release_connection(self):
+        """
+End the session's read transaction so its connection goes back to the pool, e.g. before waiting on Groq.
+Objects already loaded stay readable, and the next query checks out a connection again. Inside
+unit_of_work() this does nothing, because the unit's pending writes must not be committed early.
+"""
+        session = self.db_session
+        if session.in_transaction() and UNIT_OF_WORK not in session.info:
+            await session.commit()
+
+    async def _commit(self, db: AsyncSession, after: Optional[Callable[[], None]] = None):
+        # Inside unit_of_work(), writes stay pending until the unit commits, and so does `after`.
+        if UNIT_OF_WORK in db.info:
+            if after is not None:
+                db.info[UNIT_OF_WORK].append(after)
+            return
+        await db.commit()
+        if after is not None:
+            after()
+
+    async def create_user(self, db: AsyncSession, email: str, password: str, role: str = "user") -> User:
+        """
+Create a new user with the given email, password, and role.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    email (str): User's email address.
+    password (str): Plaintext password to be hashed.
+    role (str, optional): User role. Defaults to "user".
+
+Returns:
+    User: The created User object.
+"""
+        hashed_password = await get_password_hasher().hash(password)
+        now = datetime.utcnow()
+        new_user = User(id=uuid4(), email=email, hashed_password=hashed_password, role=role, created_at=now,
+                        updated_at=now)
+        db.add(new_user)
+        await self._commit(db)
+        return new_user
+
+    async def get_user_by_id(self, db: AsyncSession, user_id: UUID) -> Optional[User]:
+        """
+Retrieve a user by their unique ID.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    user_id (UUID): Unique identifier of the user.
+
+Returns:
+    Optional[User]: The User object if found, otherwise None.
+"""
+        return await db.scalar(select(User).where(User.id == user_id))
+
+    async def get_all_users(self, db: AsyncSession) -> List[User]:
+        """
+Retrieve all users.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+
+Returns:
+    List[User]: All User objects.
+"""
+        return list(await db.scalars(select(User)))
+
+    async def get_user_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        """
+Retrieve a user by their email address.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    email (str): User's email address.
+
+Returns:
+    Optional[User]: The User object if found, otherwise None.
+"""
+        return await db.scalar(select(User).where(User.email == email))
+
+    async def get_user_by_email_and_password(self, db: AsyncSession, email: str, password: str) -> Optional[User]:
+        """
+Authenticate a user by email and password.
+
+Args:
+    db (AsyncSession): SQLAlchemy async session.
+    email (str): User's email address.
+    password (str): Plaintext password.
+
+Returns:
+    Optional[User]: The authenticated User object if credentials are valid, otherwise None.
+    Updates the user's last_login timestamp on successful authentication, and rehashes the password
+    if it was stored with a different bcrypt cost.
+
+Raises:
+    HTTPException: 503 if the password hashing pool is saturated.
+"""
+        user = await self.get_user_by_email(db, email)
+        if not user:
+            return None
+        verified, new_hash = await get_password_hasher().verify_and_update(password, user.hashed_password)
+        if verified:
+            if new_hash:
+                user.hashed_password = new_hash
+            user.last_login = datetime.utcnow()
+            await self._commit(db)
+            return user
+        return None
+
+    async def delete_user(self, db: AsyncSession, user_id: UUID):
+        """
+Delete a user from the database by user ID.
+
+Args:
+    db (AsyncSession): SQLAlchemy async session.
+    user_id (UUID): Unique identifier of the user to delete.
+"""
+        user = await self.get_user_by_id(db, user_id)
+        if user:
+            await db.delete(user)
+            await self._commit(db, after=lambda: get_principal_cache().invalidate_user(user_id))
+
+    async def create_ticket(self, db: AsyncSession, user_id: UUID, title: str, description: str,
+                            status: str = "open") -> Ticket:
+        """
+Create a new ticket for a user with the specified title, description, and status.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    user_id (UUID): Unique identifier of the user creating the ticket.
+    title (str): Title of the ticket.
+    description (str): Description of the ticket.
+    status (str, optional): Status of the ticket. Defaults to "open".
+
+Returns:
+    Ticket: The created Ticket object.
+"""
+        now = datetime.utcnow()
+        new_ticket = Ticket(id=uuid4(), user_id=user_id, title=title, description=description, status=status,
+                            created_at=now, updated_at=now)
+        db.add(new_ticket)
+        await self._commit(db)
+        return new_ticket
+
+    async def get_tickets_by_user(self, db: AsyncSession, user_id: UUID, page: int = 1,
+                                  page_size: int = 10, cursor: Optional[str] = None) -> Page:
+        """
+Retrieve a paginated list of tickets for a specific user.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    user_id (UUID): Unique identifier of the user.
+    page (int, optional): Page number for pagination. Defaults to 1.
+    page_size (int, optional): Number of tickets per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+
+Returns:
+    Page[Ticket]: Ticket objects associated with the user, ordered by (created_at, id), with next/prev cursors.
+"""
+        paginator = KeysetPaginator(Ticket.created_at, Ticket.id, page_size, cursor=cursor, page=page)
+        stmt = paginator.apply(select(Ticket).where(Ticket.user_id == user_id))
+        return paginator.to_page(await db.scalars(stmt))
+
+    async def get_all_tickets(self, db: AsyncSession, page: int = 1, page_size: int = 10,
+                              cursor: Optional[str] = None) -> Page:
+        """
+Retrieve a paginated list of all tickets.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    page (int, optional): Page number for pagination. Defaults to 1.
+    page_size (int, optional): Number of tickets per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+
+Returns:
+    Page[Ticket]: Ticket objects for the requested page, ordered by (created_at, id), with next/prev cursors.
+"""
+        paginator = KeysetPaginator(Ticket.created_at, Ticket.id, page_size, cursor=cursor, page=page)
+        stmt = paginator.apply(select(Ticket))
+        return paginator.to_page(await db.scalars(stmt))
+
+    async def get_latest_messages_for_tickets(self, db: AsyncSession, ticket_ids: List[UUID],
+                                          limit_per_ticket: int = 20) -> Dict[UUID, List[Message]]:
+        """
+Retrieve the latest messages of several tickets in a single query.
+
+Uses a LATERAL join so each ticket contributes at most `limit_per_ticket` rows, read straight from the
+(ticket_id, created_at, id) index, however many messages the ticket has.
+
+Args:
+    db (AsyncSession): SQLAlchemy database session.
+    ticket_ids (List[UUID]): Tickets whose messages should be loaded.
+    limit_per_ticket (int, optional): Maximum number of (most recent) messages per ticket. Defaults to 20.
+
+Returns:
+    Dict[UUID, List[Message]]: Messages per ticket ID in chronological order; every requested ticket is present.
+"""
+        messages_by_ticket = {ticket_id: [] for ticket_id in ticket_ids}
+        if not ticket_ids:
+            return messages_by_ticket
+
+        latest = (
+            select(Message)
+            .where(Message.ticket_id == Ticket.id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit_per_ticket)
+            .lateral()
+        )
+        latest_message = aliased(Message, latest)
+        stmt = (
+            select(latest_message)
+            .select_from(Ticket)
+            .join(latest, true())
+            .where(Ticket.id.in_(ticket_ids))
+            .order_by(latest.c.ticket_id, latest.c.created_at, latest.c.id)
+        )
+        rows = await db.scalars(stmt)
+        for message in rows:
+            messages_by_ticket[message.ticket_id].append(message)
+        return messages_by_ticket
+
+    async def get_all_tickets_with_messages(self, db: AsyncSession, page: int = 1, page_size: int = 10,
+                                        cursor: Optional[str] = None, messages_per_ticket: int = 20) -> Page:
+        """
+Retrieve a page of tickets with their latest messages attached, using two queries in total.
+
+Args:
+    db (AsyncSession): SQLAlchemy database session.
+    page (int, optional): Page number for pagination. Defaults to 1.
+    page_size (int, optional): Number of tickets per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+    messages_per_ticket (int, optional): Maximum number of (most recent) messages per ticket. Defaults to 20.
+
+Returns:
+    Page[Ticket]: Tickets whose `messages` hold their latest messages in chronological order.
+"""
+        tickets = await self.get_all_tickets(db, page=page, page_size=page_size, cursor=cursor)
+        messages = await self.get_latest_messages_for_tickets(db, [ticket.id for ticket in tickets], messages_per_ticket)
+        for ticket in tickets:
+            set_committed_value(ticket, "messages", messages[ticket.id])
+        return tickets
+
+    async def stream_tickets_with_messages(self, db: AsyncSession, since: Optional[datetime] = None,
+                                           statuses: Optional[List[TicketStatus]] = None,
+                                           batch_size: int = 1000) -> AsyncIterator[dict]:
+        """
+Stream every ticket with all of its messages, one ticket at a time.
+
+Tickets and messages are read in one joined query through a server-side cursor, `batch_size` rows at a time,
+as plain rows rather than ORM objects. Memory use therefore depends on the largest ticket, not on the size of
+the tables. The session must stay open until the iterator is exhausted or closed.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    since (datetime, optional): Only tickets created at or after this time.
+    statuses (List[TicketStatus], optional): Only tickets in one of these statuses.
+    batch_size (int, optional): Rows fetched from the cursor at a time. Defaults to 1000.
+
+Returns:
+    AsyncIterator[dict]: Ticket fields with a chronological `messages` list, ordered by (created_at, id).
+"""
+        stmt = (
+            select(Ticket.id, Ticket.user_id, Ticket.title, Ticket.description, Ticket.status, Ticket.created_at,
+                   Ticket.updated_at, Message.id.label("message_id"), Message.content, Message.is_ai,
+                   Message.created_at.label("message_created_at"))
+            .outerjoin(Message, Message.ticket_id == Ticket.id)
+            .order_by(Ticket.created_at, Ticket.id, Message.created_at, Message.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if since is not None:
+            stmt = stmt.where(Ticket.created_at >= since)
+        if statuses:
+            stmt = stmt.where(Ticket.status.in_(statuses))
+
+        ticket = None
+        result = await db.stream(stmt)
+        try:
+            async for row in result:
+                if ticket is None or ticket["id"] != row.id:
+                    if ticket is not None:
+                        yield ticket
+                    ticket = {
+                        "id": row.id,
+                        "user_id": row.user_id,
+                        "title": row.title,
+                        "description": row.description,
+                        "status": row.status,
+                        "created_at": row.created_at,
+                        "updated_at": row.updated_at,
+                        "messages": [],
+                    }
+                if row.message_id is not None:
+                    ticket["messages"].append({
+                        "id": row.message_id,
+                        "content": row.content,
+                        "is_ai": row.is_ai,
+                        "created_at": row.message_created_at,
+                    })
+        finally:
+            await result.close()
+        if ticket is not None:
+            yield ticket
+
+    async def search_tickets(self, db: AsyncSession, query: str, user_id: Optional[UUID] = None,
+                             page_size: int = 20, cursor: Optional[str] = None) -> Page:
+        """
+Full-text search over ticket titles, descriptions and messages, most relevant first.
+
+The query uses web search syntax ("quoted phrases", OR, -excluded) and is matched against the generated
+search_vector columns through their GIN indexes. A ticket's rank is its own ts_rank (title weighted above
+description) plus the rank of its best matching message. Pages are fetched with a keyset predicate on
+(rank, id), so deep pages cost the same as the first one.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    query (str): The search query.
+    user_id (UUID, optional): Only search the tickets of this user.
+    page_size (int, optional): Number of tickets per page. Defaults to 20.
+    cursor (str, optional): Opaque cursor from a previous page.
+
+Returns:
+    Page[Row]: Rows of (Ticket, rank, snippet), with a next cursor if more results exist. The snippet is the
+    part of the description around the matched terms.
+"""
+        config = literal(SEARCH_CONFIG, REGCONFIG)
+        tsquery = func.websearch_to_tsquery(config, query)
+
+        ticket_hits = (
+            select(Ticket.id.label("ticket_id"), func.ts_rank(Ticket.search_vector, tsquery).label("rank"))
+            .where(Ticket.search_vector.op("@@")(tsquery))
+        )
+        message_hits = (
+            select(Message.ticket_id, func.max(func.ts_rank(Message.search_vector, tsquery)).label("rank"))
+            .where(Message.search_vector.op("@@")(tsquery))
+            .group_by(Message.ticket_id)
+        )
+        if user_id is not None:
+            ticket_hits = ticket_hits.where(Ticket.user_id == user_id)
+            message_hits = message_hits.join(Ticket, Ticket.id == Message.ticket_id).where(Ticket.user_id == user_id)
+        hits = union_all(ticket_hits, message_hits).subquery()
+        ranked = (
+            select(hits.c.ticket_id, func.sum(hits.c.rank).label("rank"))
+            .group_by(hits.c.ticket_id)
+            .subquery()
+        )
+
+        stmt = (
+            select(Ticket, ranked.c.rank,
+                   func.ts_headline(config, Ticket.description, tsquery,
+                                    "MaxFragments=2, MinWords=5, MaxWords=20").label("snippet"))
+            .join(ranked, ranked.c.ticket_id == Ticket.id)
+            .order_by(ranked.c.rank.desc(), Ticket.id.desc())
+            .limit(page_size + 1)
+        )
+        if cursor:
+            position = decode_rank_cursor(cursor)
+            stmt = stmt.where(tuple_(ranked.c.rank, Ticket.id) < tuple_(cast(position.rank, REAL), position.id))
+
+        rows = (await db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_rank_cursor(rows[-1].rank, rows[-1].Ticket.id)
+        return Page(rows, next_cursor=next_cursor)
+
+    async def create_message(self, db: AsyncSession, ticket_id: UUID, content: str, is_ai: bool = False) -> Message:
+        """
+Create a new message for a specified ticket.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    content (str): Content of the message.
+    is_ai (bool, optional): Indicates if the message is generated by AI. Defaults to False.
+
+Returns:
+    Message: The created Message object.
+"""
+        new_message, = self._new_messages(ticket_id, [(content, is_ai)])
+        db.add(new_message)
+        await self._commit(db)
+        return new_message
+
+    async def create_messages(self, db: AsyncSession, ticket_id: UUID,
+                              messages: List[Tuple[str, bool]]) -> List[Message]:
+        """
+Create several messages for a ticket with a single INSERT statement.
+
+The messages are stored in the given order. Their created_at timestamps are one microsecond apart, so they
+sort in that order even though they are inserted together.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    messages (List[Tuple[str, bool]]): (content, is_ai) of each message, oldest first.
+
+Returns:
+    List[Message]: The created Message objects, in the given order.
+"""
+        new_messages = self._new_messages(ticket_id, messages)
+        db.add_all(new_messages)
+        await self._commit(db)
+        return new_messages
+
+    @staticmethod
+    def _new_messages(ticket_id: UUID, messages: List[Tuple[str, bool]]) -> List[Message]:
+        # IDs and timestamps are set here rather than at flush time, so pending messages already have them.
+        now = datetime.utcnow()
+        return [
+            Message(id=uuid4(), ticket_id=ticket_id, content=content, is_ai=is_ai,
+                    created_at=now + timedelta(microseconds=index))
+            for index, (content, is_ai) in enumerate(messages)
+        ]
+
+    async def get_messages_by_ticket(self, db: AsyncSession, ticket_id: UUID, page: int = 1,
+                                     page_size: int = 10, cursor: Optional[str] = None) -> Page:
+        """
+Retrieve a paginated list of messages for a specific ticket.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    page (int, optional): Page number for pagination. Defaults to 1.
+    page_size (int, optional): Number of messages per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+
+Returns:
+    Page[Message]: Message objects of the ticket, ordered by (created_at, id), with next/prev cursors.
+"""
+        paginator = KeysetPaginator(Message.created_at, Message.id, page_size, cursor=cursor, page=page)
+        stmt = paginator.apply(select(Message).where(Message.ticket_id == ticket_id))
+        return paginator.to_page(await db.scalars(stmt))
+
+    async def create_token_for_user(self, db: AsyncSession, user_id: UUID,
+                                    expires_delta: timedelta = timedelta(hours=1)) -> Token:
+        """
+Create and store a new access token for a user.
+
+The token's row ID is embedded as its `jti` claim, so revocation can be checked against the TokenDenylist
+without a database lookup.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    user_id (UUID): Unique identifier of the user.
+    expires_delta (timedelta, optional): Token validity duration. Defaults to 1 hour.
+
+Returns:
+    Token: The created Token object associated with the user.
+"""
+        token_id = uuid4()
+        access_token = create_access_token(data={"sub": str(user_id), "jti": str(token_id)},
+                                           expires_delta=expires_delta)
+        now = datetime.utcnow()
+        new_token = Token(id=token_id, user_id=user_id, token=access_token, expires_at=now + expires_delta,
+                          created_at=now)
+        db.add(new_token)
+        await self._commit(db)
+        return new_token
+
+    async def get_tokens_by_user(self, db: AsyncSession, user_id: UUID, page: int = 1,
+                                 page_size: int = 10) -> List[Token]:
+        """
+Retrieve a list of tokens associated with a user, paginated by page and page_size.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    user_id (UUID): Unique identifier of the user.
+    page (int, optional): Page number of the results. Defaults to 1.
+    page_size (int, optional): Number of results per page. Defaults to 10.
+
+Returns:
+    List[Token]: A list of Token objects associated with the user.
+"""
+        offset = (page - 1) * page_size
+        stmt = select(Token).where(Token.user_id == user_id).offset(offset).limit(page_size)
+        return list(await db.scalars(stmt))
+
+    async def revoke_token(self, db: AsyncSession, token_id: UUID):
+        """
+Revoke a token by setting its revoked_at timestamp to the current UTC time.
+
+The token is added to this process's TokenDenylist straight away; other processes pick it up on their next
+denylist refresh.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    token_id (UUID): Unique identifier of the token to revoke.
+"""
+        token = await db.scalar(select(Token).where(Token.id == token_id))
+        if token:
+            token.revoked_at = datetime.utcnow()
+
+            def forget():
+                get_principal_cache().invalidate_token(token.token)
+                get_token_denylist().add(token.id, token.expires_at)
+            await self._commit(db, after=forget)
+
+    async def get_token_with_user(self, db: AsyncSession, token: str) -> Optional[Tuple[Token, User]]:
+        """
+Retrieve a stored token together with its user, using the unique index on the token string.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    token (str): The encoded access token.
+
+Returns:
+    Optional[Tuple[Token, User]]: The Token and its User if the token is known, otherwise None.
+"""
+        row = (await db.execute(
+            select(Token, User).join(User, Token.user_id == User.id).where(Token.token == token)
+        )).first()
+        return (row[0], row[1]) if row else None
+
+    async def get_revoked_tokens(self, db: AsyncSession,
+                                 revoked_since: Optional[datetime] = None) -> List[Tuple[UUID, datetime, datetime]]:
+        """
+Retrieve the revoked tokens that have not expired yet, through the partial index on tokens.revoked_at.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    revoked_since (datetime, optional): Only tokens revoked at or after this time.
+
+Returns:
+    List[Tuple[UUID, datetime, datetime]]: (id, expires_at, revoked_at) of each token.
+"""
+        stmt = select(Token.id, Token.expires_at, Token.revoked_at).where(
+            Token.revoked_at.is_not(None), Token.expires_at > datetime.utcnow()
+        )
+        if revoked_since is not None:
+            stmt = stmt.where(Token.revoked_at >= revoked_since)
+        return [tuple(row) for row in await db.execute(stmt)]
+
+    async def delete_expired_tokens(self, db: AsyncSession, batch_size: int = 1000) -> int:
+        """
+Delete up to batch_size expired tokens in one short transaction.
+
+The batch is picked through the index on tokens.expires_at and locked with FOR UPDATE SKIP LOCKED, so
+concurrent sweepers delete disjoint batches.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    batch_size (int, optional): Maximum number of tokens to delete. Defaults to 1000.
+
+Returns:
+    int: Number of tokens deleted.
+"""
+        expired = (
+            select(Token.id)
+            .where(Token.expires_at < datetime.utcnow())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            delete(Token).where(Token.id.in_(expired)).execution_options(synchronize_session=False)
+        )
+        # Committed per batch on purpose, so the sweep never holds row locks across batches.
+        await db.commit()
+        return result.rowcount
+
+    async def get_ticket_with_messages(self, db: AsyncSession, ticket_id: UUID, page: int = 1,
+                                       page_size: int = 10, cursor: Optional[str] = None) -> Optional[Ticket]:
+        """
+Retrieve a ticket by its ID and attach a paginated list of its messages.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    page (int, optional): Page number for message pagination. Defaults to 1.
+    page_size (int, optional): Number of messages per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+
+Returns:
+    Optional[Ticket]: The Ticket object with its messages if found, otherwise None.
+"""
+        ticket = await self.get_ticket(db, ticket_id)
+        if ticket:
+            messages = await self.get_messages_by_ticket(db, ticket_id, page, page_size, cursor)
+            set_committed_value(ticket, "messages", messages)
+        return ticket
+
+    async def get_ticket(self, db: AsyncSession, ticket_id: UUID) -> Optional[Ticket]:
+        """
+Retrieve a ticket by its unique ID.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+
+Returns:
+    Optional[Ticket]: The Ticket object if found, otherwise None.
+"""
+        return await db.scalar(select(Ticket).where(Ticket.id == ticket_id))
+
+    async def get_tickets_by_ids(self, db: AsyncSession, ticket_ids: List[UUID]) -> Dict[UUID, Ticket]:
+        """
+Retrieve several tickets by their IDs in a single query.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_ids (List[UUID]): Unique identifiers of the tickets.
+
+Returns:
+    Dict[UUID, Ticket]: The tickets found, by ID. Unknown IDs are left out.
+"""
+        if not ticket_ids:
+            return {}
+        tickets = await db.scalars(select(Ticket).where(Ticket.id.in_(ticket_ids)))
+        return {ticket.id: ticket for ticket in tickets}
+
+    async def update_ticket_status(self, db: AsyncSession, ticket_id: UUID,
+                                   status: TicketStatus) -> Optional[Ticket]:
+        """
+Change the status of a ticket, stamping resolved_at when it becomes resolved or closed and clearing it when
+it is reopened.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    status (TicketStatus): The new status.
+
+Returns:
+    Optional[Ticket]: The updated Ticket if found, otherwise None.
+"""
+        ticket = await self.get_ticket(db, ticket_id)
+        if ticket:
+            if status not in RESOLVED_STATUSES:
+                ticket.resolved_at = None
+            elif ticket.resolved_at is None or ticket.status not in RESOLVED_STATUSES:
+                ticket.resolved_at = datetime.utcnow()
+            ticket.status = status
+            await self._commit(db)
+        return ticket
+
+    async def get_groq_chats_by_ticket_id(
+            self,
+            db: AsyncSession,
+            ticket_id: UUID,
+            page: int = 1,
+            page_size: int = 10,
+            cursor: Optional[str] = None
+    ) -> Page:
+        """
+Retrieve a page of AI-generated messages for a ticket, ordered by (created_at, id).
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    page (int, optional): Page number for pagination. Defaults to 1.
+    page_size (int, optional): Number of messages per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+
+Returns:
+    Page[Message]: AI Message objects of the ticket, with next/prev cursors.
+"""
+        paginator = KeysetPaginator(Message.created_at, Message.id, page_size, cursor=cursor, page=page)
+        stmt = paginator.apply(select(Message).where(Message.ticket_id == ticket_id).where(Message.is_ai == True))
+        return paginator.to_page(await db.scalars(stmt))
+
+    async def get_latest_ai_message(self, db: AsyncSession, ticket_id: UUID) -> Optional[Message]:
+        """
+Retrieve the newest AI-generated message of a ticket, read from the partial index on AI messages.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+
+Returns:
+    Optional[Message]: The latest AI Message, or None if the ticket has none.
+"""
+        return await db.scalar(
+            select(Message)
+            .where(Message.ticket_id == ticket_id, Message.is_ai == True)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(1)
+        )
+
+    async def get_cached_completion(self, db: AsyncSession, key: str) -> Optional[CompletionCacheEntry]:
+        """
+Retrieve an unexpired cached completion by its content hash.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    key (str): Content hash of the model and prompt messages.
+
+Returns:
+    Optional[CompletionCacheEntry]: The cached entry if present and not expired, otherwise None.
+"""
+        stmt = select(CompletionCacheEntry).where(
+            CompletionCacheEntry.key == key,
+            CompletionCacheEntry.expires_at > datetime.utcnow(),
+        )
+        return await db.scalar(stmt)
+
+    async def store_cached_completion(self, db: AsyncSession, key: str, model: str, completion: str,
+                                      latency_seconds: float, expires_at: datetime):
+        """
+Insert or replace a cached completion.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    key (str): Content hash of the model and prompt messages.
+    model (str): Model that produced the completion.
+    completion (str): The completion text.
+    latency_seconds (float): How long the original Groq call took.
+    expires_at (datetime): When the entry stops being served.
+"""
+        values = {
+            "key": key,
+            "model": model,
+            "completion": completion,
+            "latency_seconds": latency_seconds,
+            "created_at": datetime.utcnow(),
+            "expires_at": expires_at,
+        }
+        stmt = insert(CompletionCacheEntry).values(**values)
+        stmt = stmt.on_conflict_do_update(index_elements=[CompletionCacheEntry.key], set_=values)
+        await db.execute(stmt)
+        await self._commit(db)
+
+    async def delete_expired_completions(self, db: AsyncSession) -> int:
+        """
+Delete cached completions that have expired.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+
+Returns:
+    int: Number of deleted entries.
+"""
+        result = await db.execute(
+            delete(CompletionCacheEntry).where(CompletionCacheEntry.expires_at <= datetime.utcnow())
+        )
+        # A maintenance sweep, committed straight away rather than as part of a request's unit of work.
+        await db.commit()
+        return result.rowcount
+
+    async def get_ticket_summary(self, db: AsyncSession, ticket_id: UUID) -> Optional[TicketSummary]:
+        """
+Retrieve the running conversation summary of a ticket.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+
+Returns:
+    Optional[TicketSummary]: The summary if the ticket has one, otherwise None.
+"""
+        return await db.get(TicketSummary, ticket_id)
+
+    async def save_ticket_summary(self, db: AsyncSession, ticket_id: UUID, summary: str, last_message: Message,
+                                  folded_count: int):
+        """
+Insert or advance the running conversation summary of a ticket.
+
+The stored summary is only replaced if it covers fewer messages than the new one, so a slower concurrent
+request cannot move the summary backwards.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    summary (str): The updated summary.
+    last_message (Message): The newest message folded into the summary.
+    folded_count (int): Number of messages folded in by this update.
+"""
+        values = {
+            "ticket_id": ticket_id,
+            "summary": summary,
+            "summarized_until": last_message.created_at,
+            "summarized_until_id": last_message.id,
+            "message_count": folded_count,
+            "updated_at": datetime.utcnow(),
+        }
+        stmt = insert(TicketSummary).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TicketSummary.ticket_id],
+            set_={
+                "summary": stmt.excluded.summary,
+                "summarized_until": stmt.excluded.summarized_until,
+                "summarized_until_id": stmt.excluded.summarized_until_id,
+                "message_count": TicketSummary.message_count + stmt.excluded.message_count,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=tuple_(TicketSummary.summarized_until, TicketSummary.summarized_until_id)
+            < tuple_(stmt.excluded.summarized_until, stmt.excluded.summarized_until_id),
+        )
+        await db.execute(stmt)
+        await self._commit(db)
+
+    async def enqueue_ai_job(self, db: AsyncSession, ticket_id: UUID, requested_by: UUID,
+                             user_reply: Optional[str] = None) -> AIJob:
+        """
+Queue a background AI response job for a ticket.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    requested_by (UUID): ID of the user who requested the response.
+    user_reply (str, optional): For a follow-up, the reply to store and respond to.
+
+Returns:
+    AIJob: The queued job.
+"""
+        now = datetime.utcnow()
+        job = AIJob(id=uuid4(), ticket_id=ticket_id, requested_by=requested_by, user_reply=user_reply,
+                    status=JobStatus.queued, attempts=0, run_after=now, created_at=now)
+        db.add(job)
+        await self._commit(db)
+        return job
+
+    async def get_ai_job(self, db: AsyncSession, job_id: UUID) -> Optional[AIJob]:
+        """
+Retrieve a background AI response job by its ID.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    job_id (UUID): Unique identifier of the job.
+
+Returns:
+    Optional[AIJob]: The job if found, otherwise None.
+"""
+        return await db.get(AIJob, job_id, populate_existing=True)
+
+    async def claim_ai_job(self, db: AsyncSession, lease: timedelta) -> Optional[AIJob]:
+        """
+Claim the oldest runnable queued job and mark it as running.
+
+The candidate row is locked with FOR UPDATE SKIP LOCKED, so concurrent workers, in this or any other
+process, each claim a different job without waiting on one another.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    lease (timedelta): How long the job may run before it is considered abandoned and requeued.
+
+Returns:
+    Optional[AIJob]: The claimed job, or None if no job is ready.
+"""
+        now = datetime.utcnow()
+        candidate = (
+            select(AIJob.id)
+            .where(AIJob.status == JobStatus.queued, AIJob.run_after <= now)
+            .order_by(AIJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(AIJob)
+            .where(AIJob.id == candidate)
+            .values(status=JobStatus.running, attempts=AIJob.attempts + 1, started_at=now,
+                    locked_until=now + lease)
+            .returning(AIJob)
+            .execution_options(synchronize_session=False)
+        )
+        job = await db.scalar(stmt)
+        # Queue methods commit directly: a claimed lease must be visible to other workers at once.
+        await db.commit()
+        return job
+
+    async def complete_ai_job(self, db: AsyncSession, job: AIJob, response: str, store_messages: bool = True,
+                              message_id: Optional[UUID] = None) -> Optional[AIJob]:
+        """
+Store the result of a running job and mark it as succeeded, in a single transaction.
+
+The follow-up reply (if any) and the AI response are stored as messages together with the job's new status,
+so a job is never marked as done without its messages, nor are its messages stored twice if it is retried.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    job (AIJob): The job, as returned by claim_ai_job().
+    response (str): The generated AI response.
+    store_messages (bool, optional): Whether to store the reply and response as new messages. Pass False when
+        they are already stored, e.g. by a concurrent request for the same conversation. Defaults to True.
+    message_id (UUID, optional): ID of the already stored AI message, when store_messages is False.
+
+Returns:
+    Optional[AIJob]: The completed job, or None if its lease was lost to another worker, in which case
+    nothing is stored.
+"""
+        if store_messages:
+            # Inserted with one statement when the transaction commits, or discarded if the lease was lost.
+            pending = [(job.user_reply, False)] if job.user_reply is not None else []
+            messages = self._new_messages(job.ticket_id, pending + [(response, True)])
+            db.add_all(messages)
+            message_id = messages[-1].id
+
+        completed = await db.scalar(
+            update(AIJob)
+            .where(AIJob.id == job.id, AIJob.status == JobStatus.running, AIJob.attempts == job.attempts)
+            .values(status=JobStatus.succeeded, result=response, message_id=message_id, error=None,
+                    locked_until=None, finished_at=datetime.utcnow())
+            .returning(AIJob)
+            .execution_options(synchronize_session=False)
+        )
+        if completed is None:
+            await db.rollback()
+            return None
+        # Committed directly, like every queue method, together with the lease check above.
+        await db.commit()
+        return completed
+
+    async def fail_ai_job(self, db: AsyncSession, job: AIJob, error: str, retry_at: Optional[datetime] = None):
+        """
+Record a failed attempt of a running job, either requeueing it or marking it as failed.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    job (AIJob): The job, as returned by claim_ai_job().
+    error (str): Description of the failure.
+    retry_at (datetime, optional): When to retry the job. If omitted, the job is marked as failed.
+"""
+        if retry_at is not None:
+            values = {"status": JobStatus.queued, "run_after": retry_at}
+        else:
+            values = {"status": JobStatus.failed, "finished_at": datetime.utcnow()}
+        await db.execute(
+            update(AIJob)
+            .where(AIJob.id == job.id, AIJob.status == JobStatus.running, AIJob.attempts == job.attempts)
+            .values(error=error, locked_until=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        # Queue method: releases the lease immediately.
+        await db.commit()
+
+    async def requeue_expired_ai_jobs(self, db: AsyncSession) -> int:
+        """
+Requeue running jobs whose lease expired, e.g. because their worker process died.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+
+Returns:
+    int: Number of requeued jobs.
+"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(AIJob)
+            .where(AIJob.status == JobStatus.running, AIJob.locked_until < now)
+            .values(status=JobStatus.queued, run_after=now, locked_until=None, error="Lease expired")
+            .execution_options(synchronize_session=False)
+        )
+        # Queue method: requeued jobs must be claimable by other workers at once.
+        await db.commit()
+        return result.rowcount
+
+    async def count_ai_jobs_by_status(self, db: AsyncSession) -> Dict[str, int]:
+        """
+Count background AI response jobs per status.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+
+Returns:
+    Dict[str, int]: Number of jobs for every status.
+"""
+        rows = await db.execute(select(AIJob.status, func.count()).group_by(AIJob.status))
+        counts = {status.value: 0 for status in JobStatus}
+        for status, count in rows:
+            counts[JobStatus(status).value] = count
+        return counts
+
+    async def get_canned_answers(self, db: AsyncSession) -> List[CannedAnswer]:
+        """
+Retrieve the whole canned answer bank, oldest first.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+
+Returns:
+    List[CannedAnswer]: Every canned answer.
+"""
+        return list(await db.scalars(select(CannedAnswer).order_by(CannedAnswer.created_at, CannedAnswer.id)))
+
+    async def create_canned_answer(self, db: AsyncSession, question: str, answer: str,
+                                   source: AnswerSource = AnswerSource.curated,
+                                   ticket_id: Optional[UUID] = None) -> CannedAnswer:
+        """
+Add a question and its answer to the canned answer bank.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    question (str): The question as customers ask it.
+    answer (str): The reply sent when a ticket matches the question.
+    source (AnswerSource, optional): Whether the answer was curated or learned. Defaults to curated.
+    ticket_id (UUID, optional): The resolved ticket a learned answer was taken from.
+
+Returns:
+    CannedAnswer: The stored canned answer.
+"""
+        now = datetime.utcnow()
+        canned_answer = CannedAnswer(id=uuid4(), question=question, answer=answer, source=source,
+                                     ticket_id=ticket_id, hits=0, created_at=now, updated_at=now)
+        db.add(canned_answer)
+        await self._commit(db)
+        return canned_answer
+
+    async def delete_canned_answer(self, db: AsyncSession, answer_id: UUID) -> bool:
+        """
+Remove an answer from the canned answer bank.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    answer_id (UUID): Unique identifier of the canned answer.
+
+Returns:
+    bool: True if the answer existed.
+"""
+        result = await db.execute(delete(CannedAnswer).where(CannedAnswer.id == answer_id))
+        await self._commit(db)
+        return result.rowcount > 0
+
+    async def record_canned_answer_hit(self, db: AsyncSession, answer_id: UUID):
+        """
+Count one use of a canned answer.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    answer_id (UUID): Unique identifier of the canned answer.
+"""
+        await db.execute(
+            update(CannedAnswer)
+            .where(CannedAnswer.id == answer_id)
+            .values(hits=CannedAnswer.hits + 1, last_used_at=datetime.utcnow())
+        )
+        await self._commit(db)
+
+    async def count_tickets_by_status(self, db: AsyncSession, since: Optional[datetime] = None,
+                                      until: Optional[datetime] = None) -> Dict[str, int]:
+        """
+Count tickets per status, optionally only those created in [since, until).
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    since (datetime, optional): Only tickets created at or after this time.
+    until (datetime, optional): Only tickets created before this time.
+
+Returns:
+    Dict[str, int]: Number of tickets for every status.
+"""
+        stmt = select(Ticket.status, func.count()).group_by(Ticket.status)
+        if since is not None:
+            stmt = stmt.where(Ticket.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(Ticket.created_at < until)
+        counts = {status.value: 0 for status in TicketStatus}
+        for status, count in await db.execute(stmt):
+            counts[TicketStatus(status).value] = count
+        return counts
+
+    async def count_messages_by_author(self, db: AsyncSession, since: Optional[datetime] = None,
+                                       until: Optional[datetime] = None) -> Dict[str, int]:
+        """
+Count AI and human messages, optionally only those created in [since, until).
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    since (datetime, optional): Only messages created at or after this time.
+    until (datetime, optional): Only messages created before this time.
+
+Returns:
+    Dict[str, int]: Message counts under "ai" and "human".
+"""
+        stmt = select(func.count().filter(Message.is_ai.is_(True)), func.count().filter(Message.is_ai.isnot(True)))
+        if since is not None:
+            stmt = stmt.where(Message.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(Message.created_at < until)
+        ai, human = (await db.execute(stmt)).one()
+        return {"ai": ai, "human": human}
+
+    async def get_daily_ticket_activity(self, db: AsyncSession, since: date, until: date) -> Dict[str, list]:
+        """
+Aggregate ticket activity per UTC day over [since, until] with one GROUP BY query per measure.
+
+Every query is a range scan over an indexed timestamp, so the cost follows the size of the range rather than
+of the tables. First responses are grouped by the day the ticket was created and found per ticket through
+the (ticket_id, created_at) index; resolutions are grouped by the day they happened.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    since (date): First day, inclusive.
+    until (date): Last day, inclusive.
+
+Returns:
+    Dict[str, list]: Rows of (day, ...) per measure: "tickets" (tickets_created), "messages" (ai_messages,
+    human_messages), "first_responses" (first_responses, first_response_seconds) and "resolutions"
+    (resolved, resolution_seconds).
+"""
+        start = datetime.combine(since, datetime.min.time())
+        end = datetime.combine(until + timedelta(days=1), datetime.min.time())
+
+        ticket_day = cast(Ticket.created_at, Date).label("day")
+        tickets = (
+            select(ticket_day, func.count().label("tickets_created"))
+            .where(Ticket.created_at >= start, Ticket.created_at < end)
+            .group_by(ticket_day)
+        )
+
+        message_day = cast(Message.created_at, Date).label("day")
+        messages = (
+            select(message_day,
+                   func.count().filter(Message.is_ai.is_(True)).label("ai_messages"),
+                   func.count().filter(Message.is_ai.isnot(True)).label("human_messages"))
+            .where(Message.created_at >= start, Message.created_at < end)
+            .group_by(message_day)
+        )
+
+        first_message_at = (
+            select(Message.created_at)
+            .where(Message.ticket_id == Ticket.id)
+            .order_by(Message.created_at)
+            .limit(1)
+            .scalar_subquery()
+        )
+        cohort = (
+            select(Ticket.created_at, first_message_at.label("first_at"))
+            .where(Ticket.created_at >= start, Ticket.created_at < end)
+            .subquery()
+        )
+        cohort_day = cast(cohort.c.created_at, Date).label("day")
+        first_responses = (
+            select(cohort_day,
+                   func.count(cohort.c.first_at).label("first_responses"),
+                   func.coalesce(func.sum(func.extract("epoch", cohort.c.first_at - cohort.c.created_at)), 0)
+                   .label("first_response_seconds"))
+            .group_by(cohort_day)
+        )
+
+        resolved_day = cast(Ticket.resolved_at, Date).label("day")
+        resolutions = (
+            select(resolved_day,
+                   func.count().label("resolved"),
+                   func.sum(func.extract("epoch", Ticket.resolved_at - Ticket.created_at)).label("resolution_seconds"))
+            .where(Ticket.resolved_at >= start, Ticket.resolved_at < end)
+            .group_by(resolved_day)
+        )
+
+        return {
+            "tickets": (await db.execute(tickets)).all(),
+            "messages": (await db.execute(messages)).all(),
+            "first_responses": (await db.execute(first_responses)).all(),
+            "resolutions": (await db.execute(resolutions)).all(),
+        }
+
+    async def get_daily_stats(self, db: AsyncSession, since: date, until: date) -> List[TicketDailyStats]:
+        """
+Retrieve the stored daily rollups for [since, until], oldest first.
+"""
+        stmt = (
+            select(TicketDailyStats)
+            .where(TicketDailyStats.day >= since, TicketDailyStats.day <= until)
+            .order_by(TicketDailyStats.day)
+        )
+        return list(await db.scalars(stmt))
+
+    async def save_daily_stats(self, db: AsyncSession, rows: List[dict]) -> int:
+        """
+Insert or overwrite daily rollups.
+
+Args:
+    db (AsyncSession): SQLAlchemy async database session.
+    rows (List[dict]): One dict per day with the TicketDailyStats columns.
+
+Returns:
+    int: Number of days written.
+"""
+        if not rows:
+            return 0
+        stmt = insert(TicketDailyStats).values([{**row, "refreshed_at": datetime.utcnow()} for row in rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TicketDailyStats.day],
+            set_={column: stmt.excluded[column] for column in rows[0] if column != "day"}
+                 | {"refreshed_at": stmt.excluded.refreshed_at},
+        )
+        await db.execute(stmt)
+        await self._commit(db)
+        return len(rows)
+
+    @asynccontextmanager
+    async def advisory_lock(self, key: int) -> AsyncIterator[None]:
+        """
+Hold a Postgres session-level advisory lock for the duration of the block.
+
+The lock is taken on a dedicated connection rather than the session's, because the session may commit and
+hand its connection back to the pool while the lock is still needed. Waiting for the lock only blocks this
+coroutine, not the event loop.
+
+Args:
+    key (int): The 64-bit lock key.
+"""
+        async with self.engine.connect() as connection:
+            try:
+                await connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+                await connection.commit()
+            except BaseException:
+                # The lock may have been granted after all; never hand such a connection back to the pool.
+                await connection.invalidate()
+                raise
+            try:
+                yield
+            finally:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                await connection.commit()
+
+    async def __aenter__(self):
+        self.db_session = self.get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type:
+                await self.db_session.rollback()
+                if issubclass(exc_type, Exception):
+                    return handle_db_error(exc_type, exc_val)
+            else:
+                await self.db_session.commit()
+        finally:
+            await self.db_session.close()
+
+
+def create_async_db_url() -> str:
+    """
+Constructs the async database URL from the same variables as create_db_url(), using DB_ASYNC_DIALECT
+(defaults to postgresql+asyncpg) as the driver.
+"""
+    dialect = os.getenv("DB_ASYNC_DIALECT", "postgresql+asyncpg")
+    return f"{dialect}://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+
+
+_async_engine_lock = threading.Lock()
+_async_engines: dict[str, AsyncEngine] = {}
+_async_session_factories: dict[str, async_sessionmaker] = {}
+_async_pool_counters: dict[str, PoolCounters] = {}
+
+
+def get_async_engine(db_url: Optional[str] = None) -> AsyncEngine:
+    """
+Returns the process-wide async engine for the given database URL, creating it on first use.
+Pool settings are shared with the sync engine (see get_pool_settings()).
+"""
+    db_url = db_url or create_async_db_url()
+    engine = _async_engines.get(db_url)
+    if engine is not None:
+        return engine
+
+    with _async_engine_lock:
+        engine = _async_engines.get(db_url)
+        if engine is None:
+            engine = create_async_engine(db_url, **get_pool_settings())
+            counters = PoolCounters()
+            counters.attach(engine.sync_engine)
+            instrument_engine(engine.sync_engine)
+            _async_pool_counters[db_url] = counters
+            _async_session_factories[db_url] = async_sessionmaker(
+                bind=engine, autoflush=False, expire_on_commit=False
+            )
+            _async_engines[db_url] = engine
+        return engine
+
+
+def get_async_session_factory(db_url: Optional[str] = None) -> async_sessionmaker:
+    """
+Returns the async session factory bound to the shared async engine for the given database URL.
+"""
+    db_url = db_url or create_async_db_url()
+    get_async_engine(db_url)
+    return _async_session_factories[db_url]
+
+
+async def dispose_async_engines():
+    """
+Disposes every engine created by get_async_engine() and forgets them.
+"""
+    engines = list(_async_engines.values())
+    with _async_engine_lock:
+        _async_engines.clear()
+        _async_session_factories.clear()
+        _async_pool_counters.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+def get_async_pool_stats() -> List[dict]:
+    """
+Returns pool occupancy and cumulative counters for every shared async engine.
+"""
+    return [
+        describe_pool(engine.sync_engine, _async_pool_counters.get(db_url))
+        for db_url, engine in list(_async_engines.items())
+    ]
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get an async database session."""
+    async with get_async_session_factory()() as db_session:
+        yield db_session
@@ -0,0 +1,225 @@
+"""
+Canned-answer fast path: tickets that repeat a known question are answered from the answer bank without
+calling Groq.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from utils.async_database import AsyncDB
+from utils.env import env_flag
+from utils.similar_tickets import HashingVectorizer, ticket_text
+
+# Trailing messages read to find a ticket's latest human message.
+MESSAGE_TAIL = 10
+
+
+@dataclass
+class CannedReply:
+    """
+A canned answer chosen for a ticket.
+
+Attributes:
+    answer_id (UUID): The matched canned answer.
+    content (str): The reply to send.
+    score (float): Cosine similarity between the ticket's latest question and the canned question.
+    previous_response (Optional[str]): The AI message the ticket currently ends with, if any.
+"""
+    answer_id: UUID
+    content: str
+    score: float
+    previous_response: Optional[str] = None
+
+
+class CannedAnswerBank:
+    """
+In-memory lexical index of the canned answer bank.
+
+Questions are embedded with the hashed term frequencies of the similar-ticket index, weighted by inverse
+document frequency over the bank and L2-normalized. A question matches when its cosine similarity reaches
+`min_score`; the threshold is deliberately high, since a wrong canned answer costs more than a Groq call.
+Terms the bank has never seen get the highest weight, so questions with extra detail fall through to Groq.
+
+The bank is reloaded from the canned_answers table every `refresh_seconds`, and on the next lookup after
+invalidate(). Lookup and Groq timings are recorded to report the bypass rate and the latency saved.
+
+Args:
+    min_score (float): Minimum cosine similarity for a match.
+    refresh_seconds (float): Maximum age of the in-memory bank.
+    dimensions (int): Number of hashed buckets per question.
+"""
+
+    def __init__(self, min_score: float = 0.8, refresh_seconds: float = 30.0, dimensions: int = 1024):
+        self.min_score = min_score
+        self.refresh_seconds = refresh_seconds
+        self.vectorizer = HashingVectorizer(dimensions)
+        self._answers: list[Tuple[UUID, str]] = []
+        self._matrix = np.zeros((0, dimensions), dtype=np.float32)
+        self._idf = np.ones(dimensions, dtype=np.float32)
+        self._loaded_at: Optional[float] = None
+        self._load_lock = asyncio.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    async def ensure_loaded(self, db: AsyncDB):
+        """
+Reloads the bank from the database if it is older than `refresh_seconds`.
+"""
+        if self._fresh():
+            return
+        async with self._load_lock:
+            if self._fresh():
+                return
+            answers = await db.get_canned_answers(db.db_session)
+            self.load([(answer.id, answer.question, answer.answer) for answer in answers])
+
+    def load(self, entries: Sequence[Tuple[UUID, str, str]]):
+        """
+Replaces the in-memory bank with (answer ID, question, answer) entries.
+"""
+        dimensions = self.vectorizer.dimensions
+        if entries:
+            frequencies = np.stack([self.vectorizer.term_frequencies(question) for _, question, _ in entries])
+        else:
+            frequencies = np.zeros((0, dimensions), dtype=np.float32)
+        df = np.count_nonzero(frequencies, axis=0)
+        idf = (np.log((1 + len(entries)) / (1 + df)) + 1).astype(np.float32)
+        matrix = frequencies * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+        self._answers, self._matrix, self._idf = [(answer_id, answer) for answer_id, _, answer in entries], matrix, idf
+        self._loaded_at = time.monotonic()
+
+    def match(self, text: str) -> Optional[Tuple[UUID, str, float]]:
+        """
+Returns the (answer ID, answer, score) of the best matching question, or None below `min_score`.
+"""
+        answers, matrix, idf = self._answers, self._matrix, self._idf
+        if not answers:
+            return None
+        query = self.vectorizer.term_frequencies(text) * idf
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+        scores = matrix @ (query / norm)
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.min_score:
+            return None
+        answer_id, answer = answers[best]
+        return answer_id, answer, score
+
+    def record_lookup(self, seconds: float, hit: bool):
+        self.lookups += 1
+        self.lookup_seconds += seconds
+        if hit:
+            self.hits += 1
+            if self.llm_calls:
+                self.saved_seconds += max(self.llm_seconds / self.llm_calls - seconds, 0.0)
+
+    def record_llm_latency(self, seconds: float):
+        """
+Records how long a response that fell through to Groq took, to estimate the latency a hit saves.
+"""
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+
+    def stats(self) -> dict:
+        return {
+            "answers": len(self._answers),
+            "min_score": self.min_score,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "bypass_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "average_lookup_seconds": self.lookup_seconds / self.lookups if self.lookups else 0.0,
+            "average_llm_seconds": self.llm_seconds / self.llm_calls if self.llm_calls else 0.0,
+            "latency_saved_seconds": self.saved_seconds,
+        }
+
+
+_bank: Optional[CannedAnswerBank] = None
+
+
+def canned_answers_enabled() -> bool:
+    return env_flag("CANNED_ANSWERS_ENABLED", True)
+
+
+def get_canned_answer_bank() -> CannedAnswerBank:
+    """
+Returns the process-wide CannedAnswerBank, configured by CANNED_ANSWERS_MIN_SCORE and
+CANNED_ANSWERS_REFRESH_SECONDS.
+"""
+    global _bank
+    if _bank is None:
+        _bank = CannedAnswerBank(
+            min_score=float(os.getenv("CANNED_ANSWERS_MIN_SCORE", "0.8")),
+            refresh_seconds=float(os.getenv("CANNED_ANSWERS_REFRESH_SECONDS", "30")),
+        )
+    return _bank
+
+
+async def find_canned_reply(db: AsyncDB, ticket_id: UUID) -> Optional[CannedReply]:
+    """
+Looks for a canned answer to a ticket's latest question.
+
+The question is the ticket's latest human message, ignoring trailing AI messages the same way a fresh AI
+response does, or the title and description if no one has written yet. A match is counted as a hit on the
+canned answer.
+
+Args:
+    db (AsyncDB): An open AsyncDB.
+    ticket_id (UUID): Unique identifier of the ticket.
+
+Returns:
+    Optional[CannedReply]: The canned reply, or None if the ticket should be answered by Groq.
+"""
+    if not canned_answers_enabled():
+        return None
+    bank = get_canned_answer_bank()
+    started = time.perf_counter()
+    await bank.ensure_loaded(db)
+    if not len(bank):
+        return None
+
+    ticket = await db.get_ticket(db.db_session, ticket_id)
+    if not ticket:
+        return None
+    messages = (await db.get_latest_messages_for_tickets(db.db_session, [ticket_id],
+                                                         limit_per_ticket=MESSAGE_TAIL))[ticket_id]
+    tail = len(messages)
+    previous_response = messages[-1].content if messages and messages[-1].is_ai else None
+    while messages and messages[-1].is_ai:
+        messages.pop()
+    if messages:
+        question = messages[-1].content
+    elif tail < MESSAGE_TAIL:
+        question = ticket_text(ticket.title, ticket.description)
+    else:
+        return None
+
+    match = bank.match(question)
+    bank.record_lookup(time.perf_counter() - started, hit=match is not None)
+    if match is None:
+        return None
+    answer_id, answer, score = match
+    await db.record_canned_answer_hit(db.db_session, answer_id)
+    return CannedReply(answer_id=answer_id, content=answer, score=score, previous_response=previous_response)
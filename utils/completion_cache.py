@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from utils.async_database import AsyncDB
+from utils.env import env_flag
+
+logger = logging.getLogger(__name__)
+
+
+def completion_key(model: str, messages: list[dict], options: Optional[dict] = None) -> str:
+    """
+Content hash identifying a completion request: the model plus the ordered prompt messages, including the
+system prompt, and any generation options such as max_tokens. Any change to the conversation, such as a new
+message on the ticket, produces a new key.
+"""
+    request = {"model": model, "messages": messages}
+    if options:
+        request["options"] = options
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CompletionCache:
+    """
+Two-tier cache of Groq completions keyed by completion_key().
+
+The first tier is an in-process LRU with a TTL. When `persist` is enabled, entries are also written to the
+completion_cache table, so they survive restarts and are shared by every worker; database hits are promoted
+into the in-process tier. Database errors are logged and treated as misses, never failing the request.
+
+Hit ratio and the Groq latency saved by hits (the original generation time of each served entry) are tracked.
+"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, max_size: int, ttl: float, persist: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, float, float]] = OrderedDict()
+        self._stores = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    async def get(self, key: str) -> Optional[str]:
+        completion = self._get_memory(key)
+        if completion is not None:
+            return completion
+
+        if self.persist:
+            entry = await self._get_db(key)
+            if entry is not None:
+                remaining = (entry.expires_at - datetime.utcnow()).total_seconds()
+                self._put_memory(key, entry.completion, entry.latency_seconds, min(self.ttl, remaining))
+                with self._lock:
+                    self.db_hits += 1
+                    self.saved_seconds += entry.latency_seconds
+                return entry.completion
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def put(self, key: str, model: str, completion: str, latency_seconds: float):
+        self._put_memory(key, completion, latency_seconds, self.ttl)
+        if not self.persist:
+            return
+
+        with self._lock:
+            self._stores += 1
+            purge = self._stores % self.PURGE_EVERY == 0
+        try:
+            async with AsyncDB() as db:
+                await db.store_cached_completion(
+                    db.db_session, key, model, completion, latency_seconds,
+                    expires_at=datetime.utcnow() + timedelta(seconds=self.ttl),
+                )
+                if purge:
+                    await db.delete_expired_completions(db.db_session)
+        except Exception:
+            logger.warning("Could not persist completion cache entry", exc_info=True)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            completion, expires_at, latency_seconds = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            self.saved_seconds += latency_seconds
+            return completion
+
+    def _put_memory(self, key: str, completion: str, latency_seconds: float, ttl: float):
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (completion, time.monotonic() + ttl, latency_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def _get_db(self, key: str):
+        try:
+            async with AsyncDB() as db:
+                return await db.get_cached_completion(db.db_session, key)
+        except Exception:
+            logger.warning("Could not read completion cache entry", exc_info=True)
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "persist": self.persist,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+def create_completion_cache() -> Optional[CompletionCache]:
+    """
+Builds a CompletionCache from GROQ_CACHE_ENABLED, GROQ_CACHE_SIZE, GROQ_CACHE_TTL and GROQ_CACHE_PERSIST,
+or returns None when caching is disabled.
+"""
+    if not env_flag("GROQ_CACHE_ENABLED", True):
+        return None
+    return CompletionCache(
+        max_size=int(os.getenv("GROQ_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("GROQ_CACHE_TTL", "3600")),
+        persist=env_flag("GROQ_CACHE_PERSIST", False),
+    )
@@ -1,16 +1,25 @@
 import os
+import threading
 from datetime import datetime, timedelta
-from typing import List, Optional
-from uuid import UUID
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event, select, true
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased, sessionmaker, Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from utils.db_models.main import User, Ticket, Message, Token
+from utils.env import env_flag
 from utils.exception_handler import handle_db_error
-from utils.security import pwd_context, create_access_token
+from utils.metrics import instrument_db_methods, instrument_engine
+from utils.pagination import KeysetPaginator, Page
+from utils.principal_cache import get_principal_cache
+from utils.security import pwd_context, create_access_token, verify_and_update_password
+from utils.token_denylist import get_token_denylist
 
 
+@instrument_db_methods
 class DB:
     """
 Database access layer for user, ticket, message, and token management.
@@ -20,10 +29,10 @@ as well as session management and error handling using SQLAlchemy and internal u
 Supports context management for safe transaction handling.
 """
 
-    def __init__(self, db_url: str):
-        self.db_url = db_url
-        self.engine = create_engine(self.db_url, pool_size=10, max_overflow=20)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+    def __init__(self, db_url: Optional[str] = None):
+        self.db_url = db_url or create_db_url()
+        self.engine = get_engine(self.db_url)
+        self.SessionLocal = get_session_factory(self.db_url)
 
     def get_session(self) -> Session:
         return self.SessionLocal()
@@ -61,6 +70,18 @@ Returns:
 """
         return db.query(User).filter(User.id == user_id).first()
 
+    def get_all_users(self, db: Session) -> List[User]:
+        """
+Retrieve all users.
+
+Args:
+    db (Session): SQLAlchemy database session.
+
+Returns:
+    List[User]: All User objects.
+"""
+        return db.query(User).all()
+
     def get_user_by_email(self, db: Session, email: str) -> Optional[User]:
         """
 Retrieve a user by their email address.
@@ -85,10 +106,16 @@ Args:
 
 Returns:
     Optional[User]: The authenticated User object if credentials are valid, otherwise None.
-    Updates the user's last_login timestamp on successful authentication.
+    Updates the user's last_login timestamp on successful authentication, and rehashes the password
+    if it was stored with a different bcrypt cost.
 """
         user = self.get_user_by_email(db, email)
-        if user and pwd_context.verify(password, user.hashed_password):
+        if not user:
+            return None
+        verified, new_hash = verify_and_update_password(password, user.hashed_password)
+        if verified:
+            if new_hash:
+                user.hashed_password = new_hash
             user.last_login = datetime.utcnow()
             db.commit()
             db.refresh(user)
@@ -107,6 +134,7 @@ Args:
         if user:
             db.delete(user)
             db.commit()
+            get_principal_cache().invalidate_user(user_id)
 
     def create_ticket(self, db: Session, user_id: UUID, title: str, description: str, status: str = "open") -> Ticket:
         """
@@ -128,7 +156,8 @@ Returns:
         db.refresh(new_ticket)
         return new_ticket
 
-    def get_tickets_by_user(self, db: Session, user_id: UUID, page: int = 1, page_size: int = 10) -> List[Ticket]:
+    def get_tickets_by_user(self, db: Session, user_id: UUID, page: int = 1, page_size: int = 10,
+                            cursor: Optional[str] = None) -> Page:
         """
 Retrieve a paginated list of tickets for a specific user.
 
@@ -137,14 +166,15 @@ Args:
     user_id (UUID): Unique identifier of the user.
     page (int, optional): Page number for pagination. Defaults to 1.
     page_size (int, optional): Number of tickets per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
 
 Returns:
-    List[Ticket]: A list of Ticket objects associated with the user.
+    Page[Ticket]: Ticket objects associated with the user, ordered by (created_at, id), with next/prev cursors.
 """
-        offset = (page - 1) * page_size
-        return db.query(Ticket).filter(Ticket.user_id == user_id).offset(offset).limit(page_size).all()
+        paginator = KeysetPaginator(Ticket.created_at, Ticket.id, page_size, cursor=cursor, page=page)
+        return paginator.to_page(paginator.apply(db.query(Ticket).filter(Ticket.user_id == user_id)).all())
 
-    def get_all_tickets(self, db: Session, page: int = 1, page_size: int = 10) -> List[Ticket]:
+    def get_all_tickets(self, db: Session, page: int = 1, page_size: int = 10, cursor: Optional[str] = None) -> Page:
         """
 Retrieve a paginated list of all tickets.
 
@@ -152,12 +182,74 @@ Args:
     db (Session): SQLAlchemy database session.
     page (int, optional): Page number for pagination. Defaults to 1.
     page_size (int, optional): Number of tickets per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
 
 Returns:
-    List[Ticket]: A list of Ticket objects for the specified page.
+    Page[Ticket]: Ticket objects for the requested page, ordered by (created_at, id), with next/prev cursors.
 """
-        offset = (page - 1) * page_size
-        return db.query(Ticket).offset(offset).limit(page_size).all()
+        paginator = KeysetPaginator(Ticket.created_at, Ticket.id, page_size, cursor=cursor, page=page)
+        return paginator.to_page(paginator.apply(db.query(Ticket)).all())
+
+    def get_latest_messages_for_tickets(self, db: Session, ticket_ids: List[UUID],
+                                    limit_per_ticket: int = 20) -> Dict[UUID, List[Message]]:
+        """
+Retrieve the latest messages of several tickets in a single query.
+
+Uses a LATERAL join so each ticket contributes at most `limit_per_ticket` rows, read straight from the
+(ticket_id, created_at, id) index, however many messages the ticket has.
+
+Args:
+    db (Session): SQLAlchemy database session.
+    ticket_ids (List[UUID]): Tickets whose messages should be loaded.
+    limit_per_ticket (int, optional): Maximum number of (most recent) messages per ticket. Defaults to 20.
+
+Returns:
+    Dict[UUID, List[Message]]: Messages per ticket ID in chronological order; every requested ticket is present.
+"""
+        messages_by_ticket = {ticket_id: [] for ticket_id in ticket_ids}
+        if not ticket_ids:
+            return messages_by_ticket
+
+        latest = (
+            select(Message)
+            .where(Message.ticket_id == Ticket.id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit_per_ticket)
+            .lateral()
+        )
+        latest_message = aliased(Message, latest)
+        stmt = (
+            select(latest_message)
+            .select_from(Ticket)
+            .join(latest, true())
+            .where(Ticket.id.in_(ticket_ids))
+            .order_by(latest.c.ticket_id, latest.c.created_at, latest.c.id)
+        )
+        rows = db.scalars(stmt)
+        for message in rows:
+            messages_by_ticket[message.ticket_id].append(message)
+        return messages_by_ticket
+
+    def get_all_tickets_with_messages(self, db: Session, page: int = 1, page_size: int = 10,
+                                  cursor: Optional[str] = None, messages_per_ticket: int = 20) -> Page:
+        """
+Retrieve a page of tickets with their latest messages attached, using two queries in total.
+
+Args:
+    db (Session): SQLAlchemy database session.
+    page (int, optional): Page number for pagination. Defaults to 1.
+    page_size (int, optional): Number of tickets per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+    messages_per_ticket (int, optional): Maximum number of (most recent) messages per ticket. Defaults to 20.
+
+Returns:
+    Page[Ticket]: Tickets whose `messages` hold their latest messages in chronological order.
+"""
+        tickets = self.get_all_tickets(db, page=page, page_size=page_size, cursor=cursor)
+        messages = self.get_latest_messages_for_tickets(db, [ticket.id for ticket in tickets], messages_per_ticket)
+        for ticket in tickets:
+            set_committed_value(ticket, "messages", messages[ticket.id])
+        return tickets
 
     def create_message(self, db: Session, ticket_id: UUID, content: str, is_ai: bool = False) -> Message:
         """
@@ -178,7 +270,8 @@ Returns:
         db.refresh(new_message)
         return new_message
 
-    def get_messages_by_ticket(self, db: Session, ticket_id: UUID, page: int = 1, page_size: int = 10) -> List[Message]:
+    def get_messages_by_ticket(self, db: Session, ticket_id: UUID, page: int = 1, page_size: int = 10,
+                               cursor: Optional[str] = None) -> Page:
         """
 Retrieve a paginated list of messages for a specific ticket.
 
@@ -187,17 +280,21 @@ Args:
     ticket_id (UUID): Unique identifier of the ticket.
     page (int, optional): Page number for pagination. Defaults to 1.
     page_size (int, optional): Number of messages per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
 
 Returns:
-    List[Message]: A list of Message objects associated with the ticket.
+    Page[Message]: Message objects of the ticket, ordered by (created_at, id), with next/prev cursors.
 """
-        offset = (page - 1) * page_size
-        return db.query(Message).filter(Message.ticket_id == ticket_id).offset(offset).limit(page_size).all()
+        paginator = KeysetPaginator(Message.created_at, Message.id, page_size, cursor=cursor, page=page)
+        return paginator.to_page(paginator.apply(db.query(Message).filter(Message.ticket_id == ticket_id)).all())
 
     def create_token_for_user(self, db: Session, user_id: UUID, expires_delta: timedelta = timedelta(hours=1)) -> Token:
         """
 Create and store a new access token for a user.
 
+The token's row ID is embedded as its `jti` claim, so revocation can be checked against the TokenDenylist
+without a database lookup.
+
 Args:
     db (Session): SQLAlchemy database session.
     user_id (UUID): Unique identifier of the user.
@@ -206,9 +303,11 @@ Args:
 Returns:
     Token: The created Token object associated with the user.
 """
-        access_token = create_access_token(data={"sub": str(user_id)}, expires_delta=expires_delta)
+        token_id = uuid4()
+        access_token = create_access_token(data={"sub": str(user_id), "jti": str(token_id)},
+                                           expires_delta=expires_delta)
         expires_at = datetime.utcnow() + expires_delta
-        new_token = Token(user_id=user_id, token=access_token, expires_at=expires_at)
+        new_token = Token(id=token_id, user_id=user_id, token=access_token, expires_at=expires_at)
         db.add(new_token)
         db.commit()
         db.refresh(new_token)
@@ -235,6 +334,9 @@ Returns:
         """
 Revoke a token by setting its revoked_at timestamp to the current UTC time.
 
+The token is added to this process's TokenDenylist straight away; other processes pick it up on their next
+denylist refresh.
+
 Args:
     db (Session): SQLAlchemy database session.
     token_id (UUID): Unique identifier of the token to revoke.
@@ -244,9 +346,25 @@ Args:
             token.revoked_at = datetime.utcnow()
             db.commit()
             db.refresh(token)
+            get_principal_cache().invalidate_token(token.token)
+            get_token_denylist().add(token.id, token.expires_at)
+
+    def get_token_with_user(self, db: Session, token: str) -> Optional[Tuple[Token, User]]:
+        """
+Retrieve a stored token together with its user, using the unique index on the token string.
+
+Args:
+    db (Session): SQLAlchemy database session.
+    token (str): The encoded access token.
 
-    def get_ticket_with_messages(self, db: Session, ticket_id: UUID, page: int = 1, page_size: int = 10) -> Optional[
-        Ticket]:
+Returns:
+    Optional[Tuple[Token, User]]: The Token and its User if the token is known, otherwise None.
+"""
+        row = db.query(Token, User).join(User, Token.user_id == User.id).filter(Token.token == token).first()
+        return (row[0], row[1]) if row else None
+
+    def get_ticket_with_messages(self, db: Session, ticket_id: UUID, page: int = 1, page_size: int = 10,
+                                 cursor: Optional[str] = None) -> Optional[Ticket]:
         """
 Retrieve a ticket by its ID and attach a paginated list of its messages.
 
@@ -255,13 +373,16 @@ Args:
     ticket_id (UUID): Unique identifier of the ticket.
     page (int, optional): Page number for message pagination. Defaults to 1.
     page_size (int, optional): Number of messages per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
 
 Returns:
     Optional[Ticket]: The Ticket object with its messages if found, otherwise None.
 """
         ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
         if ticket:
-            ticket.messages = self.get_messages_by_ticket(db, ticket_id, page, page_size)
+            # Attach the page without marking the relationship dirty, otherwise the
+            # delete-orphan cascade would remove every message outside the page on commit.
+            set_committed_value(ticket, "messages", self.get_messages_by_ticket(db, ticket_id, page, page_size, cursor))
         return ticket
 
     def get_ticket(self, db: Session, ticket_id: UUID) -> Optional[Ticket]:
@@ -282,17 +403,25 @@ Returns:
             db: Session,
             ticket_id: UUID,
             page: int = 1,
-            page_size: int = 10
-    ) -> List[Message]:
-        offset = (page - 1) * page_size
-        return (
-            db.query(Message)
-            .filter(Message.ticket_id == ticket_id)
-            .filter(Message.is_ai == True)
-            .offset(offset)
-            .limit(page_size)
-            .all()
-        )
+            page_size: int = 10,
+            cursor: Optional[str] = None
+    ) -> Page:
+        """
+Retrieve a page of AI-generated messages for a ticket, ordered by (created_at, id).
+
+Args:
+    db (Session): SQLAlchemy database session.
+    ticket_id (UUID): Unique identifier of the ticket.
+    page (int, optional): Page number for pagination. Defaults to 1.
+    page_size (int, optional): Number of messages per page. Defaults to 10.
+    cursor (str, optional): Opaque cursor from a previous page; takes precedence over page.
+
+Returns:
+    Page[Message]: AI Message objects of the ticket, with next/prev cursors.
+"""
+        paginator = KeysetPaginator(Message.created_at, Message.id, page_size, cursor=cursor, page=page)
+        query = db.query(Message).filter(Message.ticket_id == ticket_id).filter(Message.is_ai == True)
+        return paginator.to_page(paginator.apply(query).all())
 
 
 
@@ -301,12 +430,14 @@ Returns:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
-            self.db_session.rollback()
-            return handle_db_error(exc_type, exc_val)
-        else:
-            self.db_session.commit()
-        self.db_session.close()
+        try:
+            if exc_type:
+                self.db_session.rollback()
+                return handle_db_error(exc_type, exc_val)
+            else:
+                self.db_session.commit()
+        finally:
+            self.db_session.close()
 
 
 def create_db_url() -> str:
@@ -316,9 +447,165 @@ Constructs and returns a database URL string using environment variables for dia
     return f"{os.getenv('DB_DIALECT')}://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
 
 
+def get_pool_settings() -> dict:
+    """
+Returns the connection pool settings shared by every engine in the process.
+
+Values are read from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and DB_POOL_PRE_PING.
+"""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": env_flag("DB_POOL_PRE_PING", True),
+    }
+
+
+class PoolCounters:
+    """
+Cumulative connection pool event counters for a single engine.
+
+Attributes:
+    connects (int): Number of new DBAPI connections opened.
+    checkouts (int): Number of connections handed out by the pool.
+    checkins (int): Number of connections returned to the pool.
+    invalidations (int): Number of connections invalidated (e.g. failed pre-ping).
+    overflow_checkouts (int): Checkouts that had to use an overflow connection.
+    max_checked_out (int): Highest number of simultaneously checked-out connections seen.
+"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.overflow_checkouts = 0
+        self.max_checked_out = 0
+
+    def attach(self, engine: Engine):
+        pool = engine.pool
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            checked_out = pool.checkedout()
+            with self._lock:
+                self.checkouts += 1
+                if pool.overflow() > 0:
+                    self.overflow_checkouts += 1
+                self.max_checked_out = max(self.max_checked_out, checked_out)
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "overflow_checkouts": self.overflow_checkouts,
+                "max_checked_out": self.max_checked_out,
+            }
+
+
+_engine_lock = threading.Lock()
+_engines: dict[str, Engine] = {}
+_session_factories: dict[str, sessionmaker] = {}
+_pool_counters: dict[str, PoolCounters] = {}
+
+
+def get_engine(db_url: Optional[str] = None) -> Engine:
+    """
+Returns the process-wide engine for the given database URL, creating it on first use.
+
+Args:
+    db_url (str, optional): Database URL. Defaults to the URL built by create_db_url().
+
+Returns:
+    Engine: The shared SQLAlchemy engine.
+"""
+    db_url = db_url or create_db_url()
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+
+    with _engine_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url, **get_pool_settings())
+            counters = PoolCounters()
+            counters.attach(engine)
+            instrument_engine(engine)
+            _pool_counters[db_url] = counters
+            _session_factories[db_url] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            _engines[db_url] = engine
+        return engine
+
+
+def get_session_factory(db_url: Optional[str] = None) -> sessionmaker:
+    """
+Returns the session factory bound to the shared engine for the given database URL.
+"""
+    db_url = db_url or create_db_url()
+    get_engine(db_url)
+    return _session_factories[db_url]
+
+
+def dispose_engines():
+    """
+Disposes every engine created by get_engine() and forgets them, closing all pooled connections.
+"""
+    with _engine_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _session_factories.clear()
+        _pool_counters.clear()
+
+
+def get_pool_stats() -> List[dict]:
+    """
+Returns current pool occupancy and cumulative checkout/overflow counters for every shared engine.
+
+Returns:
+    List[dict]: One entry per engine with its configured limits, live gauges and counters.
+"""
+    return [describe_pool(engine, _pool_counters.get(db_url)) for db_url, engine in list(_engines.items())]
+
+
+def describe_pool(engine: Engine, counters: Optional[PoolCounters] = None) -> dict:
+    """
+Summarizes the pool of a (sync) engine together with its cumulative counters.
+"""
+    pool = engine.pool
+    return {
+        "database": engine.url.render_as_string(hide_password=True),
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        **(counters.as_dict() if counters else {}),
+    }
+
+
 def get_db() -> Session:
     """Dependency to get the database session."""
-    db_session = DB(db_url=create_db_url()).get_session()
+    db_session = get_session_factory()()
     try:
         yield db_session
     finally:
@@ -1,14 +1,18 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Enum, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Enum, UniqueConstraint, Index, text, Float, Integer, \
+    Computed, Date
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 from sqlalchemy.ext.declarative import declarative_base
 
-from src.models.enums import Role, TicketStatus
+from src.models.enums import Role, TicketStatus, JobStatus, AnswerSource, Permission, RolePermissions
 
 Base = declarative_base()
 
+# Text search configuration of the search_vector columns; queries must use the same one to hit the GIN indexes.
+SEARCH_CONFIG = "english"
+
 
 class User(Base):
     __tablename__ = "users"
@@ -24,6 +28,9 @@ class User(Base):
     tokens = relationship("Token", back_populates="user", cascade="all, delete-orphan")
     tickets = relationship("Ticket", back_populates="user")
 
+    def has_permission(self, permission: Permission) -> bool:
+        return permission in RolePermissions.get(self.role, set())
+
 class Token(Base):
     __tablename__ = "tokens"
 
@@ -36,6 +43,12 @@ class Token(Base):
 
     user = relationship("User", back_populates="tokens")
 
+    __table_args__ = (
+        Index("ix_tokens_user_id", "user_id"),
+        Index("ix_tokens_expires_at", "expires_at"),
+        Index("ix_tokens_revoked_at", "revoked_at", postgresql_where=text("revoked_at IS NOT NULL")),
+    )
+
 
 class Ticket(Base):
     __tablename__ = "tickets"
@@ -46,10 +59,23 @@ class Ticket(Base):
     status = Column(Enum(TicketStatus), default="open")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    resolved_at = Column(DateTime, nullable=True)
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     user = relationship("User", back_populates="tickets")
     messages = relationship("Message", back_populates="ticket", cascade="all, delete-orphan")
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+        persisted=True)))
+
+    __table_args__ = (
+        Index("ix_tickets_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_tickets_status_created_at", "status", "created_at"),
+        Index("ix_tickets_created_at", "created_at", "id"),
+        Index("ix_tickets_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_tickets_resolved_at", "resolved_at", postgresql_where=text("resolved_at IS NOT NULL")),
+    )
 
 
 class Message(Base):
@@ -62,3 +88,92 @@ class Message(Base):
 
     ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
     ticket = relationship("Ticket", back_populates="messages")
+    search_vector = deferred(Column(TSVECTOR, Computed(f"to_tsvector('{SEARCH_CONFIG}', coalesce(content, ''))",
+                                                       persisted=True)))
+
+    __table_args__ = (
+        Index("ix_messages_ticket_id_created_at", "ticket_id", "created_at", "id"),
+        Index("ix_messages_ai_ticket_id_created_at", "ticket_id", "created_at", "id",
+              postgresql_where=text("is_ai = true")),
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_messages_created_at", "created_at"),
+    )
+
+
+class CompletionCacheEntry(Base):
+    __tablename__ = "completion_cache"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    completion = Column(String, nullable=False)
+    latency_seconds = Column(Float, nullable=False, default=0.0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_completion_cache_expires_at", "expires_at"),
+    )
+
+
+class TicketSummary(Base):
+    __tablename__ = "ticket_summaries"
+
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), primary_key=True)
+    summary = Column(String, nullable=False)
+    summarized_until = Column(DateTime, nullable=False)
+    summarized_until_id = Column(UUID(as_uuid=True), nullable=False)
+    message_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
+    requested_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_reply = Column(String, nullable=True)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    result = Column(String, nullable=True)
+    message_id = Column(UUID(as_uuid=True), nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ai_jobs_queued_run_after", "run_after", postgresql_where=text("status = 'queued'")),
+        Index("ix_ai_jobs_running_locked_until", "locked_until", postgresql_where=text("status = 'running'")),
+        Index("ix_ai_jobs_ticket_id", "ticket_id"),
+    )
+
+
+class CannedAnswer(Base):
+    __tablename__ = "canned_answers"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    question = Column(String, nullable=False)
+    answer = Column(String, nullable=False)
+    source = Column(Enum(AnswerSource), nullable=False, default=AnswerSource.curated)
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=True)
+    hits = Column(Integer, nullable=False, default=0)
+    last_used_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TicketDailyStats(Base):
+    __tablename__ = "ticket_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    tickets_created = Column(Integer, nullable=False, default=0)
+    ai_messages = Column(Integer, nullable=False, default=0)
+    human_messages = Column(Integer, nullable=False, default=0)
+    first_responses = Column(Integer, nullable=False, default=0)
+    first_response_seconds = Column(Float, nullable=False, default=0.0)
+    resolved = Column(Integer, nullable=False, default=0)
+    resolution_seconds = Column(Float, nullable=False, default=0.0)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,12 @@
+import os
+
+
+def env_flag(name: str, default: bool) -> bool:
+    """
+Reads an on/off environment variable. "1", "true", "yes" and "on" (in any case) mean on, any other value
+means off, and `default` applies when the variable is unset.
+"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -1,3 +1,4 @@
+import groq
 import requests
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError, NoResultFound, SQLAlchemyError
@@ -14,6 +15,9 @@ def handle_db_error(exc_type, exc_val):
     Returns:
     - Raises a FastAPI HTTPException with status code and detailed error message.
     """
+    if isinstance(exc_val, HTTPException):
+        raise exc_val
+
     if isinstance(exc_val, IntegrityError):
         detail = "Database constraint error."
         if "unique" in str(exc_val.orig):
@@ -28,13 +32,16 @@ def handle_db_error(exc_type, exc_val):
         raise HTTPException(status_code=500, detail=f"Internal server error with the database. {exc_val}")
 
     else:
-        raise HTTPException(status_code=int(exc_val.status_code), detail=str(exc_val))
+        raise HTTPException(status_code=int(getattr(exc_val, "status_code", 500)), detail=str(exc_val))
 
 
 def handle_request_error(exc_type, exc_val):
     """
     Handles request errors and maps them to HTTP exceptions with custom messages.
 
+    Covers both `requests` errors and errors raised by the Groq client. A rate limit that persists after the
+    Groq scheduler's retries is passed on as a 429 with the upstream Retry-After header, if any.
+
     Args:
     - exc_type: The type of exception raised.
     - exc_val: The actual exception instance.
@@ -48,33 +55,74 @@ def handle_request_error(exc_type, exc_val):
     if isinstance(exc_val, requests.exceptions.HTTPError):
         response = exc_val.response
         code = response.status_code if response else 500
+        raise_for_status(code, response.text if response else "No response")
 
-        if code == 400:
-            raise HTTPException(status_code=400, detail="Bad request: Check your parameters.")
-        elif code == 401:
-            raise HTTPException(status_code=401, detail="Unauthorized: Invalid or missing API key.")
-        elif code == 403:
-            raise HTTPException(status_code=403, detail="Forbidden: You don’t have access to this resource.")
-        elif code == 404:
-            raise HTTPException(status_code=404, detail="Not found: Resource does not exist.")
-        elif code == 409:
-            raise HTTPException(status_code=409, detail="Conflict: Duplicate or conflicting resource.")
-        elif code == 429:
-            raise HTTPException(status_code=429, detail="Too Many Requests: Rate limit exceeded.")
-        elif code == 500:
-            raise HTTPException(status_code=500, detail="Internal server error: Remote server issue.")
-        elif code == 502:
-            raise HTTPException(status_code=502, detail="Bad Gateway: Groq's server is down or unreachable.")
-        elif code == 503:
-            raise HTTPException(status_code=503, detail="Service Unavailable: Remote service is temporarily offline.")
-        else:
-            raise HTTPException(status_code=code, detail=f"Unexpected error from remote API: {response.text if response else 'No response'}")
-
-    elif isinstance(exc_val, requests.exceptions.ConnectionError):
-        raise HTTPException(status_code=503, detail="Connection error: Unable to reach the API.")
-    elif isinstance(exc_val, requests.exceptions.Timeout):
+    elif isinstance(exc_val, groq.APIStatusError):
+        retry_after = exc_val.response.headers.get("retry-after")
+        raise_for_status(exc_val.status_code, exc_val.message,
+                         headers={"Retry-After": retry_after} if retry_after else None)
+
+    elif isinstance(exc_val, (requests.exceptions.Timeout, groq.APITimeoutError)):
         raise HTTPException(status_code=504, detail="Timeout error: API took too long to respond.")
+    elif isinstance(exc_val, (requests.exceptions.ConnectionError, groq.APIConnectionError)):
+        raise HTTPException(status_code=503, detail="Connection error: Unable to reach the API.")
     elif isinstance(exc_val, requests.exceptions.RequestException):
         raise HTTPException(status_code=500, detail="Unexpected request error occurred.")
     else:
-        raise HTTPException(status_code=500, detail=f"Unhandled exception: {str(exc_val)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Unhandled exception: {str(exc_val)}")
+
+
+def request_error_category(exc_val) -> str:
+    """
+    Names the category handle_request_error() would map an error to, for metrics.
+
+    Returns:
+    - The remote status code for API status errors, otherwise "timeout", "connection", "request" or "other".
+    """
+    if isinstance(exc_val, HTTPException):
+        return str(exc_val.status_code)
+    if isinstance(exc_val, requests.exceptions.HTTPError):
+        return str(exc_val.response.status_code) if exc_val.response is not None else "500"
+    if isinstance(exc_val, groq.APIStatusError):
+        return str(exc_val.status_code)
+    if isinstance(exc_val, (requests.exceptions.Timeout, groq.APITimeoutError)):
+        return "timeout"
+    if isinstance(exc_val, (requests.exceptions.ConnectionError, groq.APIConnectionError)):
+        return "connection"
+    if isinstance(exc_val, requests.exceptions.RequestException):
+        return "request"
+    return "other"
+
+
+def raise_for_status(code: int, text: str, headers: dict = None):
+    """
+    Maps an error status returned by a remote API onto an HTTPException.
+
+    Args:
+    - code: The remote status code.
+    - text: The remote error message, used for unexpected status codes.
+    - headers: Headers to pass on to the client, e.g. Retry-After.
+
+    Raises:
+    - FastAPI HTTPException with the matching status code and detail.
+    """
+    if code == 400:
+        raise HTTPException(status_code=400, detail="Bad request: Check your parameters.")
+    elif code == 401:
+        raise HTTPException(status_code=401, detail="Unauthorized: Invalid or missing API key.")
+    elif code == 403:
+        raise HTTPException(status_code=403, detail="Forbidden: You don’t have access to this resource.")
+    elif code == 404:
+        raise HTTPException(status_code=404, detail="Not found: Resource does not exist.")
+    elif code == 409:
+        raise HTTPException(status_code=409, detail="Conflict: Duplicate or conflicting resource.")
+    elif code == 429:
+        raise HTTPException(status_code=429, detail="Too Many Requests: Rate limit exceeded.", headers=headers)
+    elif code == 500:
+        raise HTTPException(status_code=500, detail="Internal server error: Remote server issue.")
+    elif code == 502:
+        raise HTTPException(status_code=502, detail="Bad Gateway: Groq's server is down or unreachable.")
+    elif code == 503:
+        raise HTTPException(status_code=503, detail="Service Unavailable: Remote service is temporarily offline.")
+    else:
+        raise HTTPException(status_code=code, detail=f"Unexpected error from remote API: {text}")
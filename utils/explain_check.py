@@ -0,0 +1,167 @@
+"""
+Runs EXPLAIN on the SQL issued by each AsyncDB read method and reports whether the hot tables are read through
+an index.
+
+Usage:
+    python -m utils.explain_check [--allow-seqscan] [--json]
+
+AsyncDB serves every route, so its methods are the ones checked; statements are captured on the async engine.
+Sample keys (a user, a ticket with messages, a token) are taken from the configured database, so it needs at
+least one ticket with a message. By default sequential scans are disabled for the check, which makes the
+planner pick an index whenever one is usable; that keeps the verdict independent of how small a development
+database is. Pass --allow-seqscan to see the plans the planner would choose on its own.
+
+The check runs in one transaction that is rolled back at the end. Methods that commit only release a savepoint,
+so nothing they write is kept.
+
+Exits with status 1 if any checked method still reads users, tickets, messages, tokens or ai_jobs sequentially.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from contextlib import aclosing, contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from utils.async_database import AsyncDB, dispose_async_engines
+from utils.db_models.main import Message, Ticket, Token, User
+
+CHECKED_TABLES = {"users", "tickets", "messages", "tokens", "ai_jobs"}
+# EXPLAIN without ANALYZE only plans a statement, so writes are explained too.
+EXPLAINED_STATEMENTS = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+@contextmanager
+def capture_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def walk_plan(node, found):
+    relation = node.get("Relation Name")
+    found.append({
+        "node": node["Node Type"],
+        "relation": relation,
+        "index": node.get("Index Name"),
+    })
+    for child in node.get("Plans", []):
+        walk_plan(child, found)
+    return found
+
+
+async def explain(connection, statement, parameters):
+    raw = await connection.get_raw_connection()
+    plan = await raw.driver_connection.fetchval("EXPLAIN (FORMAT JSON) " + statement, *parameters)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return walk_plan(plan[0]["Plan"], [])
+
+
+async def first(rows):
+    async with aclosing(rows):
+        async for row in rows:
+            return row
+
+
+async def build_checks(db, session):
+    ticket = await session.scalar(select(Ticket).join(Message, Message.ticket_id == Ticket.id).limit(1))
+    if ticket is None:
+        raise SystemExit("explain_check needs at least one ticket with a message in the database")
+    user = await session.get(User, ticket.user_id)
+    token = await session.scalar(select(Token).limit(1))
+    first_messages = await db.get_messages_by_ticket(session, ticket.id, page_size=1)
+    first_tickets = await db.get_tickets_by_user(session, user.id, page_size=1)
+
+    checks = {
+        "get_user_by_id": lambda: db.get_user_by_id(session, user.id),
+        "get_user_by_email": lambda: db.get_user_by_email(session, user.email),
+        "get_ticket": lambda: db.get_ticket(session, ticket.id),
+        "get_tickets_by_user": lambda: db.get_tickets_by_user(session, user.id),
+        "get_tickets_by_user (cursor)": lambda: db.get_tickets_by_user(session, user.id,
+                                                                       cursor=first_tickets.next_cursor),
+        "get_all_tickets": lambda: db.get_all_tickets(session),
+        "get_messages_by_ticket": lambda: db.get_messages_by_ticket(session, ticket.id),
+        "get_messages_by_ticket (cursor)": lambda: db.get_messages_by_ticket(session, ticket.id,
+                                                                             cursor=first_messages.next_cursor),
+        "get_ticket_with_messages": lambda: db.get_ticket_with_messages(session, ticket.id),
+        "get_groq_chats_by_ticket_id": lambda: db.get_groq_chats_by_ticket_id(session, ticket.id),
+        "get_tokens_by_user": lambda: db.get_tokens_by_user(session, user.id),
+        "get_latest_messages_for_tickets": lambda: db.get_latest_messages_for_tickets(session, [ticket.id]),
+        "get_all_tickets_with_messages": lambda: db.get_all_tickets_with_messages(session),
+        "claim_ai_job": lambda: db.claim_ai_job(session, timedelta(minutes=5)),
+        "stream_tickets_with_messages": lambda: first(db.stream_tickets_with_messages(session)),
+        "search_tickets": lambda: db.search_tickets(session, ticket.title),
+        "search_tickets (user)": lambda: db.search_tickets(session, ticket.title, user_id=user.id),
+        "get_daily_ticket_activity": lambda: db.get_daily_ticket_activity(session, date.today() - timedelta(days=7),
+                                                                          date.today()),
+    }
+    if token is not None:
+        checks["get_token_with_user"] = lambda: db.get_token_with_user(session, token.token)
+    return checks
+
+
+async def run(allow_seqscan: bool = False) -> list[dict]:
+    report = []
+    db = AsyncDB()
+    async with db.engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", autoflush=False,
+                               expire_on_commit=False)
+        try:
+            if not allow_seqscan:
+                await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+            for name, call in (await build_checks(db, session)).items():
+                with capture_statements(db.engine.sync_engine) as statements:
+                    await call()
+                for statement, parameters in statements:
+                    nodes = await explain(connection, statement, parameters)
+                    seq_scans = sorted({n["relation"] for n in nodes
+                                        if n["node"] == "Seq Scan" and n["relation"] in CHECKED_TABLES})
+                    report.append({
+                        "method": name,
+                        "statement": " ".join(statement.split()),
+                        "indexes": sorted({n["index"] for n in nodes if n["index"]}),
+                        "seq_scans": seq_scans,
+                        "ok": not seq_scans,
+                    })
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await dispose_async_engines()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--allow-seqscan", action="store_true", help="Do not disable sequential scans.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(allow_seqscan=args.allow_seqscan))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for entry in report:
+            status = "OK  " if entry["ok"] else "SEQ "
+            detail = ", ".join(entry["indexes"]) or "-"
+            if entry["seq_scans"]:
+                detail += f"  (seq scan on {', '.join(entry['seq_scans'])})"
+            print(f"{status} {entry['method']:<34} {detail}")
+    sys.exit(0 if all(entry["ok"] for entry in report) else 1)
+
+
+if __name__ == "__main__":
+    main()
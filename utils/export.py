@@ -0,0 +1,112 @@
+"""
+Exports tickets with their ordered messages as NDJSON: one JSON object per ticket per line.
+
+Usage:
+    python -m utils.export [--since 2025-01-01T00:00:00] [--status open --status resolved] [--gzip] [-o FILE]
+
+Rows are streamed from a server-side cursor and written as they arrive, so memory use stays constant however
+many tickets there are. Without -o the export is written to stdout.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import zlib
+from contextlib import aclosing
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, List, Optional
+from uuid import UUID
+
+from src.models.enums import TicketStatus
+from utils.async_database import AsyncDB, dispose_async_engines
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def export_ndjson(since: Optional[datetime] = None, statuses: Optional[List[TicketStatus]] = None,
+                        batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """
+Yields the NDJSON export in chunks of roughly CHUNK_SIZE bytes, each ending on a line boundary.
+
+Args:
+    since (datetime, optional): Only tickets created at or after this time.
+    statuses (List[TicketStatus], optional): Only tickets in one of these statuses.
+    batch_size (int, optional): Rows fetched from the database cursor at a time. Defaults to 1000.
+"""
+    buffer = bytearray()
+    async with AsyncDB() as db:
+        async with aclosing(db.stream_tickets_with_messages(db.db_session, since=since, statuses=statuses,
+                                                            batch_size=batch_size)) as tickets:
+            async for ticket in tickets:
+                buffer += json.dumps(ticket, default=_json_default, ensure_ascii=False).encode()
+                buffer += b"\n"
+                if len(buffer) >= CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+Compresses a stream of chunks into a single gzip stream, incrementally.
+"""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def write_export(output, since: Optional[datetime] = None, statuses: Optional[List[TicketStatus]] = None,
+                       compress: bool = False) -> int:
+    """
+Writes the export to a binary file object and returns the number of bytes written.
+"""
+    chunks = export_ndjson(since=since, statuses=statuses)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    written = 0
+    async for chunk in chunks:
+        output.write(chunk)
+        written += len(chunk)
+    output.flush()
+    return written
+
+
+async def _main(args):
+    try:
+        if args.output == "-":
+            await write_export(sys.stdout.buffer, since=args.since, statuses=args.status, compress=args.gzip)
+        else:
+            with open(args.output, "wb") as output:
+                written = await write_export(output, since=args.since, statuses=args.status, compress=args.gzip)
+            print(f"Wrote {written} bytes to {args.output}", file=sys.stderr)
+    finally:
+        await dispose_async_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only tickets created at or after this time.")
+    parser.add_argument("--status", type=TicketStatus, action="append",
+                        help="Only tickets in this status; may be repeated.")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip.")
+    parser.add_argument("-o", "--output", default="-", help="Output file; defaults to stdout.")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,66 @@
 import os
-from pyexpat.errors import messages
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
+
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+from utils.completion_cache import CompletionCache, completion_key, create_completion_cache
+from utils.exception_handler import handle_request_error, request_error_category
+from utils.groq_scheduler import GroqScheduler, Priority, create_groq_scheduler
+from utils.metrics import GROQ_CACHE_HITS, GROQ_ERRORS, GROQ_REQUEST_DURATION, record_groq_usage
+from utils.tokens import estimate_prompt_tokens
+
+DEFAULT_MODEL = "llama3-70b-8192"
+SYSTEM_PROMPT = "You are a helpful customer support assistant."
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a customer support conversation. Merge the new messages into the "
+    "summary so far. Keep the customer's problem, relevant details, what has been tried, what was promised "
+    "and any open questions. Reply with the updated summary only."
+)
 
-from utils.exception_handler import handle_request_error
-from groq import Groq
 
 class GroqAssistant:
     """
 Provides an assistant for generating customer support responses using the Groq API.
 
-Initializes a Groq client with the provided API key and generates responses based on ticket descriptions, message history, and the latest customer message. Handles request errors using the internal exception handler.
+Wraps a single AsyncGroq client whose HTTP connection pool is kept alive for the lifetime of the assistant,
+so requests reuse warm connections instead of opening a new pool per call. Responses are awaited without
+blocking the event loop. When a CompletionCache is given, identical prompts (same model, system prompt and
+ordered messages) are answered from the cache instead of calling Groq again. When a GroqScheduler is given,
+every call is paced by it and retried by it, so the client's own retries are disabled. Each call takes a
+priority: interactive by default, lower for background work. Handles request errors using the internal
+exception handler. Latency, token usage, cache hits and errors of every call are recorded in utils.metrics.
 """
-    def __init__(self, api_key: str):
-        self.client = Groq(api_key=api_key)
+    def __init__(
+            self,
+            api_key: str,
+            model: str = DEFAULT_MODEL,
+            base_url: Optional[str] = None,
+            timeout: Optional[httpx.Timeout] = None,
+            limits: Optional[httpx.Limits] = None,
+            max_retries: int = 2,
+            cache: Optional[CompletionCache] = None,
+            scheduler: Optional[GroqScheduler] = None,
+            completion_tokens: int = 512
+    ):
+        self.model = model
+        self.cache = cache
+        self.scheduler = scheduler
+        self.completion_tokens = completion_tokens
+        self.client = AsyncGroq(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout or httpx.Timeout(60.0, connect=5.0),
+            max_retries=0 if scheduler else max_retries,
+            http_client=DefaultAsyncHttpxClient(limits=limits or httpx.Limits(max_connections=100,
+                                                                              max_keepalive_connections=20)),
+        )
 
-    def generate_response(self, ticket_description: str, message_history: list[str], latest_message: str) -> str:
+    async def generate_response(self, ticket_description: str, message_history: list[str], latest_message: str,
+                                summary: Optional[str] = None, references: Optional[list[str]] = None,
+                                priority: Priority = Priority.INTERACTIVE) -> str:
         """
 Generates a customer support response using the Groq API based on the ticket description, message history, and the latest customer message.
 
@@ -21,18 +68,72 @@ Args:
     ticket_description (str): Description of the customer's issue.
     message_history (list[str]): List of previous messages in the conversation.
     latest_message (str): Most recent message from the customer.
+    summary (str, optional): Running summary of the conversation before message_history.
+    references (list[str], optional): Similar resolved tickets and the replies that resolved them.
+    priority (Priority, optional): Scheduling lane of the call. Defaults to Priority.INTERACTIVE.
 
 Returns:
     str: Generated support response.
 
 Raises:
     HTTPException: If an error occurs during the API request.
+"""
+        messages = self.build_ticket_messages(ticket_description, message_history, latest_message, summary,
+                                              references)
+        return await self._complete(messages, priority=priority)
+
+    async def stream_response(self, ticket_description: str, message_history: list[str],
+                              latest_message: str, summary: Optional[str] = None,
+                              references: Optional[list[str]] = None) -> AsyncIterator[str]:
+        """
+Streaming variant of generate_response that yields content deltas as Groq produces them.
+
+Closing the generator early (e.g. because the client disconnected) closes the upstream stream,
+which stops the generation.
+
+Raises:
+    HTTPException: If an error occurs during the API request.
+"""
+        messages = self.build_ticket_messages(ticket_description, message_history, latest_message, summary,
+                                              references)
+        async with aclosing(self._stream(messages)) as stream:
+            async for delta in stream:
+                yield delta
+
+    async def summarize(self, previous_summary: Optional[str], transcript: list[str], max_tokens: int,
+                        priority: Priority = Priority.INTERACTIVE) -> str:
+        """
+Folds a slice of a ticket's conversation into its running summary.
+
+Args:
+    previous_summary (str, optional): The summary of everything before transcript, if any.
+    transcript (list[str]): Ordered, speaker-labelled messages to fold in.
+    max_tokens (int): Upper bound on the length of the new summary.
+    priority (Priority, optional): Scheduling lane of the call. Defaults to Priority.INTERACTIVE.
+
+Returns:
+    str: The updated summary.
+
+Raises:
+    HTTPException: If an error occurs during the API request.
+"""
+        messages = [{"role": "system", "content": SUMMARY_PROMPT}]
+        if previous_summary:
+            messages.append({"role": "user", "content": f"Summary so far: {previous_summary}"})
+        messages.append({"role": "user", "content": "New messages:\n" + "\n".join(transcript)})
+        return await self._complete(messages, max_tokens=max_tokens, priority=priority)
+
+    def build_ticket_messages(self, ticket_description: str, message_history: list[str],
+                              latest_message: str, summary: Optional[str] = None,
+                              references: Optional[list[str]] = None) -> list[dict]:
+        """
+Builds the chat messages sent to Groq for a ticket, its message history and the latest customer message.
 """
         messages = []
 
         messages.append({
             "role": "system",
-            "content": "You are a helpful customer support assistant.",
+            "content": SYSTEM_PROMPT,
         })
 
         messages.append({
@@ -40,6 +141,20 @@ Raises:
             "content": f"The customer has the following issue: {ticket_description}"
         })
 
+        if references:
+            listing = "\n\n".join(f"{index}. {reference}" for index, reference in enumerate(references, 1))
+            messages.append({
+                "role": "user",
+                "content": f"Similar tickets that were resolved before, with the replies that resolved them. "
+                           f"Reuse them only where they apply to this issue:\n\n{listing}"
+            })
+
+        if summary:
+            messages.append({
+                "role": "user",
+                "content": f"Summary of the earlier conversation: {summary}"
+            })
+
         for msg in message_history:
             messages.append({
                 "role": "user",
@@ -50,30 +165,147 @@ Raises:
             "role": "user",
             "content": f"Customer's latest message: {latest_message}"
         })
+        return messages
+
+    async def _complete(self, messages: list[dict], max_tokens: Optional[int] = None,
+                        priority: Priority = Priority.INTERACTIVE) -> str:
+        options = {"max_tokens": max_tokens} if max_tokens else {}
+        key = completion_key(self.model, messages, options) if self.cache else None
+        if key:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                GROQ_CACHE_HITS.inc("complete")
+                return cached
 
+        started = time.perf_counter()
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=messages,
-                model="llama3-70b-8192",
-                stream=False
+            chat_completion = await self._schedule(
+                lambda: self.client.chat.completions.create(
+                    messages=messages,
+                    model=self.model,
+                    stream=False,
+                    **options
+                ),
+                messages, max_tokens, priority,
+                usage=lambda completion: completion.usage.total_tokens if completion.usage else None,
             )
-            return chat_completion.choices[0].message.content
+            content = chat_completion.choices[0].message.content
         except Exception as err:
+            GROQ_ERRORS.inc("complete", request_error_category(err))
             return handle_request_error(type(err), err)
+        finally:
+            GROQ_REQUEST_DURATION.observe(time.perf_counter() - started, "complete")
+        record_groq_usage(chat_completion.usage)
 
-    def generate_response_from_history(self, message_history: list[str]) -> str:
-        # Pseudo-call to Groq
-        # Build a prompt or conversation object depending on their API
-        prompt = "\n".join(message_history)
-        messages = []
-        messages.append({
-            "role": "user",
-            "content": f"Customer's latest message: {prompt}"
-        })
+        if key and content:
+            await self.cache.put(key, self.model, content, time.perf_counter() - started)
+        return content
+
+    async def _stream(self, messages: list[dict], priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[str]:
+        key = completion_key(self.model, messages) if self.cache else None
+        if key:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                GROQ_CACHE_HITS.inc("stream")
+                yield cached
+                return
+
+        started = time.perf_counter()
+        chunks = []
+        try:
+            stream = await self._schedule(
+                lambda: self.client.chat.completions.create(
+                    messages=messages,
+                    model=self.model,
+                    stream=True
+                ),
+                messages, None, priority, keep_slot=True,
+            )
+        except Exception as err:
+            GROQ_ERRORS.inc("stream", request_error_category(err))
+            GROQ_REQUEST_DURATION.observe(time.perf_counter() - started, "stream")
+            handle_request_error(type(err), err)
+
+        try:
+            async for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None:
+                    record_groq_usage(getattr(x_groq, "usage", None))
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+        except Exception as err:
+            GROQ_ERRORS.inc("stream", request_error_category(err))
+            handle_request_error(type(err), err)
+        finally:
+            GROQ_REQUEST_DURATION.observe(time.perf_counter() - started, "stream")
+            await stream.close()
+            if self.scheduler:
+                await self.scheduler.release()
 
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model="llama3-70b-8192",
-            stream=False
-            )  # implement _call_groq() internally
-        return response.choices[0].message.content
+        if key and chunks:
+            await self.cache.put(key, self.model, "".join(chunks), time.perf_counter() - started)
+
+    async def _schedule(self, call, messages: list[dict], max_tokens: Optional[int], priority: Priority, **kwargs):
+        if self.scheduler is None:
+            return await call()
+        estimated_tokens = estimate_prompt_tokens(messages) + (max_tokens or self.completion_tokens)
+        return await self.scheduler.run(call, estimated_tokens, priority, **kwargs)
+
+    async def close(self):
+        """
+Closes the underlying HTTP connection pool.
+"""
+        await self.client.close()
+
+
+_assistant: Optional[GroqAssistant] = None
+
+
+def create_groq_assistant() -> GroqAssistant:
+    """
+Builds a GroqAssistant configured from environment variables.
+
+Reads GROQ_API_KEY, GROQ_MODEL, GROQ_BASE_URL, GROQ_TIMEOUT, GROQ_CONNECT_TIMEOUT, GROQ_MAX_RETRIES,
+GROQ_MAX_CONNECTIONS, GROQ_MAX_KEEPALIVE_CONNECTIONS, GROQ_KEEPALIVE_EXPIRY and GROQ_COMPLETION_TOKENS, plus the
+GROQ_CACHE_* settings read by create_completion_cache() and the rate limits read by create_groq_scheduler().
+"""
+    return GroqAssistant(
+        api_key=os.environ["GROQ_API_KEY"],
+        model=os.getenv("GROQ_MODEL", DEFAULT_MODEL),
+        base_url=os.getenv("GROQ_BASE_URL") or None,
+        timeout=httpx.Timeout(
+            float(os.getenv("GROQ_TIMEOUT", "60")),
+            connect=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+        ),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30")),
+        ),
+        max_retries=int(os.getenv("GROQ_MAX_RETRIES", "2")),
+        cache=create_completion_cache(),
+        scheduler=create_groq_scheduler(),
+        completion_tokens=int(os.getenv("GROQ_COMPLETION_TOKENS", "512")),
+    )
+
+
+def get_groq_assistant() -> GroqAssistant:
+    """
+Dependency returning the process-wide GroqAssistant, created on first use.
+"""
+    global _assistant
+    if _assistant is None:
+        _assistant = create_groq_assistant()
+    return _assistant
+
+
+async def close_groq_assistant():
+    """
+Closes the process-wide GroqAssistant, if one was created.
+"""
+    global _assistant
+    if _assistant is not None:
+        assistant, _assistant = _assistant, None
+        await assistant.close()
@@ -0,0 +1,246 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from enum import IntEnum
+from typing import Awaitable, Callable, Optional
+
+import groq
+
+
+class Priority(IntEnum):
+    """
+Scheduling lanes for outbound Groq calls. Lower values are served first.
+"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    BATCH = 2
+
+
+class TokenBucket:
+    """
+Token bucket refilled continuously at `capacity` tokens per minute.
+
+A capacity of 0 disables the bucket. Usage reconciled after the fact may drive the level below zero, in which
+case later requests wait until the debt has been refilled.
+"""
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+Seconds until `amount` tokens are available. Requests larger than the bucket wait until it is full.
+"""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0.0) * 60 / self.capacity
+
+    def consume(self, amount: float, now: float):
+        if self.capacity:
+            self._refill(now)
+            self.level -= amount
+
+    def drain(self, now: float):
+        if self.capacity:
+            self._refill(now)
+            self.level = min(self.level, 0.0)
+
+
+class GroqScheduler:
+    """
+Paces outbound Groq calls to stay within the account's rate limits.
+
+Each call is admitted only when both the requests-per-minute and tokens-per-minute buckets can cover it and
+fewer than `max_concurrency` calls are in flight. Waiting calls are admitted strictly by priority lane, then
+in arrival order, so interactive requests overtake queued background and batch work.
+
+Token usage is reserved up front from an estimate and reconciled with the usage Groq reports. Rate-limited
+(429) and transient (5xx, connection) failures are retried up to `max_retries` times with jittered
+exponential backoff, or after the delay given by the `retry-after` header. A 429 also pauses admission for
+every waiting call, since the account-wide limit is what was hit.
+
+Args:
+    requests_per_minute (int): Requests-per-minute limit; 0 disables it.
+    tokens_per_minute (int): Tokens-per-minute limit; 0 disables it.
+    max_concurrency (int): Maximum number of calls in flight.
+    max_retries (int): Retries after the first attempt.
+    base_delay (float): Backoff ceiling for the first retry, in seconds; doubled on every further retry.
+    max_delay (float): Upper bound of any backoff, in seconds.
+"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_concurrency: int,
+                 max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._condition = asyncio.Condition()
+        self._queue: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        self.admitted = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.wait_seconds = 0.0
+
+    async def run(self, call: Callable[[], Awaitable], estimated_tokens: int,
+                  priority: Priority = Priority.INTERACTIVE,
+                  usage: Optional[Callable[[object], Optional[int]]] = None, keep_slot: bool = False):
+        """
+Runs `call` once admitted, retrying rate-limited and transient failures.
+
+Args:
+    call (Callable): Performs the Groq request.
+    estimated_tokens (int): Tokens to reserve (prompt plus expected completion).
+    priority (Priority, optional): Scheduling lane. Defaults to Priority.INTERACTIVE.
+    usage (Callable, optional): Extracts the total tokens actually used from the call's result.
+    keep_slot (bool, optional): Keep the concurrency slot after a successful call, e.g. while a stream is
+        consumed; the caller must then call release(). Defaults to False.
+
+Returns:
+    The result of `call`.
+
+Raises:
+    groq.APIError: The last error, once retries are exhausted or if it is not retryable.
+"""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(estimated_tokens, priority)
+            used = estimated_tokens
+            release = True
+            try:
+                result = await call()
+                if keep_slot:
+                    release = False
+                elif usage is not None:
+                    used = usage(result) or estimated_tokens
+                return result
+            except (groq.APIStatusError, groq.APIConnectionError) as err:
+                if attempt == self.max_retries or not self._retryable(err):
+                    raise
+                delay = self._retry_delay(err, attempt)
+                if getattr(err, "status_code", None) == 429:
+                    self.rate_limited += 1
+                    self._pause(delay)
+            finally:
+                if release:
+                    await self.release(used - estimated_tokens)
+
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def acquire(self, estimated_tokens: int, priority: Priority = Priority.INTERACTIVE):
+        """
+Waits until a call of the given size and priority may start, and reserves capacity for it.
+
+Every acquire() must be followed by a release().
+"""
+        entry = (int(priority), next(self._sequence))
+        started = time.monotonic()
+        async with self._condition:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    delay = None
+                    if self._queue[0] == entry and self._active < self.max_concurrency:
+                        now = time.monotonic()
+                        delay = max(self._paused_until - now,
+                                    self.requests.wait_time(1, now),
+                                    self.tokens.wait_time(estimated_tokens, now))
+                        if delay <= 0:
+                            heapq.heappop(self._queue)
+                            self.requests.consume(1, now)
+                            self.tokens.consume(estimated_tokens, now)
+                            self._active += 1
+                            self.admitted += 1
+                            self.wait_seconds += now - started
+                            self._condition.notify_all()
+                            return
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._condition.notify_all()
+                raise
+
+    async def release(self, token_adjustment: int = 0):
+        """
+Frees the concurrency slot of an admitted call and reconciles its token reservation with actual usage.
+"""
+        async with self._condition:
+            self._active -= 1
+            if token_adjustment:
+                self.tokens.consume(token_adjustment, time.monotonic())
+            self._condition.notify_all()
+
+    def _pause(self, seconds: float):
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self.requests.drain(now)
+
+    @staticmethod
+    def _retryable(err: Exception) -> bool:
+        if isinstance(err, groq.APIConnectionError):
+            return True
+        return err.status_code == 429 or err.status_code >= 500
+
+    def _retry_delay(self, err: Exception, attempt: int) -> float:
+        response = getattr(err, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay) + random.uniform(0, self.base_delay)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        lanes = {priority.name.lower(): 0 for priority in Priority}
+        for priority, _ in self._queue:
+            lanes[Priority(priority).name.lower()] += 1
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queued": lanes,
+            "requests_available": self.requests.level if self.requests.capacity else None,
+            "tokens_available": self.tokens.level if self.tokens.capacity else None,
+            "paused_for_seconds": max(self._paused_until - now, 0.0),
+            "admitted": self.admitted,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "average_wait_seconds": self.wait_seconds / self.admitted if self.admitted else 0.0,
+        }
+
+
+def create_groq_scheduler() -> GroqScheduler:
+    """
+Builds a GroqScheduler from GROQ_RPM, GROQ_TPM, GROQ_MAX_CONCURRENCY, GROQ_MAX_RETRIES, GROQ_RETRY_BASE_DELAY
+and GROQ_RETRY_MAX_DELAY.
+"""
+    return GroqScheduler(
+        requests_per_minute=int(os.getenv("GROQ_RPM", "30")),
+        tokens_per_minute=int(os.getenv("GROQ_TPM", "6000")),
+        max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "16")),
+        max_retries=int(os.getenv("GROQ_MAX_RETRIES", "2")),
+        base_delay=float(os.getenv("GROQ_RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("GROQ_RETRY_MAX_DELAY", "30")),
+    )
@@ -0,0 +1,293 @@
+"""
+Process-wide metrics, exposed in the Prometheus text format at /metrics.
+
+Three sources feed them: MetricsMiddleware times every HTTP request by route template, instrument_engine()
+times every SQL statement by the DB or AsyncDB method that issued it, and GroqAssistant records the latency,
+token usage and errors of its Groq calls.
+
+Metrics live in memory in each process; with several uvicorn workers, every worker is scraped separately.
+Recording a sample takes a dict lookup and a short lock, cheap enough to stay on in production.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional, Sequence
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Name of the DB/AsyncDB method currently running, used to attribute SQL statements.
+current_db_method: ContextVar[str] = ContextVar("current_db_method", default="other")
+# Statement count of the HTTP request being served, if any.
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict = {}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """
+A monotonically increasing count, per combination of label values.
+"""
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+A value that can go up and down, per combination of label values.
+"""
+    type = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+Counts observations in cumulative buckets, with their sum and count, per combination of label values.
+"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _samples(self, labels: tuple, value) -> list[str]:
+        counts, total = value[0][:], value[1]
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+The set of metrics rendered by /metrics.
+"""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.",
+    ["method", "route", "status"]))
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request, including streaming the body.",
+    ["method", "route"]))
+HTTP_REQUESTS_IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served.", ["method"]))
+HTTP_REQUEST_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed while serving an HTTP request.", ["method", "route"],
+    buckets=COUNT_BUCKETS))
+
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total", "SQL statements executed, by the DB method that issued them.", ["method"]))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "Execution time of SQL statements, by the DB method that issued them.",
+    ["method"], buckets=QUERY_BUCKETS))
+DB_QUERY_ERRORS = registry.register(Counter(
+    "db_query_errors_total", "SQL statements that raised an error, by the DB method that issued them.",
+    ["method"]))
+
+GROQ_REQUEST_DURATION = registry.register(Histogram(
+    "groq_request_duration_seconds", "Time of Groq calls, including scheduling and retries; streams until "
+    "the last chunk.", ["operation"]))
+GROQ_TOKENS = registry.register(Counter(
+    "groq_tokens_total", "Tokens reported by Groq, by kind (prompt or completion).", ["kind"]))
+GROQ_ERRORS = registry.register(Counter(
+    "groq_errors_total", "Failed Groq calls, by operation and error category.", ["operation", "error"]))
+GROQ_CACHE_HITS = registry.register(Counter(
+    "groq_cache_hits_total", "Groq calls answered from the completion cache.", ["operation"]))
+
+
+def record_groq_usage(usage):
+    """
+Counts the prompt and completion tokens of a Groq usage object, if there is one.
+"""
+    if usage is None:
+        return
+    GROQ_TOKENS.inc("prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    GROQ_TOKENS.inc("completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+class MetricsMiddleware:
+    """
+ASGI middleware recording request counts, latency, in-flight requests and the SQL statements each request runs.
+
+Requests are labelled by route template (e.g. /tickets/{ticket_id}) rather than path, so the number of series
+stays bounded; requests that match no route are labelled "unmatched".
+"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        HTTP_REQUESTS_IN_PROGRESS.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec(method)
+            _request_queries.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method, template)
+            HTTP_REQUEST_DB_QUERIES.observe(queries[0], method, template)
+            HTTP_REQUESTS.inc(method, template, str(status))
+
+
+def instrument_db_methods(cls):
+    """
+Class decorator that records the name of each public DB method while it runs, so instrument_engine() can
+attribute the SQL it issues. Async generators are left alone; their statements are attributed to the caller.
+"""
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(method) or inspect.isasyncgenfunction(method):
+            continue
+        setattr(cls, name, _with_db_method(name, method))
+    return cls
+
+
+def _with_db_method(name: str, method):
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            token = current_db_method.set(name)
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                current_db_method.reset(token)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        token = current_db_method.set(name)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            current_db_method.reset(token)
+    return wrapper
+
+
+def instrument_engine(engine):
+    """
+Times every statement executed on a (sync) engine; pass engine.sync_engine for an async engine.
+"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        method = current_db_method.get()
+        DB_QUERIES.inc(method)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[0] += 1
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, method)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+        DB_QUERY_ERRORS.inc(current_db_method.get())
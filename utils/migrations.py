@@ -0,0 +1,44 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+
+from utils.database import get_engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Arbitrary application-wide key for the advisory lock that serializes concurrent upgrades.
+MIGRATION_LOCK_KEY = 74_211_001
+
+
+def get_alembic_config() -> Config:
+    """
+Returns the Alembic configuration for this project, independent of the current working directory.
+"""
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return config
+
+
+def run_migrations(revision: str = "head"):
+    """
+Upgrades the database schema to the given revision.
+
+A Postgres advisory lock is held for the duration, so when several workers start at once only one of them
+applies the migrations and the others wait for it and then find nothing left to do.
+
+Args:
+    revision (str, optional): Target revision. Defaults to "head".
+"""
+    config = get_alembic_config()
+    config.attributes["configure_logger"] = False
+    with get_engine().connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        connection.commit()
+        try:
+            config.attributes["connection"] = connection
+            command.upgrade(config, revision)
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
@@ -0,0 +1,164 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT = "next"
+PREV = "prev"
+
+
+class Page(list):
+    """
+A list of rows from one page of results, plus opaque cursors for the neighbouring pages.
+
+Being a list, a Page can be used wherever the plain list results were used before.
+
+Attributes:
+    next_cursor (Optional[str]): Cursor for the following page, or None on the last page.
+    prev_cursor (Optional[str]): Cursor for the preceding page, or None on the first page.
+"""
+
+    def __init__(self, items=(), next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+@dataclass(frozen=True)
+class CursorPosition:
+    created_at: datetime
+    id: UUID
+    direction: str
+
+
+def encode_cursor(created_at: datetime, row_id: UUID, direction: str) -> str:
+    """
+Encodes a (created_at, id) position and a direction into an opaque, URL-safe cursor.
+"""
+    raw = json.dumps({"c": created_at.isoformat(), "i": str(row_id), "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CursorPosition:
+    """
+Decodes a cursor produced by encode_cursor().
+
+Raises:
+    HTTPException: 400 if the cursor is malformed.
+"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = data["d"]
+        if direction not in (NEXT, PREV):
+            raise ValueError(direction)
+        return CursorPosition(datetime.fromisoformat(data["c"]), UUID(data["i"]), direction)
+    except (binascii.Error, json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+@dataclass(frozen=True)
+class RankPosition:
+    rank: float
+    id: UUID
+
+
+def encode_rank_cursor(rank: float, row_id: UUID) -> str:
+    """
+Encodes a (rank, id) position of a relevance-ordered result into an opaque, URL-safe cursor.
+"""
+    raw = json.dumps({"r": rank, "i": str(row_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> RankPosition:
+    """
+Decodes a cursor produced by encode_rank_cursor().
+
+Raises:
+    HTTPException: 400 if the cursor is malformed.
+"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return RankPosition(float(data["r"]), UUID(data["i"]))
+    except (binascii.Error, json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+class KeysetPaginator:
+    """
+Paginates a query ordered by (created_at, id).
+
+With a cursor, rows are fetched with a keyset predicate on (created_at, id), so every page costs the same
+regardless of depth. Without one, the page number is used as an OFFSET fallback on the same stable ordering.
+Either way one extra row is fetched to tell whether a further page exists.
+
+Args:
+    created_at_column: The created_at column to order by.
+    id_column: The primary key column used as a tie-breaker.
+    page_size (int): Number of rows per page.
+    cursor (str, optional): Cursor returned by a previous page. Takes precedence over page.
+    page (int, optional): Page number for the OFFSET fallback. Defaults to 1.
+"""
+
+    def __init__(self, created_at_column, id_column, page_size: int, cursor: Optional[str] = None, page: int = 1):
+        self.created_at_column = created_at_column
+        self.id_column = id_column
+        self.page_size = page_size
+        self.page = page
+        self.position = decode_cursor(cursor) if cursor else None
+
+    def apply(self, stmt):
+        """
+Adds ordering, the keyset predicate (or offset) and the limit to a Select or Query.
+"""
+        key = tuple_(self.created_at_column, self.id_column)
+        if self.position is None:
+            stmt = stmt.order_by(self.created_at_column.asc(), self.id_column.asc())
+            stmt = stmt.offset((self.page - 1) * self.page_size)
+        elif self.position.direction == PREV:
+            stmt = stmt.where(key < tuple_(self.position.created_at, self.position.id))
+            stmt = stmt.order_by(self.created_at_column.desc(), self.id_column.desc())
+        else:
+            stmt = stmt.where(key > tuple_(self.position.created_at, self.position.id))
+            stmt = stmt.order_by(self.created_at_column.asc(), self.id_column.asc())
+        return stmt.limit(self.page_size + 1)
+
+    def to_page(self, rows) -> Page:
+        """
+Turns the rows fetched by apply() into a Page in ascending order with its neighbouring cursors.
+"""
+        rows = list(rows)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if not rows:
+            return Page()
+
+        if self.position is not None and self.position.direction == PREV:
+            rows.reverse()
+        first, last = rows[0], rows[-1]
+        if self.position is not None and self.position.direction == PREV:
+            prev_cursor = encode_cursor(first.created_at, first.id, PREV) if has_more else None
+            next_cursor = encode_cursor(last.created_at, last.id, NEXT)
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id, NEXT) if has_more else None
+            has_previous = self.position is not None or self.page > 1
+            prev_cursor = encode_cursor(first.created_at, first.id, PREV) if has_previous else None
+        return Page(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def set_cursor_headers(response: Response, page: Page):
+    """
+Exposes a Page's cursors to the client through the X-Next-Cursor and X-Prev-Cursor response headers.
+"""
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.prev_cursor:
+        response.headers["X-Prev-Cursor"] = page.prev_cursor
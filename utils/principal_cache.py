@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from src.models.enums import Role, Permission, RolePermissions
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+The authenticated caller of a request, resolved once from a bearer token.
+
+Attributes:
+    id (UUID): The user's ID.
+    email (str): The user's email address.
+    role (Role): The user's role.
+    permissions (frozenset): Permissions granted by the role, precomputed for fast checks.
+    token_id (Optional[UUID]): ID of the stored token the principal was resolved from.
+"""
+    id: UUID
+    email: str
+    role: Role
+    permissions: frozenset
+    token_id: Optional[UUID] = None
+
+    @classmethod
+    def from_user(cls, user, token_id: Optional[UUID] = None) -> "Principal":
+        role = Role(user.role)
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=role,
+            permissions=frozenset(RolePermissions.get(role, set())),
+            token_id=token_id,
+        )
+
+    def has_permission(self, permission: Permission) -> bool:
+        return permission in self.permissions
+
+
+class PrincipalCache:
+    """
+Bounded LRU cache of resolved principals keyed by bearer token, with a per-entry TTL.
+
+Entries never outlive the token's own expiry. Revoking a token or deleting a user invalidates the matching
+entries in this process; other processes pick the change up once their entries expire.
+"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+        self._tokens_by_user: dict[UUID, set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if expires_at <= now:
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal, token_expires_in: Optional[float] = None):
+        ttl = self.ttl if token_expires_in is None else min(self.ttl, token_expires_in)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (principal, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            if self._remove(token):
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: UUID):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                if self._remove(token):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> bool:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return False
+        user_tokens = self._tokens_by_user.get(entry[0].id)
+        if user_tokens is not None:
+            user_tokens.discard(token)
+            if not user_tokens:
+                del self._tokens_by_user[entry[0].id]
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_principal_cache: Optional[PrincipalCache] = None
+
+
+def get_principal_cache() -> PrincipalCache:
+    """
+Returns the process-wide PrincipalCache, sized by PRINCIPAL_CACHE_SIZE with entries kept for at most
+PRINCIPAL_CACHE_TTL seconds.
+"""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache(
+            max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+        )
+    return _principal_cache
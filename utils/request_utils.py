@@ -1,15 +1,17 @@
+import time
 from typing import List
+from uuid import UUID
 
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
 from starlette import status
 
 from src.models.enums import Role, RolePermissions, Permission
-from utils import get_db
-from utils.db_models.main import User
+from utils import AsyncDB
+from utils.principal_cache import Principal, get_principal_cache
 from utils.security import SECRET_KEY, ALGORITHM
+from utils.token_denylist import get_token_denylist
 
 
 def has_permission(role: Role, action: str):
@@ -30,56 +32,91 @@ Raises:
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def get_current_user(
-        db: Session = Depends(get_db),
+async def get_current_user(
         token: str = Depends(oauth2_scheme),
         required_permissions: List[Role] = None
-) -> User:
+) -> Principal:
     """
-Retrieves the current authenticated user from the JWT token, verifies their existence in the database,
-and checks if their role matches any required permissions. Raises HTTPException for invalid tokens,
+Resolves the authenticated principal for a bearer token and checks if their role matches any required permissions.
+
+Principals are served from the process-wide PrincipalCache when possible. On a miss, the JWT is decoded and the
+stored token is loaded together with its user through the unique token index, so revoked tokens and deleted
+users are rejected without scanning the tokens table. Raises HTTPException for invalid or revoked tokens,
 missing users, or insufficient permissions.
 
+Tokens in the TokenDenylist are rejected with a dict lookup, both before the database is queried on a miss and
+when the principal comes from the cache.
+
 Args:
-    db (Session): Database session dependency.
     token (str): JWT token from the request.
     required_permissions (List[Role], optional): List of roles allowed to access the endpoint.
 
 Returns:
-    User: The authenticated user object.
+    Principal: The authenticated principal.
 
 Raises:
     HTTPException: If authentication or authorization fails.
 """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")  # "sub" is the subject of the JWT token (usually user ID)
-
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    cache = get_principal_cache()
+    principal = cache.get(token)
+    if principal is None:
+        principal = await _resolve_principal(token)
+    elif get_token_denylist().is_revoked(principal.token_id):
+        cache.invalidate_token(token)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+    if required_permissions:
+        if principal.role not in required_permissions:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"User does not have permission to access this resource"
+            )
 
-        user = db.query(User).filter(User.id == user_id).first()  # Fetch user from the DB
-        if user is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return principal
 
-        if required_permissions:
-            if user.role not in required_permissions:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"User does not have permission to access this resource"
-                )
 
-        return user
+async def _resolve_principal(token: str) -> Principal:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    user_id = payload.get("sub")  # "sub" is the subject of the JWT token (usually user ID)
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+
+    try:
+        user_id = UUID(user_id)
+        token_id = UUID(payload["jti"]) if "jti" in payload else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    if get_token_denylist().is_revoked(token_id):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+    async with AsyncDB() as db:
+        found = await db.get_token_with_user(db.db_session, token)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+    stored_token, user = found
+    if user.id != user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    if stored_token.revoked_at is not None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+    principal = Principal.from_user(user, token_id=stored_token.id)
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    get_principal_cache().put(token, principal, expires_in)
+    return principal
+
 
 def get_current_user_with_permissions(required_permissions: list[Permission]):
     """
 Returns a dependency that retrieves the current user and checks if they have at least one of the specified permissions.
+A Role may also be listed, in which case users holding that role are allowed through.
 
 Args:
-    required_permissions (list[Permission]): List of permissions required to access the endpoint.
+    required_permissions (list[Permission]): List of permissions (or roles) required to access the endpoint.
 
 Returns:
     Callable: A dependency function for FastAPI routes that enforces permission checks.
@@ -88,9 +125,9 @@ Raises:
     HTTPException: If the user does not have any of the required permissions.
 """
 
-    def dependency(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
-        user = get_current_user(db, token)
-        user_permissions = RolePermissions.get(user.role, set())
+    async def dependency(token: str = Depends(oauth2_scheme)) -> Principal:
+        user = await get_current_user(token)
+        user_permissions = user.permissions | {user.role}
 
         if not set(required_permissions).intersection(user_permissions):
             raise HTTPException(
@@ -1,15 +1,23 @@
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
+from fastapi import HTTPException
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from starlette import status
 
 # Configurable secret and algorithm
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context; changing BCRYPT_ROUNDS rehashes passwords on their next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1)) -> str:
@@ -57,6 +65,182 @@ Returns:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+Checks whether a stored hash should be replaced, either because passlib considers it deprecated or
+because it was produced with a bcrypt cost other than BCRYPT_ROUNDS.
+
+Args:
+    hashed_password (str): The stored password hash.
+
+Returns:
+    bool: True if the password should be rehashed.
+"""
+    if pwd_context.needs_update(hashed_password):
+        return True
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+Verifies a password and, when it matches but the stored hash is outdated, computes a replacement hash.
+
+Args:
+    plain_password (str): The plaintext password to verify.
+    hashed_password (str): The stored password hash.
+
+Returns:
+    Tuple[bool, Optional[str]]: Whether the password matched, and the new hash to store (or None).
+"""
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if password_needs_rehash(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+
+class PasswordHasher:
+    """
+Runs bcrypt hashing and verification on a dedicated, size-limited executor so it never blocks the event loop.
+
+At most `max_workers` hashes run concurrently and at most `max_pending` may be queued or running. Beyond that,
+requests are rejected immediately with 503 and a Retry-After header instead of piling up behind a login storm.
+bcrypt releases the GIL, so the default thread pool scales with cores; a process pool can be selected instead.
+"""
+
+    def __init__(self, max_workers: int, max_pending: int, executor: str = "thread"):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor_kind = executor
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers) if executor == "process"
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.logins = 0
+        self.failed_logins = 0
+        self.login_seconds_total = 0.0
+        self.login_seconds_max = 0.0
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication is temporarily overloaded, please retry shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """
+Hashes a plaintext password off the event loop.
+
+Raises:
+    HTTPException: 503 if the hashing pool is saturated.
+"""
+        return await self._run(get_password_hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+Off-loop variant of verify_and_update_password().
+
+Raises:
+    HTTPException: 503 if the hashing pool is saturated.
+"""
+        verified, new_hash = await self._run(verify_and_update_password, plain_password, hashed_password)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return verified, new_hash
+
+    def record_login(self, seconds: float, succeeded: bool):
+        """
+Records the wall-clock duration of one login attempt.
+"""
+        with self._lock:
+            self.logins += 1
+            if not succeeded:
+                self.failed_logins += 1
+            self.login_seconds_total += seconds
+            self.login_seconds_max = max(self.login_seconds_max, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executor": self.executor_kind,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "logins": self.logins,
+                "failed_logins": self.failed_logins,
+                "login_seconds_avg": self.login_seconds_total / self.logins if self.logins else 0.0,
+                "login_seconds_max": self.login_seconds_max,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """
+Returns the process-wide PasswordHasher, configured from PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+and PASSWORD_HASH_EXECUTOR ("thread" or "process").
+"""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher(
+            max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+            executor=os.getenv("PASSWORD_HASH_EXECUTOR", "thread"),
+        )
+    return _password_hasher
+
+
+def shutdown_password_hasher():
+    global _password_hasher
+    if _password_hasher is not None:
+        hasher, _password_hasher = _password_hasher, None
+        hasher.shutdown()
+
+
+class LoginTimer:
+    """
+Context manager that records the duration of a login attempt on the PasswordHasher.
+"""
+
+    def __init__(self):
+        self.succeeded = False
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        get_password_hasher().record_login(time.perf_counter() - self._started, self.succeeded and not exc_type)
+
+
 def decode_access_token(token: str) -> dict:
     """
 Decodes a JWT access token and returns its payload as a dictionary.
@@ -0,0 +1,44 @@
+"""
+Single-pass JSON responses for list endpoints.
+
+When a handler returns Pydantic models through `response_model`, FastAPI validates the returned value against
+the response model again. It then converts it to JSON-compatible Python objects and encodes those. For a page of
+100 tickets with their messages, that is four walks over the data.
+
+model_response() takes plain dicts built straight from database rows. It validates them once with a cached
+TypeAdapter and serializes the result to JSON bytes inside pydantic-core. The route keeps its
+`response_model`, so the OpenAPI schema is unchanged. FastAPI skips its own validation because the handler
+returns a Response. Everything else is rendered by ORJSONResponse, the app's default response class.
+"""
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(annotation) -> TypeAdapter:
+    """
+Returns the TypeAdapter of a response type, built once per type; building one compiles its validator and
+serializer, which costs far more than using it.
+"""
+    return TypeAdapter(annotation)
+
+
+def model_response(annotation, content: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+Validates `content` against `annotation` and returns it as a JSON response, serialized by pydantic-core.
+
+Args:
+    annotation: The response type, e.g. List[TicketResponse]; use the route's response_model.
+    content (Any): Plain dicts (or lists of them) with the fields of the response type.
+    status_code (int, optional): Response status code. Defaults to 200.
+    headers (dict, optional): Extra response headers.
+
+Returns:
+    Response: The encoded JSON response.
+"""
+    adapter = type_adapter(annotation)
+    return Response(adapter.dump_json(adapter.validate_python(content)), status_code=status_code, headers=headers,
+                    media_type="application/json")
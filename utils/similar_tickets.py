@@ -0,0 +1,478 @@
+"""
+Similarity index over resolved tickets, used to ground AI responses in answers that were already given.
+
+Tickets are embedded locally with hashed TF-IDF: unigrams and bigrams of the title and description are hashed
+into a fixed number of signed buckets, weighted by inverse document frequency and L2-normalized. The vectors
+form one contiguous float32 matrix, memory-mapped from SIMILAR_TICKETS_PATH, so startup does not read the whole
+index and every process on a host shares the same pages. Queries are scored with a batched matrix product
+against the matrix, block by block, keeping the top k per query.
+
+A ticket is added when it is resolved or closed and removed when it is reopened. Incremental additions use the
+document frequencies known at the time, so rebuild the index now and then to re-weight it:
+
+    python -m utils.similar_tickets --rebuild
+"""
+import argparse
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import aclosing, contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.models.enums import RESOLVED_STATUSES
+from utils.async_database import AsyncDB, dispose_async_engines
+from utils.db_models.main import Ticket
+from utils.env import env_flag
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+ID_BYTES = 16
+BLOCK_ROWS = 65536
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+
+class HashingVectorizer:
+    """
+Turns text into signed, sublinearly scaled term frequencies over `dimensions` hashed buckets.
+
+Hashes are stable across processes, so vectors written by one process can be queried by another.
+"""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def features(self, text: str) -> list[str]:
+        tokens = [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+        return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+    def term_frequencies(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in Counter(self.features(text)).items():
+            value = _feature_hash(feature)
+            sign = -1.0 if value >> 63 else 1.0
+            vector[value % self.dimensions] += sign * (1.0 + math.log(count))
+        return vector
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class SimilarTicketIndex:
+    """
+A memory-mapped hashed TF-IDF index of tickets, updated in place.
+
+The directory holds vectors.npy (capacity x dimensions float32), ids.npy (the ticket UUID of every row, zero
+for free rows) and meta.json (row count, document frequencies). Writers hold an exclusive flock on the
+directory's lock file, so every process on the host can update the same index; readers notice a newer
+meta.json and remap the files before the next query.
+
+Args:
+    path (str): Directory of the index files; created on the first write.
+    dimensions (int): Number of hashed buckets per vector. Changing it requires a rebuild.
+    initial_capacity (int): Rows allocated when the index is created; doubled whenever it fills up.
+"""
+
+    def __init__(self, path: str, dimensions: int = 512, initial_capacity: int = 1024):
+        self.path = path
+        self.dimensions = dimensions
+        self.initial_capacity = initial_capacity
+        self.vectorizer = HashingVectorizer(dimensions)
+        self._lock = threading.Lock()
+        self._meta_version: Optional[Tuple[int, int]] = None
+        self._reset()
+
+    def _reset(self):
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._rows: dict[UUID, int] = {}
+        self._free: list[int] = []
+        self._count = 0
+        self._documents = 0
+        self._df = np.zeros(self.dimensions, dtype=np.float64)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _refresh(self):
+        """
+Remaps the index files if another process or thread has written a newer meta.json.
+"""
+        try:
+            stat = os.stat(self._file("meta.json"))
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = None
+        if version == self._meta_version:
+            return
+        self._meta_version = version
+        self._reset()
+        if version is None:
+            return
+
+        with open(self._file("meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        if meta["dimensions"] != self.dimensions:
+            logger.warning("Similar ticket index at %s has %d dimensions, expected %d; rebuild it",
+                           self.path, meta["dimensions"], self.dimensions)
+            return
+        self._vectors = np.load(self._file("vectors.npy"), mmap_mode="r+")
+        self._ids = np.load(self._file("ids.npy"), mmap_mode="r+")
+        self._count = meta["count"]
+        self._documents = meta["documents"]
+        self._df = np.asarray(meta["df"], dtype=np.float64)
+        used = self._ids[:self._count].any(axis=1)
+        for row in np.flatnonzero(used):
+            self._rows[UUID(bytes=self._ids[row].tobytes())] = int(row)
+        self._free = [int(row) for row in np.flatnonzero(~used)]
+
+    def _write_meta(self):
+        self._vectors.flush()
+        self._ids.flush()
+        meta = {
+            "dimensions": self.dimensions,
+            "count": self._count,
+            "documents": self._documents,
+            "df": self._df.tolist(),
+        }
+        temporary = self._file("meta.json.tmp")
+        with open(temporary, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temporary, self._file("meta.json"))
+        stat = os.stat(self._file("meta.json"))
+        self._meta_version = (stat.st_ino, stat.st_mtime_ns)
+
+    @contextmanager
+    def _exclusive(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(self._file("lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _allocate(self, capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+Creates index files of the given capacity, copying the current rows, and swaps them in.
+"""
+        vectors = open_memmap(self._file("vectors.npy.tmp"), mode="w+", dtype=np.float32,
+                              shape=(capacity, self.dimensions))
+        ids = open_memmap(self._file("ids.npy.tmp"), mode="w+", dtype=np.uint8, shape=(capacity, ID_BYTES))
+        if self._vectors is not None:
+            vectors[:self._count] = self._vectors[:self._count]
+            ids[:self._count] = self._ids[:self._count]
+        vectors.flush()
+        ids.flush()
+        os.replace(self._file("vectors.npy.tmp"), self._file("vectors.npy"))
+        os.replace(self._file("ids.npy.tmp"), self._file("ids.npy"))
+        return vectors, ids
+
+    def _claim_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        capacity = len(self._vectors) if self._vectors is not None else 0
+        if self._count == capacity:
+            self._vectors, self._ids = self._allocate(max(self.initial_capacity, capacity * 2))
+        self._count += 1
+        return self._count - 1
+
+    def _forget(self, row: int):
+        present = self._vectors[row] != 0
+        self._df[present] = np.maximum(self._df[present] - 1, 0)
+        self._documents = max(self._documents - 1, 0)
+        self._vectors[row] = 0
+        self._ids[row] = 0
+
+    def _idf(self) -> np.ndarray:
+        return (np.log((1 + self._documents) / (1 + self._df)) + 1).astype(np.float32)
+
+    def add(self, ticket_id: UUID, text: str):
+        """
+Adds a ticket to the index, or replaces its vector if it is already indexed.
+"""
+        frequencies = self.vectorizer.term_frequencies(text)
+        if not frequencies.any():
+            self.remove(ticket_id)
+            return
+        with self._exclusive():
+            row = self._rows.get(ticket_id)
+            if row is not None:
+                self._forget(row)
+            else:
+                row = self._claim_row()
+            self._df[frequencies != 0] += 1
+            self._documents += 1
+            self._vectors[row] = _normalize(frequencies * self._idf())
+            self._ids[row] = np.frombuffer(ticket_id.bytes, dtype=np.uint8)
+            self._rows[ticket_id] = row
+            self._write_meta()
+
+    def remove(self, ticket_id: UUID) -> bool:
+        """
+Removes a ticket from the index. Returns False if it was not indexed.
+"""
+        with self._exclusive():
+            row = self._rows.pop(ticket_id, None)
+            if row is None:
+                return False
+            self._forget(row)
+            self._free.append(row)
+            self._write_meta()
+            return True
+
+    def rebuild(self, documents: Iterable[Tuple[UUID, str]]):
+        """
+Replaces the whole index with the given (ticket ID, text) documents, weighted with exact document
+frequencies.
+"""
+        with self._exclusive():
+            self._reset()
+            for ticket_id, text in documents:
+                frequencies = self.vectorizer.term_frequencies(text)
+                if not frequencies.any() or ticket_id in self._rows:
+                    continue
+                row = self._claim_row()
+                self._vectors[row] = frequencies
+                self._ids[row] = np.frombuffer(ticket_id.bytes, dtype=np.uint8)
+                self._rows[ticket_id] = row
+                self._df[frequencies != 0] += 1
+                self._documents += 1
+            if self._vectors is None:
+                self._vectors, self._ids = self._allocate(self.initial_capacity)
+
+            idf = self._idf()
+            for start in range(0, self._count, BLOCK_ROWS):
+                block = self._vectors[start:start + BLOCK_ROWS]
+                block[:] = _normalize(block * idf)
+            self._write_meta()
+
+    def search(self, text: str, k: int, exclude: Sequence[UUID] = (),
+               min_score: float = 0.0) -> List[Tuple[UUID, float]]:
+        """
+Returns up to k (ticket ID, cosine similarity) pairs most similar to the text, best first.
+"""
+        return self.search_many([text], k, exclude=exclude, min_score=min_score)[0]
+
+    def search_many(self, texts: Sequence[str], k: int, exclude: Sequence[UUID] = (),
+                    min_score: float = 0.0) -> List[List[Tuple[UUID, float]]]:
+        """
+Scores a batch of queries against the index in one pass over the matrix.
+
+Args:
+    texts (Sequence[str]): Query texts.
+    k (int): Maximum number of matches per query.
+    exclude (Sequence[UUID], optional): Ticket IDs never returned, e.g. the ticket being answered.
+    min_score (float, optional): Minimum cosine similarity of a match. Defaults to 0.0.
+
+Returns:
+    List[List[Tuple[UUID, float]]]: The matches of every query, best first.
+"""
+        with self._lock:
+            self._refresh()
+            vectors, ids, count, idf = self._vectors, self._ids, self._count, self._idf()
+        if vectors is None or not count or not texts or k <= 0:
+            return [[] for _ in texts]
+
+        queries = _normalize(np.stack([self.vectorizer.term_frequencies(text) for text in texts]) * idf)
+        width = k + len(exclude)
+        best_scores = np.full((len(texts), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(texts), 0), dtype=np.int64)
+        for start in range(0, count, BLOCK_ROWS):
+            block = np.asarray(vectors[start:min(start + BLOCK_ROWS, count)])
+            scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(block)),
+                                                              (len(texts), len(block)))], axis=1)
+            if scores.shape[1] > width:
+                top = np.argpartition(-scores, width - 1, axis=1)[:, :width]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        excluded = set(exclude)
+        results = []
+        for scores, rows in zip(best_scores, best_rows):
+            matches = []
+            for position in np.argsort(-scores):
+                score = float(scores[position])
+                if score < min_score or score <= 0 or len(matches) == k:
+                    break
+                row_id = ids[rows[position]].tobytes()
+                if not any(row_id):
+                    continue
+                ticket_id = UUID(bytes=row_id)
+                if ticket_id not in excluded:
+                    matches.append((ticket_id, score))
+            results.append(matches)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "path": self.path,
+                "dimensions": self.dimensions,
+                "tickets": len(self._rows),
+                "rows": self._count,
+                "capacity": len(self._vectors) if self._vectors is not None else 0,
+            }
+
+
+@dataclass
+class SimilarTicket:
+    """
+A resolved ticket similar to the one being answered.
+
+Attributes:
+    ticket_id (UUID): The resolved ticket.
+    title (str): Its title.
+    description (str): Its description.
+    resolution (str): Its final reply.
+    score (float): Cosine similarity to the query.
+"""
+    ticket_id: UUID
+    title: str
+    description: str
+    resolution: str
+    score: float
+
+
+def ticket_text(title: str, description: str) -> str:
+    return f"{title}\n{description}"
+
+
+_index: Optional[SimilarTicketIndex] = None
+
+
+def similar_tickets_enabled() -> bool:
+    return env_flag("SIMILAR_TICKETS_ENABLED", True)
+
+
+def get_similar_ticket_index() -> SimilarTicketIndex:
+    """
+Returns the process-wide SimilarTicketIndex, configured by SIMILAR_TICKETS_PATH and
+SIMILAR_TICKETS_DIMENSIONS.
+"""
+    global _index
+    if _index is None:
+        _index = SimilarTicketIndex(
+            path=os.getenv("SIMILAR_TICKETS_PATH", "data/similar_tickets"),
+            dimensions=int(os.getenv("SIMILAR_TICKETS_DIMENSIONS", "512")),
+        )
+    return _index
+
+
+async def find_similar_tickets(db: AsyncDB, text: str, exclude: Optional[UUID] = None) -> List[SimilarTicket]:
+    """
+Finds resolved tickets similar to the text, with their final replies.
+
+Up to SIMILAR_TICKETS_LIMIT (default 3) tickets scoring at least SIMILAR_TICKETS_MIN_SCORE (default 0.2) are
+returned, best first. Matches that were reopened or have no reply since being indexed are skipped.
+
+Args:
+    db (AsyncDB): An open AsyncDB.
+    text (str): Query text, e.g. the title, description and latest message of a ticket.
+    exclude (UUID, optional): A ticket never returned, usually the one being answered.
+
+Returns:
+    List[SimilarTicket]: The similar tickets, best first.
+"""
+    limit = int(os.getenv("SIMILAR_TICKETS_LIMIT", "3"))
+    if not similar_tickets_enabled() or limit <= 0:
+        return []
+    matches = await asyncio.to_thread(get_similar_ticket_index().search, text, limit,
+                                      exclude=[exclude] if exclude else (),
+                                      min_score=float(os.getenv("SIMILAR_TICKETS_MIN_SCORE", "0.2")))
+    if not matches:
+        return []
+
+    ticket_ids = [ticket_id for ticket_id, _ in matches]
+    tickets = await db.get_tickets_by_ids(db.db_session, ticket_ids)
+    replies = await db.get_latest_messages_for_tickets(db.db_session, ticket_ids, limit_per_ticket=1)
+    similar = []
+    for ticket_id, score in matches:
+        ticket = tickets.get(ticket_id)
+        if ticket is None or ticket.status not in RESOLVED_STATUSES or not replies.get(ticket_id):
+            continue
+        similar.append(SimilarTicket(ticket_id=ticket_id, title=ticket.title, description=ticket.description,
+                                     resolution=replies[ticket_id][-1].content, score=score))
+    return similar
+
+
+async def index_ticket(ticket: Ticket):
+    """
+Adds a resolved or closed ticket to the similarity index, or removes any other ticket from it.
+"""
+    if not similar_tickets_enabled():
+        return
+    index = get_similar_ticket_index()
+    if ticket.status in RESOLVED_STATUSES:
+        await asyncio.to_thread(index.add, ticket.id, ticket_text(ticket.title, ticket.description))
+    else:
+        await asyncio.to_thread(index.remove, ticket.id)
+
+
+async def rebuild_index(batch_size: int = 1000) -> int:
+    """
+Rebuilds the similarity index from every resolved or closed ticket that has a reply.
+
+Returns:
+    int: The number of tickets indexed.
+"""
+    documents = []
+    async with AsyncDB() as db:
+        async with aclosing(db.stream_tickets_with_messages(db.db_session, statuses=list(RESOLVED_STATUSES),
+                                                            batch_size=batch_size)) as tickets:
+            async for ticket in tickets:
+                if ticket["messages"]:
+                    documents.append((ticket["id"], ticket_text(ticket["title"], ticket["description"])))
+    index = get_similar_ticket_index()
+    await asyncio.to_thread(index.rebuild, documents)
+    return len(index)
+
+
+async def _main(args):
+    try:
+        if args.rebuild:
+            indexed = await rebuild_index()
+            print(f"Indexed {indexed} tickets into {get_similar_ticket_index().path}")
+        if args.query:
+            async with AsyncDB() as db:
+                for similar in await find_similar_tickets(db, args.query):
+                    print(f"{similar.score:.3f}  {similar.ticket_id}  {similar.title}")
+    finally:
+        await dispose_async_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from the database.")
+    parser.add_argument("--query", help="Print the resolved tickets most similar to this text.")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
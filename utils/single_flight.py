@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from uuid import UUID
+
+from utils.async_database import AsyncDB
+from utils.database import get_pool_settings
+from utils.db_models.main import Message
+
+
+@dataclass(frozen=True)
+class CoalescedResponse:
+    """
+The outcome of an AI response generation shared by every caller that asked for it.
+
+Attributes:
+    content (str): The AI response.
+    message_id (Optional[UUID]): ID of the stored AI message, if one was stored.
+    owner (Optional[UUID]): ID of the job that stored the messages, if a background job did.
+"""
+    content: str
+    message_id: Optional[UUID] = None
+    owner: Optional[UUID] = None
+
+
+class SingleFlight:
+    """
+Coalesces concurrent calls that share a key into a single execution.
+
+The first caller starts the work as a separate task; callers arriving while it runs await the same task
+instead of starting their own. The task is shielded, so a caller that goes away does not cancel the work
+the others are waiting for. Its result, or exception, is delivered to every caller.
+
+Args:
+    max_locks (int): Executions allowed to hold an advisory lock connection at once; see lock_slot().
+"""
+
+    def __init__(self, max_locks: int = 10):
+        self._calls: dict[str, asyncio.Task] = {}
+        self._lock_slots = asyncio.Semaphore(max_locks)
+        self.max_locks = max_locks
+        self.holding_locks = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    @asynccontextmanager
+    async def lock_slot(self) -> AsyncIterator[None]:
+        """
+Waits, without holding a connection, until fewer than `max_locks` executions hold an advisory lock connection.
+"""
+        async with self._lock_slots:
+            self.holding_locks += 1
+            try:
+                yield
+            finally:
+                self.holding_locks -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "holding_locks": self.holding_locks,
+            "max_locks": self.max_locks,
+        }
+
+
+def _default_max_locks() -> int:
+    # A third of the pool, so generations waiting on Groq leave the rest to other requests.
+    settings = get_pool_settings()
+    return max(1, (settings["pool_size"] + settings["max_overflow"]) // 3)
+
+
+_single_flight = SingleFlight(max_locks=int(os.getenv("SINGLE_FLIGHT_MAX_LOCKS", "0")) or _default_max_locks())
+
+
+def get_single_flight() -> SingleFlight:
+    """
+Returns the process-wide SingleFlight used for AI responses.
+"""
+    return _single_flight
+
+
+def response_key(ticket_id: UUID, latest_message: Optional[Message], reply: Optional[str] = None) -> str:
+    """
+Identifies an AI response request by its ticket, the conversation state (the ticket's newest message) and,
+for a follow-up, the reply being sent.
+"""
+    state = latest_message.id if latest_message is not None else "empty"
+    key = f"ai-response:{ticket_id}:{state}"
+    if reply is not None:
+        key += ":" + hashlib.sha256(reply.encode()).hexdigest()
+    return key
+
+
+def advisory_lock_key(key: str) -> int:
+    """
+Maps a coalescing key onto a signed 64-bit Postgres advisory lock key.
+"""
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big", signed=True)
+
+
+async def answered_since(db: AsyncDB, ticket_id: UUID, latest_message: Optional[Message],
+                         reply: Optional[str] = None) -> Optional[Message]:
+    """
+Returns the AI message another process stored for the same request since `latest_message`, if any.
+
+For a follow-up, the AI message only counts if it directly follows the same reply.
+"""
+    messages = (await db.get_latest_messages_for_tickets(db.db_session, [ticket_id], 2))[ticket_id]
+    if not messages or not messages[-1].is_ai:
+        return None
+    if latest_message is not None and messages[-1].id == latest_message.id:
+        return None
+    if reply is not None:
+        if len(messages) < 2 or messages[-2].is_ai or messages[-2].content != reply:
+            return None
+        if latest_message is not None and messages[-2].id == latest_message.id:
+            return None
+    return messages[-1]
+
+
+async def coalesce_response(ticket_id: UUID, generate: Callable[[AsyncDB], Awaitable[CoalescedResponse]],
+                            reply: Optional[str] = None) -> CoalescedResponse:
+    """
+Runs `generate` for a ticket's AI response at most once per conversation state, across all processes.
+
+Concurrent callers in this process with the same ticket, newest message and reply share one execution.
+Across processes, the execution holds a Postgres advisory lock on the same key, so a second process waits
+for the first one to finish. It then finds the stored AI message and returns it instead of generating a
+duplicate.
+
+Connection budget: an execution holds one pooled connection, the advisory lock's, for its whole duration,
+Groq calls included. Its session only checks out a second connection for short reads and writes, because the
+context builder releases it before every Groq call. At most SINGLE_FLIGHT_MAX_LOCKS executions per process
+(default a third of DB_POOL_SIZE + DB_MAX_OVERFLOW) hold a lock; further ones wait for a slot without a
+connection, so a burst of distinct tickets cannot exhaust the pool for unrelated requests.
+
+Args:
+    ticket_id (UUID): Unique identifier of the ticket.
+    generate (Callable): Generates and stores the response using the given open AsyncDB.
+    reply (str, optional): For a follow-up, the reply being sent.
+
+Returns:
+    CoalescedResponse: The shared response.
+"""
+    async with AsyncDB() as db:
+        latest = (await db.get_latest_messages_for_tickets(db.db_session, [ticket_id], 1))[ticket_id]
+    latest_message = latest[-1] if latest else None
+    key = response_key(ticket_id, latest_message, reply)
+
+    flight = get_single_flight()
+
+    async def run() -> CoalescedResponse:
+        async with flight.lock_slot(), AsyncDB() as db:
+            async with db.advisory_lock(advisory_lock_key(key)):
+                answered = await answered_since(db, ticket_id, latest_message, reply)
+                if answered is not None:
+                    return CoalescedResponse(content=answered.content, message_id=answered.id)
+                await db.release_connection()
+                return await generate(db)
+
+    return await flight.do(key, run)
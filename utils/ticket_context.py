@@ -0,0 +1,219 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from utils.async_database import AsyncDB
+from utils.db_models.main import Message, Ticket
+from utils.groq_assistant import SUMMARY_PROMPT, SYSTEM_PROMPT, GroqAssistant
+from utils.groq_scheduler import Priority
+from utils.pagination import NEXT, encode_cursor
+from utils.similar_tickets import find_similar_tickets, ticket_text
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+PROMPT_OVERHEAD_TOKENS = 32
+
+
+@dataclass
+class TicketContext:
+    """
+The prompt context for an AI response on a ticket.
+
+Attributes:
+    ticket (Ticket): The ticket.
+    description (str): The ticket description, truncated to the prompt budget.
+    history (list[str]): Recent messages kept verbatim, oldest first.
+    latest_message (str): The message to respond to.
+    summary (Optional[str]): Running summary of the messages older than history.
+    previous_response (Optional[str]): The AI message the ticket currently ends with, if any.
+    references (list[str]): Similar resolved tickets with the replies that resolved them, best match first.
+"""
+    ticket: Ticket
+    description: str
+    history: list[str]
+    latest_message: str
+    summary: Optional[str] = None
+    previous_response: Optional[str] = None
+    references: list[str] = field(default_factory=list)
+
+
+class TicketContextBuilder:
+    """
+Builds a bounded-size prompt context for a ticket.
+
+The most recent messages are kept verbatim as long as they fit in the token budget. Older ones are folded
+into the ticket's running summary (the ticket_summaries table), which Groq updates incrementally. Each call
+only reads the messages newer than the stored summary and folds just the ones that no longer fit, so the
+prompt size and the work per call stay bounded however long the ticket gets.
+
+Similar resolved tickets from the similarity index are included as references, within `reference_tokens`.
+
+Args:
+    context_tokens (int): Token budget of a prompt; the rest of the model's context is left for the reply.
+    summary_tokens (int): Maximum length of the running summary.
+    fetch_size (int): Messages read per query when catching up on a ticket with many unsummarized messages.
+    reference_tokens (int): Token budget of the similar-ticket references; 0 leaves them out.
+"""
+
+    def __init__(self, context_tokens: int, summary_tokens: int, fetch_size: int = 200, reference_tokens: int = 768):
+        self.context_tokens = context_tokens
+        self.summary_tokens = summary_tokens
+        self.fetch_size = fetch_size
+        self.reference_tokens = reference_tokens
+        self.field_tokens = context_tokens // 4
+
+    async def build(self, db: AsyncDB, assistant: GroqAssistant, ticket_id: UUID,
+                    reply: Optional[str] = None, priority: Priority = Priority.INTERACTIVE) -> TicketContext:
+        """
+Loads the prompt context of a ticket, updating its running summary if messages had to be folded.
+
+The session's connection is released before every summarization call and before returning, so neither a
+summarization nor the caller's Groq call holds a pooled connection.
+
+Without a reply (a fresh AI response), trailing AI messages are left out and the latest human message is the
+one answered, so the prompt, and with it the completion cache key, only changes when a human writes again.
+With a reply (a follow-up), the whole conversation is context and the reply is the latest message.
+
+Args:
+    db (AsyncDB): An open AsyncDB.
+    assistant (GroqAssistant): Used to update the summary.
+    ticket_id (UUID): Unique identifier of the ticket.
+    reply (str, optional): A new message that is not stored yet.
+    priority (Priority, optional): Scheduling lane of any summarization call. Defaults to Priority.INTERACTIVE.
+
+Returns:
+    TicketContext: The ticket and its prompt context.
+
+Raises:
+    HTTPException: If the ticket is not found or the summary could not be updated.
+"""
+        session = db.db_session
+        ticket = await db.get_ticket(session, ticket_id)
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+        stored = await db.get_ticket_summary(session, ticket_id)
+        summary = stored.summary if stored else None
+        cursor = encode_cursor(stored.summarized_until, stored.summarized_until_id, NEXT) if stored else None
+
+        page = await db.get_messages_by_ticket(session, ticket_id, page_size=self.fetch_size, cursor=cursor)
+        while page.next_cursor is not None:
+            summary = await self._fold(db, assistant, ticket_id, summary, list(page), priority)
+            page = await db.get_messages_by_ticket(session, ticket_id, page_size=self.fetch_size,
+                                                   cursor=page.next_cursor)
+        messages = list(page)
+
+        previous_response = None
+        if reply is None:
+            previous_response = messages[-1].content if messages and messages[-1].is_ai else None
+            while messages and messages[-1].is_ai:
+                messages.pop()
+            latest_message = messages.pop().content if messages else ""
+        else:
+            latest_message = reply
+        latest_message = truncate_to_tokens(latest_message, self.field_tokens)
+        description = truncate_to_tokens(ticket.description, self.field_tokens)
+        references = await self._references(db, ticket, latest_message)
+
+        budget = (self.context_tokens - self.summary_tokens - PROMPT_OVERHEAD_TOKENS - estimate_tokens(SYSTEM_PROMPT)
+                  - estimate_tokens(description) - estimate_tokens(latest_message)
+                  - sum(estimate_tokens(reference) for reference in references))
+        kept = len(messages)
+        for index in range(len(messages) - 1, -1, -1):
+            cost = estimate_tokens(messages[index].content)
+            if cost > budget:
+                break
+            budget -= cost
+            kept = index
+
+        if kept:
+            summary = await self._fold(db, assistant, ticket_id, summary, messages[:kept], priority)
+
+        # Callers go on to call Groq; don't keep a pooled connection idle in a transaction meanwhile.
+        await db.release_connection()
+        return TicketContext(
+            ticket=ticket,
+            description=description,
+            history=[message.content for message in messages[kept:]],
+            latest_message=latest_message,
+            summary=summary,
+            previous_response=previous_response,
+            references=references,
+        )
+
+    async def _references(self, db: AsyncDB, ticket: Ticket, latest_message: str) -> list[str]:
+        """
+Looks up similar resolved tickets, each cut down to an equal share of the reference budget.
+
+Retrieval only improves the prompt, so a failing index is logged and the prompt built without references.
+"""
+        if not self.reference_tokens:
+            return []
+        query = ticket_text(ticket.title, ticket.description) + "\n" + latest_message
+        try:
+            similar = await find_similar_tickets(db, query, exclude=ticket.id)
+        except Exception:
+            logger.warning("Could not look up tickets similar to %s", ticket.id, exc_info=True)
+            return []
+        if not similar:
+            return []
+        share = self.reference_tokens // len(similar)
+        return [
+            truncate_to_tokens(f"{match.title}: {match.description}\nResolution: {match.resolution}", share)
+            for match in similar
+        ]
+
+    async def _fold(self, db: AsyncDB, assistant: GroqAssistant, ticket_id: UUID, summary: Optional[str],
+                    messages: list[Message], priority: Priority) -> str:
+        """
+Folds messages into the summary in batches that fit one summarization prompt, saving after each batch.
+"""
+        limit = (self.context_tokens - self.summary_tokens - PROMPT_OVERHEAD_TOKENS
+                 - estimate_tokens(SUMMARY_PROMPT))
+        batch, lines, used = [], [], 0
+        for message in messages:
+            speaker = "Assistant" if message.is_ai else "Customer"
+            line = truncate_to_tokens(f"{speaker}: {message.content}", limit)
+            cost = estimate_tokens(line)
+            if batch and used + cost > limit:
+                summary = await self._summarize(db, assistant, ticket_id, summary, batch, lines, priority)
+                batch, lines, used = [], [], 0
+            batch.append(message)
+            lines.append(line)
+            used += cost
+        if batch:
+            summary = await self._summarize(db, assistant, ticket_id, summary, batch, lines, priority)
+        return summary
+
+    async def _summarize(self, db: AsyncDB, assistant: GroqAssistant, ticket_id: UUID, summary: Optional[str],
+                         batch: list[Message], lines: list[str], priority: Priority) -> str:
+        await db.release_connection()
+        updated = await assistant.summarize(summary, lines, self.summary_tokens, priority=priority)
+        if not updated:
+            raise HTTPException(status_code=500, detail="Something went wrong. Failed to summarize the ticket")
+        await db.save_ticket_summary(db.db_session, ticket_id, updated, batch[-1], len(batch))
+        return updated
+
+
+_builder: Optional[TicketContextBuilder] = None
+
+
+def get_ticket_context_builder() -> TicketContextBuilder:
+    """
+Returns the process-wide TicketContextBuilder, configured by GROQ_CONTEXT_TOKENS, GROQ_SUMMARY_TOKENS,
+GROQ_CONTEXT_FETCH_SIZE and GROQ_REFERENCE_TOKENS.
+"""
+    global _builder
+    if _builder is None:
+        _builder = TicketContextBuilder(
+            context_tokens=int(os.getenv("GROQ_CONTEXT_TOKENS", "6144")),
+            summary_tokens=int(os.getenv("GROQ_SUMMARY_TOKENS", "512")),
+            fetch_size=int(os.getenv("GROQ_CONTEXT_FETCH_SIZE", "200")),
+            reference_tokens=int(os.getenv("GROQ_REFERENCE_TOKENS", "768")),
+        )
+    return _builder
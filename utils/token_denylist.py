@@ -0,0 +1,92 @@
+"""
+In-memory denylist of revoked access tokens.
+
+Every access token carries its row ID as the `jti` claim. Each process holds the IDs of revoked, unexpired
+tokens in a dict, so checking a request is a single lookup, also for principals served from the
+PrincipalCache. The denylist is loaded in full at startup and then refreshed incrementally from
+tokens.revoked_at every TOKEN_DENYLIST_REFRESH_SECONDS. A revocation therefore reaches other processes within
+that interval, and the revoking process sees it immediately. utils.token_sweeper runs the refreshes.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+# Revocations are re-read this far back on every refresh, to tolerate clock skew between app processes.
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class TokenDenylist:
+    """
+IDs of revoked tokens that have not expired yet, with their expiry.
+"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked: dict[UUID, datetime] = {}
+        self._watermark: Optional[datetime] = None
+        self.loaded = False
+        self.refreshes = 0
+        self.rejections = 0
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, token_id: Optional[UUID]) -> bool:
+        if token_id is not None and token_id in self._revoked:
+            self.rejections += 1
+            return True
+        return False
+
+    def add(self, token_id: UUID, expires_at: datetime):
+        with self._lock:
+            self._revoked[token_id] = expires_at
+
+    async def refresh(self, db) -> int:
+        """
+Adds tokens revoked since the last refresh (all revoked, unexpired tokens on the first call) and forgets
+tokens that have expired.
+
+Args:
+    db (AsyncDB): An open AsyncDB.
+
+Returns:
+    int: Number of revoked tokens read.
+"""
+        since = self._watermark - REFRESH_OVERLAP if self._watermark else None
+        rows = await db.get_revoked_tokens(db.db_session, revoked_since=since)
+        now = datetime.utcnow()
+        with self._lock:
+            for token_id, expires_at, revoked_at in rows:
+                self._revoked[token_id] = expires_at
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            for token_id in [token_id for token_id, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[token_id]
+            if self._watermark is None:
+                self._watermark = now
+        self.loaded = True
+        self.refreshes += 1
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._revoked),
+            "loaded": self.loaded,
+            "refreshes": self.refreshes,
+            "rejections": self.rejections,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+_denylist: Optional[TokenDenylist] = None
+
+
+def get_token_denylist() -> TokenDenylist:
+    """
+Returns the process-wide TokenDenylist.
+"""
+    global _denylist
+    if _denylist is None:
+        _denylist = TokenDenylist()
+    return _denylist
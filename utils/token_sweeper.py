@@ -0,0 +1,124 @@
+"""
+Background maintenance of access tokens: refreshes the TokenDenylist and sweeps expired tokens.
+
+Expired tokens are rejected by their `exp` claim alone, so the sweeper deletes them in batches of
+TOKEN_SWEEP_BATCH_SIZE every TOKEN_SWEEP_INTERVAL seconds. This keeps the tokens table and its unique index
+on the token string small. Each batch is claimed with FOR UPDATE SKIP LOCKED, so several processes can sweep
+at once; set TOKEN_SWEEP_INTERVAL=0 to leave sweeping to other processes.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from utils.async_database import AsyncDB
+from utils.token_denylist import TokenDenylist, get_token_denylist
+
+logger = logging.getLogger(__name__)
+
+
+class TokenMaintenance:
+    """
+Background task that refreshes the TokenDenylist and sweeps expired tokens.
+
+Args:
+    denylist (TokenDenylist): The denylist to keep current.
+    refresh_seconds (float): Seconds between denylist refreshes.
+    sweep_interval (float): Seconds between sweeps; 0 disables sweeping.
+    batch_size (int): Tokens deleted per statement; each batch is its own short transaction.
+"""
+
+    def __init__(self, denylist: TokenDenylist, refresh_seconds: float = 5.0, sweep_interval: float = 300.0,
+                 batch_size: int = 1000):
+        self.denylist = denylist
+        self.refresh_seconds = refresh_seconds
+        self.sweep_interval = sweep_interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._last_sweep = 0.0
+        self.swept = 0
+
+    async def start(self):
+        """
+Loads the denylist and starts the background task.
+"""
+        await self._refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="token-maintenance")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self._refresh()
+            if self.sweep_interval and loop.time() - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = loop.time()
+                await self.sweep()
+
+    async def _refresh(self):
+        try:
+            async with AsyncDB() as db:
+                await self.denylist.refresh(db)
+        except Exception:
+            logger.warning("Could not refresh the token denylist", exc_info=True)
+
+    async def sweep(self) -> int:
+        """
+Deletes expired tokens in batches until none are left.
+
+Returns:
+    int: Number of tokens deleted.
+"""
+        deleted = 0
+        try:
+            while True:
+                async with AsyncDB() as db:
+                    batch = await db.delete_expired_tokens(db.db_session, self.batch_size)
+                deleted += batch
+                if batch < self.batch_size:
+                    break
+                await asyncio.sleep(0)
+        except Exception:
+            logger.warning("Could not sweep expired tokens", exc_info=True)
+        if deleted:
+            logger.info("Swept %d expired tokens", deleted)
+        self.swept += deleted
+        return deleted
+
+    def stats(self) -> dict:
+        return {**self.denylist.stats(), "swept": self.swept, "sweep_interval_seconds": self.sweep_interval}
+
+
+_maintenance: Optional[TokenMaintenance] = None
+
+
+def get_token_maintenance() -> TokenMaintenance:
+    """
+Returns the process-wide TokenMaintenance, configured by TOKEN_DENYLIST_REFRESH_SECONDS, TOKEN_SWEEP_INTERVAL
+and TOKEN_SWEEP_BATCH_SIZE.
+"""
+    global _maintenance
+    if _maintenance is None:
+        _maintenance = TokenMaintenance(
+            get_token_denylist(),
+            refresh_seconds=float(os.getenv("TOKEN_DENYLIST_REFRESH_SECONDS", "5")),
+            sweep_interval=float(os.getenv("TOKEN_SWEEP_INTERVAL", "300")),
+            batch_size=int(os.getenv("TOKEN_SWEEP_BATCH_SIZE", "1000")),
+        )
+    return _maintenance
+
+
+async def stop_token_maintenance():
+    """
+Stops the process-wide TokenMaintenance, if one was started.
+"""
+    global _maintenance
+    if _maintenance is not None:
+        maintenance, _maintenance = _maintenance, None
+        await maintenance.stop()
@@ -0,0 +1,29 @@
+import math
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+Estimates how many tokens a chat message takes up.
+
+Llama 3's tokenizer is not shipped with the Groq client, so this uses the common approximation of four
+characters per token for English text, plus a small per-message overhead for the chat template.
+"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_prompt_tokens(messages: list[dict]) -> int:
+    """
+Estimates the prompt tokens of a list of chat messages.
+"""
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+Cuts text down so that estimate_tokens() of the result is at most max_tokens.
+"""
+    limit = max(max_tokens - MESSAGE_OVERHEAD_TOKENS, 0) * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit]
@@ -0,0 +1,293 @@
+"""
+Opt-in capture of HTTP traffic to rotating JSONL files, for replay with `python -m benchmarks.replay`.
+
+Each captured request is one line holding its arrival time, method, route template, path, query, JSON or form
+body, response status, duration and response size. Captures are sanitized before they are written. The
+Authorization header and cookies are dropped, and only whether the request was authenticated is kept.
+Password, token and secret fields are redacted from query strings, JSON bodies and form bodies. Other bodies
+are not captured.
+
+The request path only appends the raw entry to a bounded in-memory queue. A background thread sanitizes,
+serializes and writes entries, so capturing adds no I/O to a request. When the queue is full, entries are
+dropped and counted rather than slowing the app down.
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+from utils.env import env_flag
+from utils.metrics import Counter, registry
+
+REDACTED = "<redacted>"
+SENSITIVE_KEYS = ("password", "token", "secret", "api_key", "apikey", "authorization")
+KEPT_HEADERS = ("content-type", "accept")
+# Paths that are never captured.
+EXCLUDED_PATHS = ("/metrics",)
+
+TRAFFIC_CAPTURED = registry.register(Counter(
+    "traffic_capture_entries_total", "Requests handed to the traffic capture writer, by outcome (written or "
+    "dropped).", ["outcome"]))
+
+
+def _sensitive(key: str) -> bool:
+    key = key.lower()
+    return any(marker in key for marker in SENSITIVE_KEYS)
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if _sensitive(key) else _redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def _redact_query(query: str) -> str:
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode([(key, REDACTED if _sensitive(key) else value) for key, value in pairs])
+
+
+def sanitize(entry: dict) -> dict:
+    """
+Returns the writable form of a raw captured entry: a redacted query string and a redacted JSON or form body.
+
+Bodies that are truncated, unparsable or of another content type are left out.
+"""
+    entry = dict(entry)
+    entry["query"] = _redact_query(entry["query"]) if entry["query"] else ""
+    body, content_type = entry.pop("body"), entry["headers"].get("content-type", "")
+    entry["body"] = None
+    if body and not entry["body_truncated"]:
+        try:
+            if content_type.startswith("application/json"):
+                entry["body"] = json.dumps(_redact(json.loads(body)), ensure_ascii=False)
+            elif content_type.startswith("application/x-www-form-urlencoded"):
+                entry["body"] = _redact_query(body.decode())
+        except (ValueError, UnicodeDecodeError):
+            pass
+    entry["body_captured"] = entry["body"] is not None or not body
+    return entry
+
+
+class TrafficWriter:
+    """
+Write-behind writer of captured traffic to rotating JSONL files.
+
+Files are named traffic-<UTC start time>-<pid>-<sequence>.jsonl, so several workers can write to the same
+directory. A file is rotated once it reaches `max_bytes`. Each writer then keeps only its own newest
+`max_files` files; it never deletes files of another running process, which may still be writing to them.
+Files left behind by processes that are gone are pruned to the newest `max_files` as well.
+
+Args:
+    directory (str): Directory of the capture files; created if missing.
+    max_bytes (int): Size at which a file is rotated.
+    max_files (int): Number of capture files kept per process.
+    max_pending (int): Entries buffered in memory before new ones are dropped.
+"""
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, max_files: int = 20,
+                 max_pending: int = 10000):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._file = None
+        self._written = 0
+        self._sequence = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def submit(self, entry: dict):
+        """
+Queues a raw entry for writing without blocking; drops it if the queue is full.
+"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            TRAFFIC_CAPTURED.inc("dropped")
+
+    def close(self, timeout: float = 5.0):
+        """
+Writes out the queued entries and closes the current file.
+"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            while entry is not None:
+                self._write(entry)
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if self._file is not None:
+                self._file.flush()
+            if entry is None:
+                break
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, entry: dict):
+        try:
+            line = json.dumps(sanitize(entry), ensure_ascii=False) + "\n"
+        except (TypeError, ValueError):
+            TRAFFIC_CAPTURED.inc("dropped")
+            return
+        if self._file is None or self._written >= self.max_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._written += len(line.encode())
+        TRAFFIC_CAPTURED.inc("written")
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        path = self.directory / f"traffic-{stamp}-{os.getpid()}-{self._sequence}.jsonl"
+        self._file = open(path, "a", encoding="utf-8")
+        self._written = path.stat().st_size
+        self._prune()
+
+    def _prune(self):
+        own, orphaned = [], []
+        for file in self.directory.glob("traffic-*.jsonl"):
+            pid = _writer_pid(file)
+            if pid == os.getpid():
+                own.append(file)
+            elif pid is not None and not _process_alive(pid):
+                orphaned.append(file)
+        for files in (own, orphaned):
+            files.sort(key=lambda file: file.stat().st_mtime)
+            for old in files[:-self.max_files]:
+                old.unlink(missing_ok=True)
+
+
+def _writer_pid(file: Path) -> Optional[int]:
+    # traffic-<stamp>-<pid>-<sequence>.jsonl
+    parts = file.stem.split("-")
+    return int(parts[2]) if len(parts) == 4 and parts[2].isdigit() else None
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class TrafficCaptureMiddleware:
+    """
+ASGI middleware that hands every sampled HTTP request and its outcome to the TrafficWriter.
+
+Request bodies are copied as they are received, up to `max_body_bytes`; the response body is only counted.
+"""
+
+    def __init__(self, app, writer: Optional["TrafficWriter"] = None, sample_rate: Optional[float] = None,
+                 max_body_bytes: Optional[int] = None):
+        self.app = app
+        self.writer = writer or get_traffic_writer()
+        self.sample_rate = sample_rate if sample_rate is not None else float(
+            os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1"))
+        self.max_body_bytes = max_body_bytes if max_body_bytes is not None else int(
+            os.getenv("TRAFFIC_CAPTURE_MAX_BODY_BYTES", "65536"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        arrived, started = time.time(), time.perf_counter()
+        body, truncated = bytearray(), False
+        status, response_bytes = 500, 0
+
+        async def receive_and_copy():
+            nonlocal truncated
+            message = await receive()
+            if message["type"] == "http.request" and not truncated:
+                chunk = message.get("body", b"")
+                if len(body) + len(chunk) > self.max_body_bytes:
+                    truncated = True
+                else:
+                    body.extend(chunk)
+            return message
+
+        async def send_and_count(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_copy, send_and_count)
+        finally:
+            headers = {}
+            authorized = False
+            for name, value in scope["headers"]:
+                name = name.decode("latin-1").lower()
+                if name == "authorization":
+                    authorized = True
+                elif name in KEPT_HEADERS:
+                    headers[name] = value.decode("latin-1")
+            self.writer.submit({
+                "ts": arrived,
+                "method": scope["method"],
+                "route": getattr(scope.get("route"), "path", None),
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "headers": headers,
+                "authorized": authorized,
+                "body": bytes(body),
+                "body_truncated": truncated,
+                "status": status,
+                "duration": time.perf_counter() - started,
+                "response_bytes": response_bytes,
+            })
+
+
+_writer: Optional[TrafficWriter] = None
+
+
+def traffic_capture_enabled() -> bool:
+    return env_flag("TRAFFIC_CAPTURE_ENABLED", False)
+
+
+def get_traffic_writer() -> TrafficWriter:
+    """
+Returns the process-wide TrafficWriter, configured by TRAFFIC_CAPTURE_DIR, TRAFFIC_CAPTURE_MAX_BYTES,
+TRAFFIC_CAPTURE_MAX_FILES and TRAFFIC_CAPTURE_MAX_PENDING.
+"""
+    global _writer
+    if _writer is None:
+        _writer = TrafficWriter(
+            directory=os.getenv("TRAFFIC_CAPTURE_DIR", "data/traffic"),
+            max_bytes=int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", str(64 * 1024 * 1024))),
+            max_files=int(os.getenv("TRAFFIC_CAPTURE_MAX_FILES", "20")),
+            max_pending=int(os.getenv("TRAFFIC_CAPTURE_MAX_PENDING", "10000")),
+        )
+    return _writer
+
+
+def close_traffic_writer():
+    """
+Flushes and closes the process-wide TrafficWriter, if one was created.
+"""
+    global _writer
+    if _writer is not None:
+        writer, _writer = _writer, None
+        writer.close()